@@ -2,6 +2,7 @@
 import sys
 import logging
 import traceback
+from core.startup import timeline  # 尽早导入，作为启动时间线的起点
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
 
@@ -48,6 +49,7 @@ def main():
 
     app = QApplication(sys.argv)
     app.setApplicationName("ClipboardManagerPro_Main")
+    timeline.mark("QApplication 就绪")
     
     # 单实例检测 (使用不同的锁名称，允许 QuickPanel 和 Main 同时运行)
     from PyQt5.QtCore import QSharedMemory
@@ -69,6 +71,7 @@ def main():
         # root/ClipboardPro_2.py
         # root/ui/main_window.py
         from ui.main_window import MainWindow
+        timeline.mark("界面模块导入完成")
         
         # 创建主窗口实例
         window = MainWindow()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+自动标签规则匹配的回归检查 (python benchmarks/auto_tagger_check.py)
+重叠/前缀关键词全部命中；带内联标记或无效的正则不影响其他规则；规则编译出错时仍返回分区预设标签。
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.auto_tagger import AutoTagger
+
+
+class StubDB:
+    """只提供 AutoTagger 读取的规则、分区标签和版本号"""
+    tag_rule_version = 1
+    partition_version = 1
+
+    def __init__(self, rules):
+        self.rules = rules
+
+    def get_auto_tag_rules(self):
+        return self.rules
+
+    def get_inherited_partition_tags(self):
+        return {7: ['项目', '子项目']}
+
+
+RULES = [
+    (1, 'keyword', 'java', 'Java', True),
+    (2, 'keyword', 'javascript', 'JS', True),
+    (3, 'keyword', 'script', 'Script', True),
+    (4, 'keyword', 'he', 'He', True),
+    (5, 'keyword', 'she', 'She', True),
+    (6, 'regex', '(?i)todo', 'Todo', True),
+    (7, 'regex', '(', 'Bad', True),
+    (8, 'domain', 'github.com', 'GitHub', True),
+    (9, 'filetype', 'pdf', 'PDF', True),
+]
+
+
+def check():
+    tagger = AutoTagger(StubDB(RULES))
+    assert set(tagger.tags_for({'text': "I love JavaScript"})) == {'Java', 'JS', 'Script'}
+    assert set(tagger.tags_for({'text': "ushers"})) == {'He', 'She'}
+    assert tagger.tags_for({'text': "TODO: fix", 'partition_id': 7}) == ['项目', '子项目', 'Todo']
+    assert tagger.tags_for({'text': "x", 'url_domain': 'gist.github.com'}) == ['GitHub']
+    assert tagger.tags_for({'text': "a", 'item_type': 'file', 'file_path': 'C:/doc/a.PDF;C:/b.txt'}) == ['PDF']
+
+    # 规则编译出错时仍返回分区预设标签
+    def broken(rules):
+        raise RuntimeError("broken")
+    tagger = AutoTagger(StubDB(RULES))
+    tagger.compile_rules = broken
+    assert tagger.tags_for({'text': "todo", 'partition_id': 7}) == ['项目', '子项目']
+
+
+if __name__ == '__main__':
+    check()
+    print("✅ 自动标签检查通过")
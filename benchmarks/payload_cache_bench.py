@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+快速面板常驻内存 vs 历史条数 (python benchmarks/payload_cache_bench.py)
+对比旧做法 (列表项持有完整 ORM 对象，含 data_blob/thumbnail_blob) 与
+现在的做法 (RecentIndex 紧凑条目 + 按需读取的 PayloadCache)。
+"""
+import os
+import sys
+import time
+import random
+import logging
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.database import DBManager, ClipboardItem
+from services.payload_cache import PayloadCache
+from services.recent_index import RecentIndex
+
+
+def _seed(db, count, blob_kb, rnd):
+    """批量写入测试数据：约 70% 文本、20% 图片 (带原图和缩略图)、10% 文件"""
+    blob = os.urandom(blob_kb * 1024)
+    thumb = blob[:blob_kb * 1024 // 8]
+    with db.Session() as session:
+        rows = []
+        for i in range(count):
+            kind = rnd.random()
+            text = f"项目 {i} " + "内容" * rnd.randint(20, 800)
+            row = {'content': text, 'content_hash': f"bench{i}", 'sort_index': float(-i),
+                   'note': text[:50], 'item_type': 'text', 'is_pinned': False, 'is_deleted': False}
+            if kind < 0.2:
+                row.update(item_type='image', content=f"[图片] {i}", data_blob=blob, thumbnail_blob=thumb)
+            elif kind < 0.3:
+                row.update(item_type='file', is_file=True, file_path=f"C:/data/file_{i}.txt")
+            rows.append(row)
+        session.bulk_insert_mappings(ClipboardItem, rows)
+        session.commit()
+
+
+def _retained_bytes(build):
+    """build() 返回的对象常驻占用的 Python 堆字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, after - before
+
+
+def benchmark_memory(history_sizes=(1000, 5000, 10000), blob_kb=32, activations=200, seed=1):
+    """各历史条数下三种做法的常驻内存，以及粘贴激活的平均耗时"""
+    logging.disable(logging.INFO)
+    rnd = random.Random(seed)
+    print(f"{'历史条数':>8} | {'ORM 对象':>12} | {'紧凑索引':>12} | {'粘贴缓存':>10} | 激活耗时(均值)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in history_sizes:
+            db = DBManager(os.path.join(tmp, f"bench_{count}.db"))
+            _seed(db, count, blob_kb, rnd)
+
+            legacy, legacy_bytes = _retained_bytes(lambda: db.get_items(limit=count))
+            del legacy
+
+            def build_index():
+                index = RecentIndex(db, capacity=count)
+                index.rebuild()
+                return index
+            index, index_bytes = _retained_bytes(build_index)
+
+            cache = PayloadCache(db)
+            ids = [e.id for e in index.entries]
+            start = time.perf_counter()
+            for _ in range(activations):
+                # 粘贴偏向最近的项目
+                entry = index.entries[min(len(ids) - 1, int(rnd.expovariate(1 / 20)))]
+                cache.get(entry.id, entry.modified_at)
+            per_ms = (time.perf_counter() - start) * 1000 / activations
+
+            print(f"{count:>8} | {legacy_bytes / 1048576:>9.1f} MB | {index_bytes / 1048576:>9.1f} MB | "
+                  f"{cache.used_bytes / 1048576:>7.1f} MB | {per_ms:.2f}ms (命中 {cache.hits}/{activations})")
+            db.engine.dispose()
+    logging.disable(logging.NOTSET)
+
+
+if __name__ == '__main__':
+    benchmark_memory()
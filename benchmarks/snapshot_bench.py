@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+共享剪贴板快照的开销对比 (python benchmarks/snapshot_bench.py)
+对比每个处理器直接读取 QMimeData (旧做法) 与共享快照的单次捕获开销：
+旧做法中 URLHandler/TextHandler 的 can_handle 和 prepare 各自调用 text().strip() 并执行 URL 正则。
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QMimeData
+
+from handlers.snapshot import ClipboardSnapshot, URL_PATTERN
+
+
+def benchmark(size_mb=20, rounds=5):
+    """
+    Returns:
+        dict: {'direct_ms', 'snapshot_ms'} (多轮中的最快一次)
+    """
+    mime = QMimeData()
+    line = "剪贴板性能测试 clipboard benchmark line 0123456789\n"
+    mime.setText(line * (size_mb * 1024 * 1024 // len(line.encode('utf-8'))))
+
+    def direct():
+        # URLHandler.can_handle -> TextHandler.can_handle -> TextHandler.prepare
+        text = mime.text().strip()
+        URL_PATTERN.match(text)
+        text = mime.text().strip()
+        URL_PATTERN.match(text)
+        return mime.text().strip()
+
+    def shared():
+        snapshot = ClipboardSnapshot(mime)
+        snapshot.url_match()
+        snapshot.url_match()
+        return snapshot.stripped_text()
+
+    result = {}
+    for name, fn in (('direct_ms', direct), ('snapshot_ms', shared)):
+        best = float('inf')
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn()
+            best = min(best, (time.perf_counter() - start) * 1000)
+        result[name] = best
+    return result
+
+
+if __name__ == '__main__':
+    for mb in (1, 20):
+        r = benchmark(mb)
+        print(f"{mb:>3} MB 文本: 直接读取 {r['direct_ms']:.1f}ms  共享快照 {r['snapshot_ms']:.1f}ms  "
+              f"每次捕获节省 {r['direct_ms'] - r['snapshot_ms']:.1f}ms")
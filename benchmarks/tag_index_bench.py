@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+标签联想索引的构建与查询耗时 (python benchmarks/tag_index_bench.py)
+构造随机标签 (含中文)，测量 TagSuggestionIndex.build 和 search 的耗时分布。
+"""
+import os
+import sys
+import time
+import random
+import string
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.tag_index import TagSuggestionIndex
+
+
+def benchmark(tag_count=20000, queries=2000, seed=1):
+    rnd = random.Random(seed)
+    alphabet = string.ascii_lowercase + "标签测试工作学习资料"
+    now = datetime.now()
+    rows = []
+    for i in range(tag_count):
+        name = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(3, 12)))
+        last_used = now - timedelta(days=rnd.random() * 120) if rnd.random() < 0.7 else None
+        rows.append((f"{name}{i}", rnd.randint(0, 500), last_used))
+
+    index = TagSuggestionIndex()
+    start = time.perf_counter()
+    index.build(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    samples = []
+    for _ in range(queries):
+        name = rows[rnd.randrange(tag_count)][0]
+        i = rnd.randrange(len(name))
+        samples.append(name[i:i + rnd.randint(1, 5)])
+    timings = []
+    for q in samples:
+        start = time.perf_counter()
+        index.search(q)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    print(f"标签数: {tag_count}, 构建耗时: {build_ms:.1f}ms")
+    print(f"查询 {queries} 次: 平均 {sum(timings) / len(timings):.3f}ms, "
+          f"p50 {timings[len(timings) // 2]:.3f}ms, p99 {timings[int(len(timings) * 0.99)]:.3f}ms, "
+          f"最大 {timings[-1]:.3f}ms")
+
+
+if __name__ == '__main__':
+    benchmark()
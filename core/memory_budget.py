@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+进程级内存预算
+各缓存以名称注册 (register) 后得到一个账户，在放入/命中/移除条目时通知账户，
+预算据此维护一个跨所有缓存的全局 LRU：总用量超过上限时，
+从全局最久未使用的条目开始调用其所属缓存的淘汰回调，直到回到上限以内。
+
+不可淘汰的占用 (如正在显示的预览原图) 通过 set_fixed() 计入总量，
+它们会挤占其他缓存的空间，但本身不会被淘汰。
+
+淘汰回调在释放预算锁之后、于触发淘汰的线程中调用，因此回调必须线程安全，
+且不能再回调账户的 touch/forget (缓存内部直接删除条目即可)。
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger("MemoryBudget")
+
+DEFAULT_CAP_MB = 256
+
+
+class BudgetAccount:
+    """某个缓存在预算中的账户"""
+
+    def __init__(self, budget, name, label, evict):
+        self.budget = budget
+        self.name = name
+        self.label = label or name
+        self.evict = evict
+        self.count = 0
+        self.used_bytes = 0
+        self.fixed_bytes = 0
+        self.evictions = 0
+
+    def touch(self, key, nbytes=None):
+        """条目被放入 (nbytes 为其大小) 或命中 (nbytes=None，只刷新最近使用时间)"""
+        self.budget._touch(self, key, nbytes)
+
+    def forget(self, key):
+        """缓存自行移除了条目 (自身容量淘汰、失效等)"""
+        self.budget._forget(self, key)
+
+    def reset(self):
+        """缓存被清空"""
+        self.budget._reset(self)
+
+    def set_fixed(self, nbytes):
+        """设置不可淘汰的占用"""
+        self.budget._set_fixed(self, nbytes)
+
+
+class MemoryBudget:
+    """
+    - register(name, evict, label): 注册缓存，返回 BudgetAccount；同名重复注册时替换旧账户
+    - set_cap(bytes): 调整全局上限并立即按需淘汰
+    - stats(): 每个缓存的用量，供诊断界面显示
+    """
+
+    def __init__(self, cap_bytes=DEFAULT_CAP_MB * 1024 * 1024):
+        self.cap_bytes = cap_bytes
+        self._accounts = OrderedDict()  # {name: BudgetAccount}
+        self._lru = OrderedDict()       # {(name, key): nbytes}，最久未用的在前
+        self._lock = threading.Lock()
+
+    def register(self, name, evict=None, label=None):
+        with self._lock:
+            old = self._accounts.get(name)
+            if old is not None:
+                self._drop_account_entries(old)
+            account = BudgetAccount(self, name, label, evict)
+            self._accounts[name] = account
+        return account
+
+    def unregister(self, name):
+        with self._lock:
+            account = self._accounts.pop(name, None)
+            if account is not None:
+                self._drop_account_entries(account)
+
+    def set_cap(self, cap_bytes):
+        with self._lock:
+            self.cap_bytes = max(0, int(cap_bytes))
+            victims = self._collect_victims()
+        self._run_evictions(victims)
+
+    def trim(self, target_bytes=0):
+        """主动把可淘汰的用量降到 target_bytes 以内 (诊断界面的 "释放缓存")"""
+        with self._lock:
+            victims = self._collect_victims(limit=target_bytes + self._fixed_total())
+        self._run_evictions(victims)
+
+    def used_bytes(self):
+        with self._lock:
+            return self._used_total() + self._fixed_total()
+
+    def stats(self):
+        with self._lock:
+            caches = [{
+                'name': a.name,
+                'label': a.label,
+                'count': a.count,
+                'used_bytes': a.used_bytes,
+                'fixed_bytes': a.fixed_bytes,
+                'evictions': a.evictions,
+            } for a in self._accounts.values()]
+            return {
+                'cap_bytes': self.cap_bytes,
+                'used_bytes': self._used_total() + self._fixed_total(),
+                'caches': caches,
+            }
+
+    # --- 内部实现 ---
+    def _touch(self, account, key, nbytes):
+        lru_key = (account.name, key)
+        with self._lock:
+            if self._accounts.get(account.name) is not account:
+                return  # 已被替换的旧账户
+            old = self._lru.get(lru_key)
+            if nbytes is None:
+                if old is not None:
+                    self._lru.move_to_end(lru_key)
+                return
+            if old is None:
+                account.count += 1
+            else:
+                account.used_bytes -= old
+            self._lru[lru_key] = nbytes
+            self._lru.move_to_end(lru_key)
+            account.used_bytes += nbytes
+            victims = self._collect_victims()
+        self._run_evictions(victims)
+
+    def _forget(self, account, key):
+        with self._lock:
+            old = self._lru.pop((account.name, key), None)
+            if old is not None:
+                account.count -= 1
+                account.used_bytes -= old
+
+    def _reset(self, account):
+        with self._lock:
+            self._drop_account_entries(account)
+
+    def _set_fixed(self, account, nbytes):
+        with self._lock:
+            account.fixed_bytes = max(0, int(nbytes))
+            victims = self._collect_victims()
+        self._run_evictions(victims)
+
+    def _used_total(self):
+        return sum(a.used_bytes for a in self._accounts.values())
+
+    def _fixed_total(self):
+        return sum(a.fixed_bytes for a in self._accounts.values())
+
+    def _drop_account_entries(self, account):
+        for lru_key in [k for k in self._lru if k[0] == account.name]:
+            del self._lru[lru_key]
+        account.count = 0
+        account.used_bytes = 0
+
+    def _collect_victims(self, limit=None):
+        """在锁内从全局 LRU 头部取出需要淘汰的条目，返回 [(账户, 键), ...]"""
+        limit = self.cap_bytes if limit is None else limit
+        total = self._used_total() + self._fixed_total()
+        victims = []
+        while total > limit and self._lru:
+            (name, key), nbytes = self._lru.popitem(last=False)
+            account = self._accounts[name]
+            account.count -= 1
+            account.used_bytes -= nbytes
+            account.evictions += 1
+            total -= nbytes
+            victims.append((account, key))
+        return victims
+
+    @staticmethod
+    def _run_evictions(victims):
+        for account, key in victims:
+            if account.evict is None:
+                continue
+            try:
+                account.evict(key)
+            except Exception as e:
+                log.error(f"缓存 {account.name} 淘汰条目失败: {e}", exc_info=True)
+
+
+memory_budget = MemoryBudget()
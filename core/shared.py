@@ -1,26 +1,145 @@
 ﻿# -*- coding: utf-8 -*-
-from PyQt5.QtGui import QColor, QPixmap, QIcon, QPainter
-from PyQt5.QtCore import Qt
+import logging
+from collections import OrderedDict
+from PyQt5.QtGui import QColor, QPixmap, QIcon, QPainter, QGuiApplication
+from PyQt5.QtCore import Qt, QRectF, QRunnable
+
+log = logging.getLogger("Shared")
 
 # 这个文件现在变得很干净，只存放逻辑工具，不存放一大串CSS代码了
 
 def format_size(text):
     """格式化显示大小"""
     if not text: return "0 B"
-    b = len(text.encode('utf-8'))
+    return format_bytes(len(text.encode('utf-8')))
+
+def format_bytes(b):
+    """格式化字节数"""
+    if not b: return "0 B"
     if b < 1024: return f"{b} B"
     elif b < 1024**2: return f"{b/1024:.1f} KB"
     else: return f"{b/1024**2:.1f} MB"
 
-def get_color_icon(hex_color):
-    """生成颜色圆点图标"""
+class BackgroundTask(QRunnable):
+    """把一个函数调用包装为 QRunnable 提交到线程池，异常记录日志而不是静默丢失"""
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        try:
+            self.fn(*self.args)
+        except Exception as e:
+            log.error(f"后台任务失败 ({getattr(self.fn, '__qualname__', self.fn)}): {e}", exc_info=True)
+
+class IconCache:
+    """
+    进程级的颜色图标缓存
+    以 (颜色, 形状, 尺寸, 设备像素比) 为键，LRU 淘汰；同一颜色重复使用时不再重新绘制。
+    可通过 prerender() 把一批常用颜色一次性画到一张图集上再切分，减少绘制调用。
+    """
+
+    SHAPES = ('circle', 'rounded')
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self._icons = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, hex_color, shape='circle', size=16):
+        dpr = self._device_pixel_ratio()
+        key = (QColor(hex_color).name(), shape, size, dpr)
+        icon = self._icons.get(key)
+        if icon is not None:
+            self.hits += 1
+            self._icons.move_to_end(key)
+            return icon
+        self.misses += 1
+        icon = QIcon(self._render(key))
+        self._put(key, icon)
+        return icon
+
+    def prerender(self, colors, shape='circle', size=16):
+        """将一组颜色绘制到同一张图集 (横向排列) 上，再切分为各自的图标放入缓存"""
+        dpr = self._device_pixel_ratio()
+        keys = []
+        for c in colors:
+            key = (QColor(c).name(), shape, size, dpr)
+            if key not in self._icons and key not in keys:
+                keys.append(key)
+        if not keys:
+            return
+        cell = int(round(size * dpr))
+        atlas = QPixmap(cell * len(keys), cell)
+        atlas.fill(Qt.transparent)
+        p = QPainter(atlas)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.setPen(Qt.NoPen)
+        for i, key in enumerate(keys):
+            self._paint(p, key[0], shape, i * cell, cell)
+        p.end()
+        for i, key in enumerate(keys):
+            px = atlas.copy(i * cell, 0, cell, cell)
+            px.setDevicePixelRatio(dpr)
+            self._put(key, QIcon(px))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._icons),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / total) if total else 0.0,
+        }
+
+    def clear(self):
+        self._icons.clear()
+
+    def _put(self, key, icon):
+        self._icons[key] = icon
+        self._icons.move_to_end(key)
+        while len(self._icons) > self.capacity:
+            self._icons.popitem(last=False)
+            self.evictions += 1
+
+    def _render(self, key):
+        color, shape, size, dpr = key
+        cell = int(round(size * dpr))
+        px = QPixmap(cell, cell)
+        px.fill(Qt.transparent)
+        p = QPainter(px)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.setPen(Qt.NoPen)
+        self._paint(p, color, shape, 0, cell)
+        p.end()
+        px.setDevicePixelRatio(dpr)
+        return px
+
+    @staticmethod
+    def _paint(p, color, shape, x, cell):
+        # 按 16px 基准的比例绘制，保持与原先图标外观一致
+        p.setBrush(QColor(color))
+        k = cell / 16.0
+        if shape == 'rounded':
+            p.drawRoundedRect(QRectF(x + 2 * k, 2 * k, 12 * k, 12 * k), 4 * k, 4 * k)
+        else:
+            p.drawEllipse(QRectF(x + 1 * k, 1 * k, 14 * k, 14 * k))
+
+    @staticmethod
+    def _device_pixel_ratio():
+        app = QGuiApplication.instance()
+        return app.devicePixelRatio() if app else 1.0
+
+
+icon_cache = IconCache()
+
+def get_color_icon(hex_color, shape='circle', size=16):
+    """获取颜色图标 (圆点或圆角方块)，结果来自全局缓存"""
     if not hex_color: return QIcon()
-    px = QPixmap(16, 16)
-    px.fill(Qt.transparent)
-    p = QPainter(px)
-    p.setRenderHint(QPainter.Antialiasing)
-    p.setBrush(QColor(hex_color))
-    p.setPen(Qt.NoPen)
-    p.drawEllipse(1, 1, 14, 14)
-    p.end()
-    return QIcon(px)
\ No newline at end of file
+    return icon_cache.get(hex_color, shape, size)
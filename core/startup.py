@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+启动时间线
+记录冷启动各阶段的时间点，启动完成后输出一份耗时分解，
+重点关注 "首次绘制" (窗口外壳可见) 和 "可交互" (首页真实数据就绪) 两个指标。
+"""
+import time
+import logging
+
+log = logging.getLogger("Startup")
+
+FIRST_PAINT = "首次绘制"
+INTERACTIVE = "可交互"
+
+
+class StartupTimeline:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = []  # [(阶段名, 时间点)]
+        self.reported = False
+
+    def mark(self, name):
+        """记录一个阶段完成的时间点 (同名阶段只记录第一次)"""
+        if self.reported or any(n == name for n, _ in self.marks):
+            return
+        self.marks.append((name, time.perf_counter()))
+
+    def elapsed_ms(self, name):
+        for n, t in self.marks:
+            if n == name:
+                return (t - self.t0) * 1000
+        return None
+
+    def report(self):
+        """输出耗时分解 (只输出一次)"""
+        if self.reported:
+            return
+        self.reported = True
+        lines = []
+        prev = self.t0
+        for name, t in sorted(self.marks, key=lambda m: m[1]):
+            lines.append(f"  {name:<16} +{(t - prev) * 1000:7.1f}ms  累计 {(t - self.t0) * 1000:7.1f}ms")
+            prev = t
+        first_paint = self.elapsed_ms(FIRST_PAINT)
+        interactive = self.elapsed_ms(INTERACTIVE)
+        summary = (f"首次绘制 {first_paint:.0f}ms" if first_paint is not None else "首次绘制 -") + ", " + \
+                  (f"可交互 {interactive:.0f}ms" if interactive is not None else "可交互 -")
+        log.info("⏱️ 启动时间线 (" + summary + "):\n" + "\n".join(lines))
+
+
+# 进程级单例，尽早导入以便以导入时刻作为起点
+timeline = StartupTimeline()
@@ -3,9 +3,14 @@ import sys
 import os
 import hashlib
 import logging
+import threading
+import zlib
 from datetime import datetime, timedelta, time
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Table, Index, Float, func, or_, exists, and_, BLOB
+from sqlalchemy import event, create_engine, Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Table, Index, Float, func, or_, exists, and_, BLOB, cast, update, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker, joinedload, subqueryload
+from sqlalchemy.orm.attributes import set_committed_value
+from data.records import ItemRecord, PayloadRecord
 
 log = logging.getLogger("Database")
 Base = declarative_base()
@@ -77,6 +82,10 @@ class ClipboardItem(Base):
     # 新增二进制数据存储
     data_blob = Column(BLOB, nullable=True)         # 储存图片、富文本等二进制数据
     thumbnail_blob = Column(BLOB, nullable=True)    # 储存缩略图的二进制数据
+    payload_hash = Column(String(40), index=True, nullable=True)  # 图片像素/原始字节的哈希，用于编码前去重
+    blob_codec = Column(String(16), nullable=True)  # data_blob 的编码 ('png-fast' 为待后台重新压缩的快速 PNG)
+    file_manifest = Column(Text, nullable=True)     # 文件清单 JSON [{path, name, size, mtime, hash}]，大文件只保存引用时 data_blob 为空
+    content_size = Column(Integer, nullable=True)   # 超大文本的完整 UTF-8 字节数：正文压缩存放在 text_overflow 表，content 只保留预览
     
     partition_id = Column(Integer, ForeignKey('partitions.id'), nullable=True)
     original_partition_id = Column(Integer, nullable=True) # 用于恢复功能
@@ -90,6 +99,70 @@ class Tag(Base):
     items = relationship("ClipboardItem", secondary=item_tags, back_populates="tags")
     partitions = relationship("Partition", secondary=partition_tags, back_populates="tags")
 
+class TextOverflow(Base):
+    """超大文本的正文 (压缩存储)，对应项目的 content 中只保留预览"""
+    __tablename__ = 'text_overflow'
+    item_id = Column(Integer, ForeignKey('clipboard_items.id'), primary_key=True)
+    codec = Column(String(16), nullable=False, default='zlib')
+    size_chars = Column(Integer, nullable=False)
+    data = Column(BLOB, nullable=False)
+    search_text = Column(Text, nullable=True)  # 启用全文搜索时保存完整正文，否则只能搜索预览
+
+class FileBlob(Base):
+    """多文件捕获中单个文件的内容，按内容哈希去重，由多个项目共享"""
+    __tablename__ = 'file_blobs'
+    hash = Column(String(40), primary_key=True)
+    size = Column(Integer, nullable=False)
+    data = Column(BLOB, nullable=False)
+
+# 项目与文件内容的引用关系，没有项目引用的 file_blobs 会在永久删除时清理
+item_file_blobs = Table(
+    'item_file_blobs', Base.metadata,
+    Column('item_id', Integer, ForeignKey('clipboard_items.id'), primary_key=True),
+    Column('blob_hash', String(40), ForeignKey('file_blobs.hash'), primary_key=True),
+    Index('idx_file_blob_item', 'blob_hash')
+)
+
+class AutoTagRule(Base):
+    """自动标签规则：新捕获的项目匹配规则时，在写入的同一事务中打上标签"""
+    __tablename__ = 'auto_tag_rules'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(16), nullable=False)  # 'keyword' | 'regex' | 'domain' | 'filetype'
+    pattern = Column(String(500), nullable=False)
+    tag_name = Column(String(50), nullable=False)
+    enabled = Column(Boolean, default=True)
+
+class TagUsage(Base):
+    """标签使用统计 (增量维护，只统计未删除的项目)"""
+    __tablename__ = 'tag_usage'
+    tag_id = Column(Integer, ForeignKey('tags.id'), primary_key=True)
+    item_count = Column(Integer, default=0, nullable=False)
+    last_used_at = Column(DateTime, default=None)
+
+def item_record_columns():
+    """构造 ItemRecord 所需的查询列，顺序与 ItemRecord.FIELDS 一致"""
+    return (
+        ClipboardItem.id,
+        func.substr(ClipboardItem.content, 1, ItemRecord.PREVIEW_CHARS),
+        func.coalesce(ClipboardItem.content_size, func.length(cast(ClipboardItem.content, BLOB))),  # UTF-8 字节数
+        ClipboardItem.note,
+        ClipboardItem.star_level,
+        ClipboardItem.is_pinned,
+        ClipboardItem.is_favorite,
+        ClipboardItem.is_locked,
+        ClipboardItem.custom_color,
+        ClipboardItem.item_type,
+        ClipboardItem.is_file,
+        ClipboardItem.file_path,
+        ClipboardItem.image_path,
+        ClipboardItem.url_domain,
+        ClipboardItem.url_title,
+        ClipboardItem.created_at,
+        ClipboardItem.modified_at,
+        ClipboardItem.partition_id,
+    )
+
+
 class DBManager:
     def __init__(self, db_name='clipboard_data.db'):
         if getattr(sys, 'frozen', False):
@@ -111,6 +184,52 @@ class DBManager:
         except Exception as e:
             log.critical(f"数据库初始化失败: {e}", exc_info=True)
 
+        # 分区结构版本号：分区增删改后递增，供界面层的分区路径缓存判断是否失效
+        self.partition_version = 0
+        # 数据版本号：任何写操作提交后递增，供分页预取缓存判断是否失效
+        self.data_version = 0
+        # 清理版本号：永久删除项目后递增，供捕获时的最近内容缓存判断记住的项目是否可能已不存在
+        self.purge_version = 0
+        # 自动标签规则版本号：规则增删后递增，供自动标签 (services.auto_tagger) 判断是否需要重新编译
+        self.tag_rule_version = 0
+        self._install_write_tracking()
+
+        # 标签使用统计的内存镜像 {tag_id: (name, item_count, last_used_at)}，首次读取时加载
+        # 捕获工作线程 (add_item 写入自动标签) 与 GUI 线程会同时读写镜像，读写都在锁内进行，读取方拿到的是快照
+        self._tag_usage = None
+        self._tag_usage_lock = threading.Lock()
+        self._ensure_tag_usage()
+
+    def _install_write_tracking(self):
+        """
+        监听连接上的写语句 (覆盖 ORM、批量更新和原生 SQL)，写事务提交时递增 data_version。
+        commit 事件发生在真正提交之前，因此连接归还连接池时再递增一次，
+        使提交过程中开始的读取结果也被视为过期。
+        """
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            # 不影响任何界面数据的写入 (如后台替换图片编码) 可通过执行选项跳过
+            if context is not None and context.execution_options.get('skip_data_version'):
+                return
+            if statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.info['dirty'] = True
+
+        def on_commit(conn):
+            if conn.info.pop('dirty', False):
+                conn.info['committed'] = True
+                self.data_version += 1
+
+        def on_rollback(conn):
+            conn.info.pop('dirty', None)
+
+        def on_checkin(dbapi_conn, record):
+            if record.info.pop('committed', False):
+                self.data_version += 1
+
+        event.listen(self.engine, 'after_cursor_execute', on_execute)
+        event.listen(self.engine, 'commit', on_commit)
+        event.listen(self.engine, 'rollback', on_rollback)
+        event.listen(self.engine.pool, 'checkin', on_checkin)
+
     def _check_migrations(self):
         """检查并为所有模型执行数据库迁移，包括从旧的分组/分区模型进行数据迁移。"""
         from sqlalchemy import inspect, text
@@ -131,6 +250,9 @@ class DBManager:
                                 stmt = text(f'ALTER TABLE {table_name} ADD COLUMN {column.name} {col_type}')
                                 connection.execute(stmt)
                                 log.info(f"✅ 表 '{table_name}' 中添加字段: {column.name}")
+                        # 新增列上声明的索引不会由 create_all 为已存在的表创建
+                        for index in table.indexes:
+                            index.create(connection, checkfirst=True)
                     add_col_transaction.commit()
                 except Exception as e:
                     log.error(f"添加新列失败，正在回滚: {e}")
@@ -185,14 +307,64 @@ class DBManager:
                         log.error(f"分区数据迁移失败，正在回滚: {e}")
                         migration_transaction.rollback()
                         raise
+            # 步骤 3: 旧版本的图片/文件项目补充内容哈希
+            self._backfill_payload_hashes()
         except Exception as e:
             log.error(f"迁移检查失败: {e}", exc_info=True)
 
+    def _backfill_payload_hashes(self, batch_size=50):
+        """
+        旧版本入库的图片/文件项目没有 payload_hash，content_hash 由显示文本计算，重新复制相同内容时无法去重。
+        按当前捕获方式补算内容哈希并同步更新 content_hash；无法还原的项目 (如包含文件夹的旧 ZIP)
+        标记为空串，之后不再重复处理。已有其他项目使用相同哈希时只补充 payload_hash。
+        """
+        from handlers.image_handler import stored_image_hash
+        from handlers.file_handler import stored_files_hash
+
+        with self.Session() as session:
+            ids = [i for i, in session.query(ClipboardItem.id).filter(
+                ClipboardItem.payload_hash.is_(None),
+                ClipboardItem.item_type.in_(('image', 'file')),
+                ClipboardItem.data_blob.isnot(None))]
+        if not ids:
+            return
+        log.info(f"🔁 为 {len(ids)} 个旧图片/文件项目补充内容哈希...")
+        filled = 0
+        for start in range(0, len(ids), batch_size):
+            with self.Session() as session:
+                try:
+                    rows = session.query(ClipboardItem.id, ClipboardItem.item_type, ClipboardItem.file_path,
+                                         ClipboardItem.data_blob).filter(ClipboardItem.id.in_(ids[start:start + batch_size])).all()
+                    for item_id, item_type, file_path, data_blob in rows:
+                        try:
+                            payload_hash = (stored_image_hash(data_blob) if item_type == 'image'
+                                            else stored_files_hash(file_path, data_blob))
+                        except Exception as e:
+                            log.warning(f"⚠️ 项目 {item_id} 的内容哈希无法计算: {e}")
+                            payload_hash = None
+                        values = {'payload_hash': payload_hash or "", 'modified_at': ClipboardItem.modified_at}
+                        if payload_hash:
+                            content_hash = hashlib.sha256(f"payload:{payload_hash}".encode('utf-8')).hexdigest()
+                            taken = session.query(ClipboardItem.id).filter(ClipboardItem.content_hash == content_hash).first()
+                            if taken is None:
+                                values['content_hash'] = content_hash
+                            filled += 1
+                        session.query(ClipboardItem).filter(ClipboardItem.id == item_id).update(
+                            values, synchronize_session=False)
+                    session.commit()
+                except Exception as e:
+                    log.error(f"补充内容哈希失败: {e}", exc_info=True)
+                    session.rollback()
+                    return
+        log.info(f"✅ 已为 {filled}/{len(ids)} 个旧项目补充内容哈希")
+
     def get_session(self): return self.Session()
 
     def add_item(self, text, is_file=False, file_path=None, item_type='text', 
                  image_path=None, thumbnail_path=None, url=None, url_title=None, 
-                 url_domain=None, partition_id=None, data_blob=None, thumbnail_blob=None):
+                 url_domain=None, partition_id=None, data_blob=None, thumbnail_blob=None,
+                 payload_hash=None, blob_codec=None, file_manifest=None, file_blobs=None,
+                 text_overflow=None, tags=None):
         """
         添加剪贴板项
         
@@ -209,10 +381,18 @@ class DBManager:
             partition_id: (可选) 关联的分区ID
             data_blob: (可选) 二进制数据
             thumbnail_blob: (可选) 缩略图二进制数据
+            payload_hash: (可选) 二进制内容的哈希；提供时按它而不是显示文本去重
+            blob_codec: (可选) data_blob 的编码
+            file_manifest: (可选) 文件清单 JSON
+            file_blobs: (可选) 清单中各文件的内容 {哈希: bytes}，值为 None 表示内容已在 file_blobs 表中
+            text_overflow: (可选) 超大文本的正文 {'data', 'codec', 'size_bytes', 'size_chars', 'search_text'}，
+                           此时 text 只是预览
+            tags: (可选) 新项目的标签名 (自动标签和分区预设标签)，与项目在同一事务中写入；内容已存在时忽略
         """
         session = self.get_session()
         try:
-            text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            # 图片的显示文本只有尺寸，必须按内容哈希区分，否则同尺寸的不同图片会被当作重复
+            text_hash = hashlib.sha256((f"payload:{payload_hash}" if payload_hash else text).encode('utf-8')).hexdigest()
             existing = session.query(ClipboardItem).filter_by(content_hash=text_hash).first()
             if existing:
                 existing.last_visited_at = datetime.now()
@@ -221,6 +401,7 @@ class DBManager:
                 if partition_id and not existing.partition_id:
                      existing.partition_id = partition_id
                 session.commit()
+                session.refresh(existing)  # 提交后属性已过期，会话关闭前重新加载，调用方才能读取 id 等字段
                 return existing, False
             
             min_sort = session.query(func.min(ClipboardItem.sort_index)).scalar()
@@ -242,11 +423,31 @@ class DBManager:
                 url_domain=url_domain,
                 partition_id=partition_id,
                 data_blob=data_blob,
-                thumbnail_blob=thumbnail_blob
+                thumbnail_blob=thumbnail_blob,
+                payload_hash=payload_hash,
+                blob_codec=blob_codec,
+                file_manifest=file_manifest,
+                content_size=text_overflow['size_bytes'] if text_overflow else None
             )
             session.add(new_item)
+            tag_ids = []
             try:
+                for name in dict.fromkeys(t.strip() for t in (tags or ()) if t.strip()):
+                    tag = self._get_or_create_tag(session, name)
+                    new_item.tags.append(tag)
+                    tag_ids.append(tag.id)
+                if tag_ids:
+                    self._adjust_tag_usage(session, {t: 1 for t in tag_ids}, touch=True)
+                if file_blobs or text_overflow:
+                    session.flush()
+                if file_blobs:
+                    self._link_file_blobs(session, new_item.id, file_blobs)
+                if text_overflow:
+                    session.add(TextOverflow(item_id=new_item.id, codec=text_overflow['codec'],
+                                             size_chars=text_overflow['size_chars'], data=text_overflow['data'],
+                                             search_text=text_overflow.get('search_text')))
                 session.commit()
+                self._sync_tag_usage(session, tag_ids)
                 session.refresh(new_item)
                 return new_item, True
             except Exception as e:
@@ -258,6 +459,7 @@ class DBManager:
                     existing.last_visited_at = datetime.now()
                     existing.visit_count += 1
                     session.commit()
+                    session.refresh(existing)  # 与正常的重复分支一致：会话关闭前重新加载，调用方才能读取 id 等字段
                     return existing, False
                 else:
                     # 如果还是查不到，那可能是其他错误，抛出
@@ -270,9 +472,13 @@ class DBManager:
         finally:
             session.close()
 
-    def _build_query(self, session, filters=None, search="", selected_tags=None, sort_mode="manual", date_filter=None, date_modify_filter=None, partition_filter=None, include_deleted=False):
+    def _build_query(self, session, filters=None, search="", selected_tags=None, sort_mode="manual", date_filter=None, date_modify_filter=None, partition_filter=None, include_deleted=False, columns=None):
         log.debug(f"🔍 构建查询: filters={filters}, search='{search}', tags={selected_tags}, sort={sort_mode}, date={date_filter}, date_modify={date_modify_filter}, partition={partition_filter}, deleted={include_deleted}")
-        q = session.query(ClipboardItem).options(joinedload(ClipboardItem.tags))
+        if columns:
+            # 只查询指定列 (不加载 ORM 对象和二进制数据)
+            q = session.query(*columns).select_from(ClipboardItem)
+        else:
+            q = session.query(ClipboardItem).options(joinedload(ClipboardItem.tags))
 
         # 核心回收站逻辑
         if include_deleted:
@@ -331,14 +537,19 @@ class DBManager:
         if selected_tags: 
             log.debug(f"🏷️ 应用标签筛选: {selected_tags}")
             q = q.join(item_tags).join(Tag).filter(Tag.name.in_(selected_tags))
+            if columns:
+                # 列查询不会像 ORM 实体那样自动去重
+                q = q.distinct()
         
         if search:
             log.debug(f"🔎 应用搜索: '{search}'")
             search_pattern = f"%{search}%"
+            overflow_search_sq = session.query(TextOverflow.item_id).filter(TextOverflow.search_text.like(search_pattern)).subquery()
             # 优化：使用子查询来分别查找匹配的ID，然后用OR组合，避免复杂的JOIN和DISTINCT
             content_search_sq = session.query(ClipboardItem.id).filter(or_(ClipboardItem.content.like(search_pattern), ClipboardItem.note.like(search_pattern))).subquery()
             tag_search_sq = session.query(item_tags.c.item_id).join(Tag).filter(Tag.name.like(search_pattern)).subquery()
-            q = q.filter(or_(ClipboardItem.id.in_(content_search_sq), ClipboardItem.id.in_(tag_search_sq)))
+            q = q.filter(or_(ClipboardItem.id.in_(content_search_sq), ClipboardItem.id.in_(tag_search_sq),
+                             ClipboardItem.id.in_(overflow_search_sq)))
         
         # 创建日期筛选逻辑
         if date_filter:
@@ -422,6 +633,312 @@ class DBManager:
                 log.error(f"查询失败: {e}", exc_info=True)
                 return []
 
+    def get_item_records(self, filters=None, search="", sort_mode="manual", selected_tags=None, limit=50, offset=0, date_filter=None, date_modify_filter=None, partition_filter=None):
+        """
+        获取轻量行记录列表 (用于主表格的虚拟化模型)
+        参数与 get_items 相同，但只查询展示所需的列，并用一次查询批量补齐标签名。
+        """
+        with self.Session() as session:
+            try:
+                include_deleted = (partition_filter and partition_filter.get('type') == 'trash')
+                q = self._build_query(session, filters, search, selected_tags, sort_mode, date_filter, date_modify_filter, partition_filter, include_deleted=include_deleted, columns=item_record_columns())
+                rows = q.limit(limit).offset(offset).all()
+                log.debug(f"数据库查询：行记录 (limit={limit}, offset={offset}) 返回 {len(rows)} 条。")
+                return self._make_records(session, rows)
+            except Exception as e:
+                log.error(f"查询行记录失败: {e}", exc_info=True)
+                return []
+
+    def get_item_records_by_ids(self, ids):
+        """按ID获取轻量行记录 (不含已删除项目)，返回顺序与 ids 一致"""
+        if not ids:
+            return []
+        with self.Session() as session:
+            try:
+                rows = []
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    rows.extend(session.query(*item_record_columns()).filter(ClipboardItem.id.in_(chunk), ClipboardItem.is_deleted != True).all())
+                order = {item_id: i for i, item_id in enumerate(ids)}
+                rows.sort(key=lambda row: order[row[0]])
+                return self._make_records(session, rows)
+            except Exception as e:
+                log.error(f"按ID查询行记录失败: {e}", exc_info=True)
+                return []
+
+    def get_item(self, item_id):
+        """获取单个完整的剪贴板项 (含二进制数据)"""
+        with self.Session() as session:
+            try:
+                return session.query(ClipboardItem).options(joinedload(ClipboardItem.tags)).filter(ClipboardItem.id == item_id).first()
+            except Exception as e:
+                log.error(f"获取项目 {item_id} 失败: {e}", exc_info=True)
+                return None
+
+    def find_item_by_payload_hash(self, payload_hash):
+        """按内容哈希查找已存在的项目 (走 payload_hash 索引)，返回ID或None"""
+        with self.Session() as session:
+            try:
+                return session.query(ClipboardItem.id).filter(ClipboardItem.payload_hash == payload_hash).limit(1).scalar()
+            except Exception as e:
+                log.error(f"按内容哈希查找项目失败: {e}", exc_info=True)
+                return None
+
+    def touch_item(self, item_id):
+        """重复捕获已存在的项目时更新访问记录 (与 add_item 遇到重复内容时一致)，返回项目或None"""
+        session = self.get_session()
+        try:
+            item = session.get(ClipboardItem, item_id)
+            if item is None:
+                return None
+            item.last_visited_at = datetime.now()
+            item.modified_at = datetime.now()
+            item.visit_count = (item.visit_count or 0) + 1
+            session.commit()
+            session.refresh(item)
+            return item
+        except Exception as e:
+            log.error(f"更新项目 {item_id} 访问记录失败: {e}")
+            session.rollback()
+            return None
+        finally:
+            session.close()
+
+    def bump_visits(self, visits):
+        """
+        批量写入延迟的访问记录 (最近内容缓存命中时不逐次写库)
+        Args:
+            visits: {项目ID: (新增访问次数, 最后访问时间)}
+        Returns:
+            int: 实际更新的项目数 (项目已被删除时不计)
+        """
+        if not visits:
+            return 0
+        table = ClipboardItem.__table__
+        stmt = table.update().where(table.c.id == bindparam('b_id')).values(
+            visit_count=func.coalesce(table.c.visit_count, 0) + bindparam('b_count'),
+            last_visited_at=bindparam('b_when'),
+            modified_at=bindparam('b_when'))
+        session = self.get_session()
+        try:
+            result = session.execute(stmt, [{'b_id': i, 'b_count': c, 'b_when': w} for i, (c, w) in visits.items()])
+            session.commit()
+            return result.rowcount
+        except Exception as e:
+            log.error(f"批量更新访问记录失败: {e}")
+            session.rollback()
+            return 0
+        finally:
+            session.close()
+
+    def get_item_payload(self, item_id):
+        """读取粘贴所需的完整内容 (PayloadRecord)，不加载 ORM 对象和标签"""
+        with self.Session() as session:
+            try:
+                row = session.query(
+                    ClipboardItem.id, ClipboardItem.item_type, ClipboardItem.content,
+                    ClipboardItem.file_path, ClipboardItem.data_blob, ClipboardItem.modified_at
+                ).filter(ClipboardItem.id == item_id).first()
+                if row is None:
+                    return None
+                record = PayloadRecord(row)
+                full_text = self._load_overflow_text(session, item_id)
+                if full_text is not None:
+                    record.content = full_text
+                return record
+            except Exception as e:
+                log.error(f"读取项目 {item_id} 内容失败: {e}", exc_info=True)
+                return None
+
+    @staticmethod
+    def _load_overflow_text(session, item_id):
+        """解压超大文本的完整正文，不是超大文本时返回 None"""
+        row = session.query(TextOverflow.codec, TextOverflow.data).filter(TextOverflow.item_id == item_id).first()
+        if row is None:
+            return None
+        codec, data = row
+        if codec != 'zlib':
+            raise ValueError(f"未知的文本编码: {codec}")
+        return zlib.decompress(data).decode('utf-8')
+
+    def get_full_text(self, item_id):
+        """项目的完整文本 (超大文本从 text_overflow 解压)，项目不存在时返回 None"""
+        with self.Session() as session:
+            try:
+                full_text = self._load_overflow_text(session, item_id)
+                if full_text is not None:
+                    return full_text
+                return session.query(ClipboardItem.content).filter(ClipboardItem.id == item_id).scalar()
+            except Exception as e:
+                log.error(f"读取项目 {item_id} 完整文本失败: {e}", exc_info=True)
+                return None
+
+    def get_item_detail(self, item_id):
+        """获取详情面板所需的字段 (不含二进制数据)，返回 dict 或 None"""
+        with self.Session() as session:
+            try:
+                row = session.query(
+                    ClipboardItem.content, ClipboardItem.note, ClipboardItem.item_type,
+                    ClipboardItem.image_path, ClipboardItem.file_path, ClipboardItem.partition_id
+                ).filter(ClipboardItem.id == item_id).first()
+                if not row:
+                    return None
+                tags = [name for name, in session.query(Tag.name).join(item_tags).filter(item_tags.c.item_id == item_id)]
+                return {
+                    'content': row[0], 'note': row[1] or "", 'item_type': row[2],
+                    'image_path': row[3], 'file_path': row[4], 'partition_id': row[5],
+                    'tags': tags,
+                }
+            except Exception as e:
+                log.error(f"获取项目详情 {item_id} 失败: {e}", exc_info=True)
+                return None
+
+    def get_item_blob(self, item_id):
+        """只读取项目的二进制数据"""
+        with self.Session() as session:
+            try:
+                return session.query(ClipboardItem.data_blob).filter(ClipboardItem.id == item_id).scalar()
+            except Exception as e:
+                log.error(f"读取项目 {item_id} 二进制数据失败: {e}", exc_info=True)
+                return None
+
+    def get_recompress_candidates(self, codecs, min_bytes, limit=20):
+        """
+        需要后台重新压缩的图片 [(item_id, blob_codec)]
+        codecs 中的 None 表示旧数据 (没有编码标记，均为默认级别的 PNG)
+        """
+        with self.Session() as session:
+            try:
+                known = [c for c in codecs if c is not None]
+                codec_filter = ClipboardItem.blob_codec.in_(known)
+                if None in codecs:
+                    codec_filter = or_(codec_filter, ClipboardItem.blob_codec == None)
+                rows = session.query(ClipboardItem.id, ClipboardItem.blob_codec).filter(
+                    ClipboardItem.item_type == 'image',
+                    codec_filter,
+                    func.length(ClipboardItem.data_blob) >= min_bytes
+                ).order_by(ClipboardItem.id.desc()).limit(limit).all()
+                return [tuple(row) for row in rows]
+            except Exception as e:
+                log.error(f"查询待重新压缩的图片失败: {e}", exc_info=True)
+                return []
+
+    def replace_item_blob(self, item_id, expected_codec, expected_size, blob_codec, data_blob=None):
+        """
+        原子地替换项目的 data_blob 和编码标记 (data_blob 为 None 时只更新编码标记)
+        只有编码和大小仍与读取时一致才会替换，避免覆盖期间被修改的数据。
+        像素内容不变，因此不递增 data_version，界面缓存无需失效。
+        Returns:
+            bool: 是否替换成功
+        """
+        session = self.get_session()
+        try:
+            values = {'blob_codec': blob_codec}
+            if data_blob is not None:
+                values['data_blob'] = data_blob
+            codec_match = (ClipboardItem.blob_codec == None) if expected_codec is None \
+                else (ClipboardItem.blob_codec == expected_codec)
+            stmt = update(ClipboardItem).where(
+                ClipboardItem.id == item_id,
+                codec_match,
+                func.length(ClipboardItem.data_blob) == expected_size
+            ).values(**values)
+            result = session.execute(stmt, execution_options={'skip_data_version': True, 'synchronize_session': False})
+            session.commit()
+            return result.rowcount == 1
+        except Exception as e:
+            log.error(f"替换项目 {item_id} 的二进制数据失败: {e}")
+            session.rollback()
+            return False
+        finally:
+            session.close()
+
+    # ==============================================================================
+    # 多文件捕获的内容存储 (file_blobs 表，按内容哈希去重)
+    # ==============================================================================
+
+    @staticmethod
+    def _link_file_blobs(session, item_id, file_blobs):
+        """写入尚未存储的文件内容并记录项目的引用 (与项目在同一事务中)"""
+        rows = [{'hash': h, 'size': len(data), 'data': data} for h, data in file_blobs.items() if data is not None]
+        if rows:
+            session.execute(sqlite_insert(FileBlob).on_conflict_do_nothing(index_elements=['hash']), rows)
+        session.execute(sqlite_insert(item_file_blobs).on_conflict_do_nothing(),
+                        [{'item_id': item_id, 'blob_hash': h} for h in file_blobs])
+
+    @staticmethod
+    def _purge_orphans(session):
+        """永久删除项目后清理：已不存在的项目的超大文本正文和文件引用，以及不再被任何项目引用的文件内容"""
+        session.query(TextOverflow).filter(
+            ~exists().where(ClipboardItem.id == TextOverflow.item_id)
+        ).delete(synchronize_session=False)
+        session.execute(item_file_blobs.delete().where(
+            ~exists().where(ClipboardItem.id == item_file_blobs.c.item_id)))
+        session.query(FileBlob).filter(
+            ~exists().where(item_file_blobs.c.blob_hash == FileBlob.hash)
+        ).delete(synchronize_session=False)
+
+    def find_file_blobs(self, hashes):
+        """返回已存储的文件内容哈希集合"""
+        found = set()
+        with self.Session() as session:
+            try:
+                hashes = list(hashes)
+                for start in range(0, len(hashes), 500):
+                    chunk = hashes[start:start + 500]
+                    found.update(h for h, in session.query(FileBlob.hash).filter(FileBlob.hash.in_(chunk)))
+            except Exception as e:
+                log.error(f"查询文件内容失败: {e}", exc_info=True)
+        return found
+
+    def get_file_blob(self, blob_hash):
+        """读取一个文件的内容，不存在时返回 None"""
+        with self.Session() as session:
+            try:
+                return session.query(FileBlob.data).filter(FileBlob.hash == blob_hash).scalar()
+            except Exception as e:
+                log.error(f"读取文件内容 {blob_hash} 失败: {e}", exc_info=True)
+                return None
+
+    def get_item_files(self, item_id):
+        """读取文件项目的 (file_path, file_manifest, data_blob)，不存在时返回 None"""
+        with self.Session() as session:
+            try:
+                row = session.query(ClipboardItem.file_path, ClipboardItem.file_manifest, ClipboardItem.data_blob).filter(
+                    ClipboardItem.id == item_id).first()
+                return tuple(row) if row else None
+            except Exception as e:
+                log.error(f"读取项目 {item_id} 的文件数据失败: {e}", exc_info=True)
+                return None
+
+    def get_thumbnail_blobs(self, item_ids):
+        """批量读取缩略图二进制数据 {item_id: thumbnail_blob}，没有缩略图的项目不在结果中"""
+        result = {}
+        with self.Session() as session:
+            try:
+                for start in range(0, len(item_ids), 500):
+                    chunk = item_ids[start:start + 500]
+                    rows = session.query(ClipboardItem.id, ClipboardItem.thumbnail_blob).filter(
+                        ClipboardItem.id.in_(chunk), ClipboardItem.thumbnail_blob != None)
+                    result.update(rows)
+            except Exception as e:
+                log.error(f"读取缩略图失败: {e}", exc_info=True)
+        return result
+
+    def _make_records(self, session, rows):
+        """将列查询结果转换为 ItemRecord，并批量补齐标签名"""
+        if not rows:
+            return []
+        tag_map = {}
+        ids = [row[0] for row in rows]
+        # 分批查询，避免超出 SQLite 的参数个数限制
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            tag_rows = session.query(item_tags.c.item_id, Tag.name).join(Tag).filter(item_tags.c.item_id.in_(chunk)).all()
+            for item_id, name in tag_rows:
+                tag_map.setdefault(item_id, []).append(name)
+        return [ItemRecord(row, tag_map.get(row[0], ())) for row in rows]
+
     def get_count(self, filters=None, search="", selected_tags=None, date_filter=None, date_modify_filter=None, partition_filter=None):
         """获取符合条件的项目总数"""
         with self.Session() as session:
@@ -436,13 +953,20 @@ class DBManager:
                 return 0
 
     def update_item(self, item_id, **kwargs):
-        """更新剪贴板项属性"""
+        """更新剪贴板项属性 (修改 content 时，超大文本的溢出正文一并删除，编辑后的正文直接存入 content)"""
         with self.Session() as session:
             try:
                 item = session.query(ClipboardItem).get(item_id)
                 if item:
                     for k, v in kwargs.items():
                         setattr(item, k, v)
+                    if 'content' in kwargs:
+                        overflow = session.get(TextOverflow, item_id)
+                        if overflow is not None:
+                            # 旧正文及其哈希已不再代表该项目，否则会读出旧正文，重新复制旧正文时也会被当作重复
+                            session.delete(overflow)
+                            item.content_size = None
+                            item.payload_hash = None
                     session.commit()
                     return True
                 return False
@@ -460,12 +984,17 @@ class DBManager:
                     ClipboardItem.is_locked == False
                 ).all()
 
+                newly_trashed = [item.id for item in items_to_trash if not item.is_deleted]
+                deltas = self._count_item_tags(session, newly_trashed)
+
                 for item in items_to_trash:
                     item.original_partition_id = item.partition_id
                     item.partition_id = None
                     item.is_deleted = True
                 
+                self._adjust_tag_usage(session, {t: -c for t, c in deltas.items()})
                 session.commit()
+                self._sync_tag_usage(session, deltas.keys())
             except Exception as e:
                 log.error(f"移动到回收站失败: {e}")
                 session.rollback()
@@ -481,6 +1010,7 @@ class DBManager:
 
                 # 2. 一次性获取所有现存的分区ID，以提高效率
                 existing_partition_ids = {p_id for p_id, in session.query(Partition.id).all()}
+                deltas = self._count_item_tags(session, [item.id for item in items_to_restore if item.is_deleted])
 
                 for item in items_to_restore:
                     item.is_deleted = False
@@ -496,7 +1026,9 @@ class DBManager:
                     # 清空临时记录
                     item.original_partition_id = None
                 
+                self._adjust_tag_usage(session, deltas)
                 session.commit()
+                self._sync_tag_usage(session, deltas.keys())
             except Exception as e:
                 log.error(f"从回收站恢复失败: {e}")
                 session.rollback()
@@ -505,10 +1037,17 @@ class DBManager:
         """永久删除项目"""
         with self.Session() as session:
             try:
+                # 回收站中的项目已经扣减过统计，这里只扣减未删除的项目
+                live_ids = [i for i, in session.query(ClipboardItem.id).filter(ClipboardItem.id.in_(ids), ClipboardItem.is_deleted != True)]
+                deltas = self._count_item_tags(session, live_ids)
                 session.query(ClipboardItem).filter(
                     ClipboardItem.id.in_(ids)
                 ).delete(synchronize_session=False)
+                self._purge_orphans(session)
+                self._adjust_tag_usage(session, {t: -c for t, c in deltas.items()})
                 session.commit()
+                self.purge_version += 1
+                self._sync_tag_usage(session, deltas.keys())
             except Exception as e:
                 log.error(f"永久删除失败: {e}")
                 session.rollback()
@@ -626,25 +1165,26 @@ class DBManager:
                 if not items:
                     return
 
+                deltas = {}
                 for name in tag_names:
                     name = name.strip()
                     if not name:
                         continue
                     
                     # 查找或创建标签
-                    tag = session.query(Tag).filter_by(name=name).first()
-                    if not tag:
-                        tag = Tag(name=name)
-                        session.add(tag)
-                        # 立即刷新以获取 tag.id (如果需要)
-                        session.flush()
+                    tag = self._get_or_create_tag(session, name)
 
                     # 为每个项目关联标签
+                    deltas.setdefault(tag.id, 0)
                     for item in items:
                         if tag not in item.tags:
                             item.tags.append(tag)
+                            if not item.is_deleted:
+                                deltas[tag.id] += 1
                 
+                self._adjust_tag_usage(session, deltas, touch=True)
                 session.commit()
+                self._sync_tag_usage(session, deltas.keys())
             except Exception as e:
                 log.error(f"批量添加标签失败: {e}")
                 session.rollback()
@@ -657,7 +1197,10 @@ class DBManager:
                 tag = session.query(Tag).filter_by(name=tag_name).first()
                 if item and tag and tag in item.tags:
                     item.tags.remove(tag)
+                    if not item.is_deleted:
+                        self._adjust_tag_usage(session, {tag.id: -1})
                     session.commit()
+                    self._sync_tag_usage(session, [tag.id])
             except Exception as e:
                 log.error(f"移除标签失败: {e}")
                 session.rollback()
@@ -667,17 +1210,138 @@ class DBManager:
         with self.Session() as session:
             try:
                 cutoff = datetime.now() - timedelta(days=days)
-                count = session.query(ClipboardItem).filter(
+                old_q = session.query(ClipboardItem).filter(
                     ClipboardItem.created_at < cutoff,
                     ClipboardItem.is_locked == False
-                ).delete(synchronize_session=False)
+                )
+                live_ids = [i for i, in old_q.filter(ClipboardItem.is_deleted != True).with_entities(ClipboardItem.id)]
+                deltas = self._count_item_tags(session, live_ids)
+                count = old_q.delete(synchronize_session=False)
+                self._purge_orphans(session)
+                self._adjust_tag_usage(session, {t: -c for t, c in deltas.items()})
                 session.commit()
+                self.purge_version += 1
+                self._sync_tag_usage(session, deltas.keys())
                 return count
             except Exception as e:
                 log.error(f"清理旧数据失败: {e}")
                 session.rollback()
                 return 0
 
+    # ==============================================================================
+    # 标签使用统计 (tag_usage 表 + 内存镜像)
+    # ==============================================================================
+
+    def get_tag_usage(self):
+        """
+        获取所有标签及其使用数量 [(name, count), ...]
+        直接读取内存镜像，按最近使用时间倒序 (从未使用的排在最后)
+        """
+        rows = sorted(self._tag_usage_snapshot().items(), key=lambda kv: (kv[1][2] is None, -(kv[1][2].timestamp() if kv[1][2] else 0), kv[0]))
+        return [(name, count) for _, (name, count, _) in rows]
+
+    def get_tag_usage_stats(self):
+        """获取所有标签的完整统计 [(name, count, last_used_at), ...]，供标签联想索引计算热度"""
+        return list(self._tag_usage_snapshot().values())
+
+    def _tag_usage_snapshot(self):
+        """内存镜像的副本 (首次调用时加载)"""
+        if self._tag_usage is None:
+            self._load_tag_usage()
+        with self._tag_usage_lock:
+            return dict(self._tag_usage)
+
+    def create_tags(self, tag_names):
+        """创建标签 (已存在的忽略)，返回是否新建了标签"""
+        with self.Session() as session:
+            try:
+                existing = {name for name, in session.query(Tag.name).filter(Tag.name.in_(tag_names))}
+                new_ids = [self._get_or_create_tag(session, name).id for name in tag_names if name not in existing]
+                session.commit()
+                self._sync_tag_usage(session, new_ids)
+                return bool(new_ids)
+            except Exception as e:
+                log.error(f"创建标签失败: {e}")
+                session.rollback()
+                return False
+
+    def _get_or_create_tag(self, session, name):
+        tag = session.query(Tag).filter_by(name=name).first()
+        if not tag:
+            tag = Tag(name=name)
+            session.add(tag)
+            # 立即刷新以获取 tag.id
+            session.flush()
+            session.add(TagUsage(tag_id=tag.id, item_count=0))
+        return tag
+
+    def _count_item_tags(self, session, item_ids):
+        """统计一批项目上各标签出现的次数 {tag_id: count}"""
+        counts = {}
+        for start in range(0, len(item_ids), 500):
+            chunk = item_ids[start:start + 500]
+            rows = session.query(item_tags.c.tag_id, func.count()).filter(item_tags.c.item_id.in_(chunk)).group_by(item_tags.c.tag_id)
+            for tag_id, count in rows:
+                counts[tag_id] = counts.get(tag_id, 0) + count
+        return counts
+
+    def _adjust_tag_usage(self, session, deltas, touch=False):
+        """在调用方的事务内按增量更新 tag_usage，touch=True 时同时刷新最近使用时间"""
+        now = datetime.now()
+        for tag_id, delta in deltas.items():
+            if not delta and not touch:
+                continue
+            usage = session.query(TagUsage).get(tag_id)
+            if usage is None:
+                usage = TagUsage(tag_id=tag_id, item_count=0)
+                session.add(usage)
+            usage.item_count = max(0, (usage.item_count or 0) + delta)
+            if touch:
+                usage.last_used_at = now
+
+    def _sync_tag_usage(self, session, tag_ids):
+        """提交后将指定标签的统计同步到内存镜像"""
+        tag_ids = list(tag_ids)
+        if self._tag_usage is None or not tag_ids:
+            return
+        rows = session.query(Tag.id, Tag.name, TagUsage.item_count, TagUsage.last_used_at).outerjoin(TagUsage, TagUsage.tag_id == Tag.id).filter(Tag.id.in_(tag_ids)).all()
+        with self._tag_usage_lock:
+            for tag_id, name, count, last_used in rows:
+                self._tag_usage[tag_id] = (name, count or 0, last_used)
+
+    def _load_tag_usage(self):
+        with self.Session() as session:
+            try:
+                rows = session.query(Tag.id, Tag.name, TagUsage.item_count, TagUsage.last_used_at).outerjoin(TagUsage, TagUsage.tag_id == Tag.id).all()
+                usage = {tag_id: (name, count or 0, last_used) for tag_id, name, count, last_used in rows}
+            except Exception as e:
+                log.error(f"加载标签统计失败: {e}", exc_info=True)
+                usage = {}
+        with self._tag_usage_lock:
+            if self._tag_usage is None:  # 其他线程可能已先加载完成
+                self._tag_usage = usage
+
+    def _ensure_tag_usage(self):
+        """tag_usage 与 tags 行数不一致时 (新表/旧数据库) 从关联表完整重建一次"""
+        with self.Session() as session:
+            try:
+                if session.query(func.count(TagUsage.tag_id)).scalar() == session.query(func.count(Tag.id)).scalar():
+                    return
+                counts = dict(
+                    session.query(item_tags.c.tag_id, func.count())
+                    .join(ClipboardItem, ClipboardItem.id == item_tags.c.item_id)
+                    .filter(ClipboardItem.is_deleted != True)
+                    .group_by(item_tags.c.tag_id).all()
+                )
+                session.query(TagUsage).delete(synchronize_session=False)
+                for tag_id, in session.query(Tag.id):
+                    session.add(TagUsage(tag_id=tag_id, item_count=counts.get(tag_id, 0)))
+                session.commit()
+                log.info(f"✅ 标签使用统计已重建 ({len(counts)} 个标签有关联项目)")
+            except Exception as e:
+                log.error(f"重建标签统计失败: {e}", exc_info=True)
+                session.rollback()
+
     # ==============================================================================
     # 分区和组管理
     # ==============================================================================
@@ -692,13 +1356,15 @@ class DBManager:
                 # 1. 一次性加载所有分区到会话中
                 all_partitions = session.query(Partition).order_by(Partition.sort_index).all()
                 
-                # 2. 强制加载 children 关系
-                # 通过访问每个分区的 children 属性，SQLAlchemy 的懒加载机制会从
-                # session 中已有的对象里填充这个集合，而不会产生新的数据库查询。
-                # 这一步是解决问题的关键，因为它确保了在 session关闭前，关系被完全建立。
+                # 2. 在内存中组装 children 关系
+                # 直接访问 p.children 会对每个分区触发一次懒加载查询 (N+1)，
+                # 这里按 parent_id 分组后写入已提交状态，不产生任何额外查询。
+                children_map = {p.id: [] for p in all_partitions}
+                for p in all_partitions:
+                    if p.parent_id in children_map:
+                        children_map[p.parent_id].append(p)
                 for p in all_partitions:
-                    # `len()` 是一个访问集合的简单无害方法
-                    len(p.children)
+                    set_committed_value(p, 'children', children_map[p.id])
                 
                 # 3. 筛选出顶层分区（没有父级的分区）并返回
                 top_level_partitions = [p for p in all_partitions if p.parent_id is None]
@@ -715,6 +1381,7 @@ class DBManager:
                 new_partition = Partition(name=name, parent_id=parent_id)
                 session.add(new_partition)
                 session.commit()
+                self.partition_version += 1
                 session.refresh(new_partition)
                 return new_partition
             except Exception as e:
@@ -730,12 +1397,22 @@ class DBManager:
                 if partition:
                     partition.name = new_name
                     session.commit()
+                    self.partition_version += 1
                 return True
             except Exception as e:
                 log.error(f"重命名分区失败: {e}")
                 session.rollback()
                 return False
 
+    def get_partition_links(self):
+        """一次性获取所有分区的 {id: (name, parent_id)}，用于在内存中计算分区路径"""
+        with self.Session() as session:
+            try:
+                return {pid: (name, parent_id) for pid, name, parent_id in session.query(Partition.id, Partition.name, Partition.parent_id)}
+            except Exception as e:
+                log.error(f"获取分区结构失败: {e}", exc_info=True)
+                return {}
+
     def _get_all_descendant_ids(self, session, partition_id):
         """优化：使用递归CTE（公共表表达式）来高效地获取一个分区及其所有子孙分区的ID列表。"""
         # 定义递归查询的起始部分
@@ -770,6 +1447,7 @@ class DBManager:
                 # 3. 删除顶层分区，cascade="all, delete-orphan" 会自动删除所有子孙分区记录
                 session.delete(partition_to_delete)
                 session.commit()
+                self.partition_version += 1
                 return True
             except Exception as e:
                 log.error(f"递归删除分区失败: {e}")
@@ -783,12 +1461,14 @@ class DBManager:
                 partition = session.query(Partition).options(joinedload(Partition.tags)).get(partition_id)
                 if not partition: return
                 partition.tags.clear()
-                for name in [name.strip() for name in tag_names if name.strip()]:
-                    tag = session.query(Tag).filter_by(name=name).first() or Tag(name=name)
-                    session.add(tag)
+                names = [name.strip() for name in tag_names if name.strip()]
+                for name in names:
+                    tag = self._get_or_create_tag(session, name)
                     if tag not in partition.tags:
                         partition.tags.append(tag)
                 session.commit()
+                self.partition_version += 1
+                self._sync_tag_usage(session, [t.id for t in partition.tags])
             except Exception as e:
                 log.error(f"设置分区标签失败: {e}")
                 session.rollback()
@@ -803,6 +1483,88 @@ class DBManager:
                 log.error(f"获取分区标签失败: {e}")
                 return []
 
+    def get_inherited_partition_tags(self):
+        """
+        一次性计算每个分区生效的预设标签 (自身的标签加上所有上级分区的标签)
+        Returns:
+            dict: {partition_id: [标签名]}，没有预设标签的分区不包含在内
+        """
+        with self.Session() as session:
+            try:
+                parents = dict(session.query(Partition.id, Partition.parent_id))
+                own = {}
+                for pid, name in session.query(partition_tags.c.partition_id, Tag.name).join(Tag, Tag.id == partition_tags.c.tag_id):
+                    own.setdefault(pid, []).append(name)
+                result = {}
+                for pid in parents:
+                    names, seen, node = [], set(), pid
+                    while node is not None and node not in seen:  # seen 防止异常数据中的循环引用
+                        seen.add(node)
+                        names.extend(own.get(node, ()))
+                        node = parents.get(node)
+                    if names:
+                        result[pid] = list(dict.fromkeys(names))
+                return result
+            except Exception as e:
+                log.error(f"获取分区继承标签失败: {e}", exc_info=True)
+                return {}
+
+    # ==============================================================================
+    # 自动标签规则
+    # ==============================================================================
+
+    def get_auto_tag_rules(self, include_disabled=False):
+        """返回 [(id, kind, pattern, tag_name, enabled)]"""
+        with self.Session() as session:
+            try:
+                q = session.query(AutoTagRule.id, AutoTagRule.kind, AutoTagRule.pattern, AutoTagRule.tag_name, AutoTagRule.enabled)
+                if not include_disabled:
+                    q = q.filter(AutoTagRule.enabled != False)
+                return [tuple(r) for r in q.order_by(AutoTagRule.id)]
+            except Exception as e:
+                log.error(f"获取自动标签规则失败: {e}", exc_info=True)
+                return []
+
+    def add_auto_tag_rule(self, kind, pattern, tag_name):
+        """添加自动标签规则，返回规则ID"""
+        with self.Session() as session:
+            try:
+                rule = AutoTagRule(kind=kind, pattern=pattern, tag_name=tag_name.strip())
+                session.add(rule)
+                session.commit()
+                self.tag_rule_version += 1
+                return rule.id
+            except Exception as e:
+                log.error(f"添加自动标签规则失败: {e}")
+                session.rollback()
+                return None
+
+    def update_auto_tag_rule(self, rule_id, **kwargs):
+        """更新自动标签规则 (kind/pattern/tag_name/enabled)"""
+        with self.Session() as session:
+            try:
+                rule = session.get(AutoTagRule, rule_id)
+                if rule:
+                    for k, v in kwargs.items():
+                        setattr(rule, k, v)
+                    session.commit()
+                    self.tag_rule_version += 1
+                return rule is not None
+            except Exception as e:
+                log.error(f"更新自动标签规则失败: {e}")
+                session.rollback()
+                return False
+
+    def delete_auto_tag_rule(self, rule_id):
+        with self.Session() as session:
+            try:
+                session.query(AutoTagRule).filter(AutoTagRule.id == rule_id).delete(synchronize_session=False)
+                session.commit()
+                self.tag_rule_version += 1
+            except Exception as e:
+                log.error(f"删除自动标签规则失败: {e}")
+                session.rollback()
+
     def update_partition(self, partition_id, **kwargs):
         """更新分区属性（例如名称、颜色、父级、排序）"""
         with self.Session() as session:
@@ -812,6 +1574,7 @@ class DBManager:
                     for k, v in kwargs.items():
                         setattr(partition, k, v)
                     session.commit()
+                    self.partition_version += 1
                 return True
             except Exception as e:
                 log.error(f"更新分区失败: {e}")
@@ -891,12 +1654,15 @@ class DBManager:
                 if not items_to_restore:
                     return False
                 
+                deltas = self._count_item_tags(session, [item.id for item in items_to_restore if item.is_deleted])
                 for item in items_to_restore:
                     item.is_deleted = False
                     item.partition_id = target_partition_id
                     item.original_partition_id = None
                 
+                self._adjust_tag_usage(session, deltas)
                 session.commit()
+                self._sync_tag_usage(session, deltas.keys())
                 log.info(f"成功恢复并移动 {len(item_ids)} 个项目到分区 {target_partition_id}")
                 return True
             except Exception as e:
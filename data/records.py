@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+轻量行记录
+不依赖 SQLAlchemy，界面层和首屏快照可以在数据库打开之前直接使用。
+"""
+
+
+class ItemRecord:
+    """
+    列表展示用的轻量行记录
+    只包含表格/统计需要的字段，不含二进制数据，也不挂在任何 Session 上，
+    可以安全地在界面层长期持有。
+    """
+    # 与查询列 (database.item_record_columns) 的顺序一致
+    FIELDS = (
+        'id', 'preview', 'size_bytes', 'note', 'star_level',
+        'is_pinned', 'is_favorite', 'is_locked', 'custom_color',
+        'item_type', 'is_file', 'file_path', 'image_path',
+        'url_domain', 'url_title', 'created_at', 'modified_at',
+        'partition_id'
+    )
+    __slots__ = FIELDS + ('tags', 'type_icon')
+
+    # 预览最多保留的字符数 (表格显示 150，Tooltip 500)
+    PREVIEW_CHARS = 500
+
+    def __init__(self, row, tags=()):
+        (self.id, self.preview, self.size_bytes, self.note, self.star_level,
+         self.is_pinned, self.is_favorite, self.is_locked, self.custom_color,
+         self.item_type, self.is_file, self.file_path, self.image_path,
+         self.url_domain, self.url_title, self.created_at, self.modified_at,
+         self.partition_id) = row
+        self.preview = self.preview or ""
+        self.size_bytes = self.size_bytes or 0
+        self.note = self.note or ""
+        self.star_level = self.star_level or 0
+        self.tags = tuple(tags)
+        self.type_icon = None  # 由界面层按需计算并缓存
+
+    def nbytes(self):
+        """粗略的内存占用 (对象本身约 400 字节，字符串按 UTF-16 估算)，供内存预算统计"""
+        text = len(self.preview) + len(self.note) + len(self.file_path or "") + len(self.url_title or "")
+        return 400 + text * 2 + sum(len(t) * 2 + 50 for t in self.tags)
+
+    def to_row(self):
+        """还原为构造时的行元组 (用于序列化)"""
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+
+class PayloadRecord:
+    """
+    粘贴/复制用的完整内容 (正文、文件路径、二进制数据)
+    由 DBManager.get_item_payload 按ID读取，供 PayloadCache 短期缓存。
+    """
+    __slots__ = ('id', 'item_type', 'content', 'file_path', 'data_blob', 'modified_at')
+
+    def __init__(self, row):
+        (self.id, self.item_type, self.content, self.file_path,
+         self.data_blob, self.modified_at) = row
+        self.item_type = self.item_type or 'text'
+        self.content = self.content or ""
+
+    def nbytes(self):
+        """粗略的内存占用 (正文按 UTF-16 估算)"""
+        return len(self.content) * 2 + len(self.file_path or "") * 2 + len(self.data_blob or b"") + 64
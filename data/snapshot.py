@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+首屏快照
+程序退出时，把默认视图 (全部数据/无筛选/第一页) 最近一次加载的前若干条轻量记录写入本地文件；
+下次启动时在数据库打开之前先用它填充列表，真实数据就绪后再替换。
+只依赖标准库和 ItemRecord，不导入 SQLAlchemy。
+"""
+import os
+import sys
+import pickle
+import logging
+
+from data.records import ItemRecord
+
+log = logging.getLogger("Snapshot")
+
+SNAPSHOT_NAME = 'startup_snapshot.pkl'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ROWS = 100
+
+
+def app_dir():
+    """与数据库文件相同的目录"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(sys.argv[0]))
+
+
+def _snapshot_path():
+    return os.path.join(app_dir(), SNAPSHOT_NAME)
+
+
+def load_first_page():
+    """读取快照，返回 (记录列表, 总数)；不存在或已损坏时返回 ([], 0)"""
+    path = _snapshot_path()
+    if not os.path.exists(path):
+        return [], 0
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('version') != SNAPSHOT_VERSION:
+            return [], 0
+        return [ItemRecord(row, tags) for row, tags in data['rows']], data['total']
+    except Exception as e:
+        log.warning(f"⚠️ 首屏快照读取失败，已忽略: {e}")
+        return [], 0
+
+
+def save_first_page(records, total):
+    """写入快照 (先写临时文件再替换，避免中途退出留下半个文件)"""
+    path = _snapshot_path()
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'total': total,
+        'rows': [(r.to_row(), r.tags) for r in records[:SNAPSHOT_ROWS]],
+    }
+    try:
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception as e:
+        log.warning(f"⚠️ 首屏快照写入失败: {e}")
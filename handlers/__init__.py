@@ -3,7 +3,8 @@
 剪贴板处理器模块
 导出所有处理器类
 """
-from handlers.base_handler import BaseHandler
+from handlers.base_handler import BaseHandler, CapturePayload, RecentContent, register_handler, registered_handlers
+from handlers.snapshot import ClipboardSnapshot
 from handlers.text_handler import TextHandler
 from handlers.file_handler import FileHandler
 from handlers.image_handler import ImageHandler
@@ -11,6 +12,11 @@ from handlers.url_handler import URLHandler
 
 __all__ = [
     'BaseHandler',
+    'CapturePayload',
+    'RecentContent',
+    'ClipboardSnapshot',
+    'register_handler',
+    'registered_handlers',
     'TextHandler',
     'FileHandler',
     'ImageHandler',
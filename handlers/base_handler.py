@@ -2,66 +2,218 @@
 """
 剪贴板处理器基类
 定义所有处理器的抽象接口
+
+处理分为两个阶段，均在捕获流水线的工作线程中执行：
+- prepare(): 提取、编码、计算哈希、生成缩略图等耗时处理，可并行，数据库只做只读查询
+- store(): 按捕获顺序依次执行，去重检查后写入数据库
+处理器读取的是剪贴板快照 (handlers.snapshot.ClipboardSnapshot)，文本、URL 匹配等派生数据在所有处理器间共享。
+
+用 @register_handler 注册的处理器类会被 ClipboardManager 自动创建，新增处理器无需修改管理器。
 """
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from PyQt5.QtCore import QMimeData
+import hashlib
 import logging
+import threading
+
+try:
+    import xxhash  # 可选依赖：安装后使用更快的 xxh3 计算内容哈希
+except ImportError:
+    xxhash = None
 
 log = logging.getLogger("BaseHandler")
 
 
+_HANDLER_CLASSES = []  # 已注册的处理器类 (按注册顺序)
+
+
+def new_hasher():
+    """内容哈希 (xxh3_128，未安装 xxhash 时为 sha1)，十六进制摘要不超过 40 个字符"""
+    return xxhash.xxh3_128() if xxhash is not None else hashlib.sha1()
+
+
+def register_handler(cls):
+    """类装饰器：注册处理器，ClipboardManager 创建时按优先级实例化所有已注册的处理器"""
+    if cls not in _HANDLER_CLASSES:
+        _HANDLER_CLASSES.append(cls)
+    return cls
+
+
+def registered_handlers():
+    """已注册的处理器类列表"""
+    return list(_HANDLER_CLASSES)
+
+
+class CapturePayload:
+    """
+    准备阶段的结果
+    Attributes:
+        fields: DBManager.add_item 的关键字参数
+        dedup_key: 去重键 (二进制内容为内容哈希)，None 表示不去重
+        summary: 新项目写入成功后输出的日志
+        existing_id: 准备阶段已确认内容与该项目相同，保存阶段只更新其访问记录
+    """
+    __slots__ = ('fields', 'dedup_key', 'summary', 'existing_id', '_recent_key')
+
+    def __init__(self, fields=None, dedup_key=None, summary=None, existing_id=None):
+        self.fields = fields
+        self.dedup_key = dedup_key
+        self.summary = summary
+        self.existing_id = existing_id
+        self._recent_key = None
+
+    def recent_key(self):
+        """
+        最近内容缓存 (RecentContent) 的键，与数据库按 content_hash 去重的口径一致：
+        有内容哈希时按哈希，否则按显示文本的哈希；不去重时返回 None
+        """
+        if self._recent_key is None and self.dedup_key is not None:
+            payload_hash = self.fields.get('payload_hash') if self.fields else self.dedup_key
+            if payload_hash:
+                self._recent_key = f"payload:{payload_hash}"
+            else:
+                h = new_hasher()
+                h.update(self.fields['text'].encode('utf-8'))
+                self._recent_key = f"text:{h.hexdigest()}"
+        return self._recent_key
+
+
+class RecentContent:
+    """
+    最近捕获内容的 LRU {RecentContent 键: 项目ID}，所有处理器共享 (由 ClipboardManager 注入)
+    在两段内容之间来回复制时，重复的内容直接在内存中命中，无需查询和写入数据库。
+    线程安全：准备阶段和保存阶段的工作线程都会读写。
+    """
+
+    CAPACITY = 256
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item_id = self._items.get(key)
+            if item_id is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item_id
+
+    def peek(self, key):
+        """查找但不计入命中统计、不调整顺序 (准备阶段的提前检查用；命中统计只在保存阶段计一次)"""
+        with self._lock:
+            return self._items.get(key)
+
+    def put(self, key, item_id):
+        with self._lock:
+            self._items[key] = item_id
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._items), 'hits': self.hits, 'misses': self.misses}
+
+
 class BaseHandler(ABC):
     """剪贴板处理器抽象基类"""
-    
+
     def __init__(self, priority=100):
         """
         初始化处理器
-        
+
         Args:
             priority: 处理器优先级，数字越小优先级越高
         """
         self.priority = priority
-        self.last_content = ""  # 用于去重
-    
+        self.recent = RecentContent()  # 最近捕获的内容，ClipboardManager 会替换为所有处理器共享的实例
+        self.on_progress = None  # 耗时处理的进度回调 on_progress(标签, 已完成字节, 总字节)，在工作线程中调用
+        self.log = logging.getLogger(self.__class__.__name__)
+
     @abstractmethod
     def can_handle(self, mime_data: QMimeData) -> bool:
         """
         判断是否能处理该剪贴板数据
-        
+
         Args:
-            mime_data: Qt剪贴板数据对象
-            
+            mime_data: 剪贴板快照 (ClipboardSnapshot)
+
         Returns:
             bool: True表示可以处理，False表示不能处理
         """
         pass
-    
+
     @abstractmethod
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
+    def prepare(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
         """
-        处理剪贴板数据
-        
+        准备阶段：完成所有耗时处理 (不写数据库)
+
         Args:
-            mime_data: Qt剪贴板数据对象
-            db_manager: 数据库管理器实例
-            partition_info: (可选) 分区信息 {'type': 'group'/'partition', 'id': ID}
-            
+            mime_data: 剪贴板快照 (ClipboardSnapshot)
+            db_manager: 数据库管理器实例 (只用于查询)
+            partition_info: (可选) 分区信息 {'type': 'partition', 'id': ID}
+
         Returns:
-            Tuple[Optional[ClipboardItem], bool]: (新项目, 是否为新)
+            Optional[CapturePayload]: 需要保存的数据，None 表示跳过
         """
         pass
-    
-    def _is_duplicate(self, content: str) -> bool:
+
+    def store(self, payload: CapturePayload, db_manager):
         """
-        检查内容是否重复
-        
-        Args:
-            content: 要检查的内容
-            
+        保存阶段：按捕获顺序调用，写入数据库 (内容已存在时只更新其访问记录)，并记入最近内容缓存
+
+        Returns:
+            Tuple[Optional[ClipboardItem], bool]: (新项目, 是否为新)
+        """
+        key = payload.recent_key()
+        if payload.existing_id is not None:
+            item, is_new = db_manager.touch_item(payload.existing_id), False
+        else:
+            item, is_new = db_manager.add_item(**payload.fields)
+            if is_new and payload.summary:
+                self.log.info(payload.summary)
+        if key is not None:
+            if item is not None:
+                self.recent.put(key, item.id)
+            else:
+                self.recent.discard(key)  # 记住的项目已被彻底删除：忘掉它，下次复制时重新捕获
+        return item, is_new
+
+    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
+        """
+        同步处理剪贴板数据 (prepare + store)，传入 QMimeData 时先创建快照
+
         Returns:
-            bool: True表示重复，False表示不重复
+            Tuple[Optional[ClipboardItem], bool]: (新项目, 是否为新)
         """
-        if content == self.last_content:
-            return True
-        self.last_content = content
-        return False
+        try:
+            from handlers.snapshot import ClipboardSnapshot
+            if not isinstance(mime_data, ClipboardSnapshot):
+                mime_data = ClipboardSnapshot(mime_data)
+            payload = self.prepare(mime_data, db_manager, partition_info)
+            if payload is None:
+                return None, False
+            return self.store(payload, db_manager)
+        except Exception as e:
+            self.log.error(f"处理失败: {e}", exc_info=True)
+            return None, False
+
+    @staticmethod
+    def _partition_id(partition_info):
+        """新项目应归属的分区ID (仅当选中的是用户分区时)"""
+        return partition_info.get('id') if partition_info and partition_info.get('type') == 'partition' else None
@@ -1,97 +1,287 @@
 # -*- coding: utf-8 -*-
 """
 文件处理器
-处理文件剪贴板数据，将单个或多个文件打包存入数据库
+处理文件剪贴板数据 (文件和文件夹)：
+- 总大小不超过阈值时，单个文件原样存入数据库；多个文件或文件夹保存为清单，
+  每个文件的内容按哈希存入去重的 file_blobs 表 (重复复制相同的文件不会重复存储)，
+  导出或需要粘贴为压缩包时才由 services.file_archive 还原为 ZIP
+- 超过阈值时只保存引用清单 (路径、大小、修改时间、内容哈希)，不保存文件内容
+文件按块流式读取并同时计算哈希。
 """
+import io
 import logging
 import os
-import io
+import json
+import time
 import zipfile
-from PyQt5.QtCore import QMimeData
-from handlers.base_handler import BaseHandler
+from handlers.base_handler import BaseHandler, CapturePayload, new_hasher, register_handler
+from handlers.snapshot import ClipboardSnapshot
 
 log = logging.getLogger("FileHandler")
 
 
+class FileCapturePolicy:
+    """
+    文件捕获策略
+    Attributes:
+        inline_max_bytes: 文件总大小超过该值时只保存引用
+        chunk_size: 每次读取的块大小
+    """
+
+    def __init__(self, inline_max_bytes=32 * 1024 * 1024, chunk_size=1024 * 1024):
+        self.inline_max_bytes = inline_max_bytes
+        self.chunk_size = chunk_size
+
+
+class FileEntry:
+    """待捕获的一个文件 (文件夹展开后的每个文件)"""
+    __slots__ = ('path', 'arcname', 'size', 'mtime', 'hash')
+
+    def __init__(self, path, arcname, size, mtime):
+        self.path = path
+        self.arcname = arcname
+        self.size = size
+        self.mtime = mtime
+        self.hash = None
+
+    def to_manifest(self):
+        return {'path': self.path, 'name': self.arcname, 'size': self.size, 'mtime': self.mtime, 'hash': self.hash}
+
+
+class _Progress:
+    """按字节累计的进度，限制回调频率"""
+    INTERVAL = 0.2
+
+    def __init__(self, callback, label, total):
+        self.callback = callback
+        self.label = label
+        self.total = total
+        self.done = 0
+        self._last = 0.0
+
+    def advance(self, nbytes):
+        self.done += nbytes
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if now - self._last >= self.INTERVAL:
+            self._last = now
+            self.callback(self.label, self.done, self.total)
+
+    def finish(self):
+        if self.callback is not None:
+            self.callback(self.label, self.total, self.total)
+
+
+def stored_files_hash(file_path, data):
+    """
+    旧版本入库的文件内容 (单个文件原样保存，多个文件打包为 ZIP) 按当前捕获方式计算的内容哈希，
+    用于给旧数据补充 payload_hash；包含文件夹或内容与路径列表对不上时返回 None
+    """
+    paths = [p for p in (file_path or "").split(';') if p]
+    if not paths or not data:
+        return None
+    if len(paths) == 1:
+        entry = FileEntry(paths[0], os.path.basename(paths[0]), len(data), 0)
+        h = new_hasher()
+        h.update(data)
+        entry.hash = h.hexdigest()
+        return FileHandler._combined_hash([entry], [])
+    entries = []
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        members = zf.infolist()
+        if len(members) != len(paths) or any(m.is_dir() for m in members):
+            return None  # 旧版本只写入了文件夹本身，无法还原其内容
+        for path, member in zip(paths, members):
+            if member.filename != os.path.basename(path):
+                return None
+            entry = FileEntry(path, member.filename, member.file_size, 0)
+            h = new_hasher()
+            with zf.open(member) as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            entry.hash = h.hexdigest()
+            entries.append(entry)
+    return FileHandler._combined_hash(entries, [])
+
+
+@register_handler
 class FileHandler(BaseHandler):
-    """文件处理器 (支持多文件打包)"""
-    
-    def __init__(self):
+    """文件处理器 (支持多文件、文件夹和大文件引用)"""
+
+    def __init__(self, policy=None):
         super().__init__(priority=20)
-    
-    def can_handle(self, mime_data: QMimeData) -> bool:
+        self.policy = policy or FileCapturePolicy()
+
+    def can_handle(self, mime_data: ClipboardSnapshot) -> bool:
         """判断剪贴板中是否有本地文件"""
-        if not mime_data.hasUrls():
-            return False
-        
-        # 检查并确认至少有一个URL是本地文件
-        for url in mime_data.urls():
-            if url.isLocalFile():
-                return True
-        return False
-    
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
-        """处理文件，将单个文件或多个文件的ZIP包存入数据库"""
+        return bool(mime_data.local_files())
+
+    def prepare(self, mime_data: ClipboardSnapshot, db_manager, partition_info: dict = None):
+        """流式读取文件并计算哈希：小文件存入内容 (多个文件按哈希分别存储)，大文件只保存引用"""
         try:
-            local_files = [u.toLocalFile() for u in mime_data.urls() if u.isLocalFile()]
-            
+            local_files = mime_data.local_files()
+
             if not local_files:
-                return None, False
-            
+                return None
+
             # --- 生成UI显示文本 ---
-            filenames = [os.path.basename(p) for p in local_files]
+            filenames = [os.path.basename(p.rstrip('/\\')) for p in local_files]
             if len(local_files) == 1:
-                display_text = f"文件: {filenames[0]}"
+                kind = "文件夹" if os.path.isdir(local_files[0]) else "文件"
+                display_text = f"{kind}: {filenames[0]}"
             else:
                 display_text = f"压缩包 ({len(filenames)}个文件): {', '.join(filenames)}"
-            
+
             # 智能截断，避免过长
             if len(display_text) > 150:
                  display_text = f"压缩包 ({len(filenames)}个文件): {filenames[0]}, {filenames[1]}..."
 
-            # --- 去重检查 (基于生成的显示文本) ---
-            if self._is_duplicate(display_text):
-                log.debug("文件组合重复，跳过")
-                return None, False
-            
+            entries, folders = self._collect_entries(local_files)
+            if not entries and not folders:
+                log.warning("没有可读取的文件")
+                return None
+            total = sum(e.size for e in entries)
+            progress = _Progress(self.on_progress, filenames[0] if len(filenames) == 1 else display_text, total)
+
             # --- 处理文件数据 ---
             file_blob = None
-            if len(local_files) == 1:
-                # 单个文件: 直接读取二进制内容
-                log.info(f"读取单个文件: {local_files[0]}")
-                with open(local_files[0], 'rb') as f:
-                    file_blob = f.read()
+            file_blobs = None
+            by_reference = total > self.policy.inline_max_bytes
+            if by_reference:
+                # 超过阈值: 只计算哈希，保存引用
+                log.info(f"文件总大小 {total / 1024 / 1024:.1f}MB 超过阈值，只保存引用")
+            else:
+                log.info(f"读取 {len(entries)} 个文件...")
+            read = self._read_entries(entries, progress, keep=not by_reference)
+            if len(read) < len(entries):
+                # 读取失败的文件不进入清单和哈希
+                entries = [entry for entry, _ in read]
+                if not entries and not folders:
+                    log.warning("没有可读取的文件")
+                    return None
+            if by_reference:
+                pass  # 引用只需要哈希
+            elif len(local_files) == 1 and not folders:
+                # 单个文件: 原样存入
+                file_blob = bytes(read[0][1])
             else:
-                # 多个文件: 在内存中创建ZIP压缩包
-                log.info(f"打包 {len(local_files)} 个文件到内存ZIP...")
-                mem_zip = io.BytesIO()
-                with zipfile.ZipFile(mem_zip, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
-                    for file_path in local_files:
-                        zf.write(file_path, arcname=os.path.basename(file_path))
-                mem_zip.seek(0)
-                file_blob = mem_zip.read()
-            
-            if not file_blob:
-                log.warning("未能成功生成文件或压缩包的二进制数据")
-                return None, False
-
-            # --- 存入数据库 ---
-            partition_id = partition_info.get('id') if partition_info and partition_info.get('type') == 'partition' else None
-            
-            item, is_new = db_manager.add_item(
-                text=display_text,
-                item_type='file',
-                is_file=True,
-                file_path=';'.join(local_files),  # 存储原始路径列表，用分号分隔
-                data_blob=file_blob,              # 存储实际的文件二进制数据或ZIP数据
-                partition_id=partition_id
+                # 多个文件或文件夹: 按内容哈希分别存储，已存储过的文件只记录引用
+                file_blobs = {}
+                for entry, data in read:
+                    file_blobs.setdefault(entry.hash, bytes(data))
+                if db_manager is not None:
+                    for h in db_manager.find_file_blobs(list(file_blobs)):
+                        file_blobs[h] = None  # 内容已存储，不再重复写入
+            progress.finish()
+
+            manifest = None
+            if by_reference or file_blobs is not None:
+                manifest = json.dumps({'folders': folders, 'files': [e.to_manifest() for e in entries],
+                                       'stored': not by_reference}, ensure_ascii=False)
+
+            content_hash = self._combined_hash(entries, folders)
+            return CapturePayload(
+                fields=dict(
+                    text=display_text,
+                    item_type='file',
+                    is_file=True,
+                    file_path=';'.join(local_files),  # 存储原始路径列表，用分号分隔
+                    data_blob=file_blob,              # 单个文件的内容；多文件和只保存引用时为 None
+                    file_manifest=manifest,
+                    file_blobs=file_blobs,
+                    partition_id=self._partition_id(partition_info),
+                    payload_hash=content_hash
+                ),
+                dedup_key=content_hash,  # 基于文件内容去重
+                summary=f"✅ 成功捕获 {len(entries)} 个文件到数据库" + (" (仅引用)" if by_reference else "")
             )
-            
-            if is_new:
-                log.info(f"✅ 成功捕获 {len(local_files)} 个文件到数据库")
 
-            return item, is_new
-            
         except Exception as e:
             log.error(f"处理文件剪贴板数据失败: {e}", exc_info=True)
-            return None, False
+            return None
+
+    def store(self, payload, db_manager):
+        """准备阶段认为已存储的文件内容若在此期间被清理，从原文件重新读取后再写入"""
+        file_blobs = payload.fields.get('file_blobs') if payload.fields else None
+        if file_blobs:
+            reused = [h for h, data in file_blobs.items() if data is None]
+            missing = set(reused) - db_manager.find_file_blobs(reused) if reused else set()
+            if missing:
+                manifest = json.loads(payload.fields['file_manifest'])
+                for entry in manifest['files']:
+                    if entry['hash'] in missing and file_blobs[entry['hash']] is None:
+                        try:
+                            with open(entry['path'], 'rb') as f:
+                                data = f.read()
+                        except OSError as e:
+                            log.warning(f"⚠️ 已存储的文件内容被清理且原文件无法读取，放弃本次捕获 {entry['path']}: {e}")
+                            return None, False
+                        h = new_hasher()
+                        h.update(data)
+                        if h.hexdigest() != entry['hash']:
+                            log.warning(f"文件在捕获期间被修改: {entry['path']}")
+                            return None, False
+                        file_blobs[entry['hash']] = data
+        return super().store(payload, db_manager)
+
+    def _collect_entries(self, paths):
+        """展开文件夹，返回 (文件列表, 文件夹在ZIP中的名称列表)；无法读取的文件跳过"""
+        entries, folders = [], []
+        for path in paths:
+            path = path.rstrip('/\\') or path
+            if os.path.isdir(path):
+                base = os.path.dirname(path)
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    folders.append(os.path.relpath(root, base).replace(os.sep, '/'))
+                    for name in sorted(files):
+                        self._add_entry(entries, os.path.join(root, name), base)
+            else:
+                self._add_entry(entries, path, os.path.dirname(path))
+        return entries, folders
+
+    @staticmethod
+    def _add_entry(entries, path, base):
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            log.warning(f"无法读取文件 {path}: {e}")
+            return
+        entries.append(FileEntry(path, os.path.relpath(path, base).replace(os.sep, '/'), st.st_size, int(st.st_mtime)))
+
+    def _read_entries(self, entries, progress, keep):
+        """逐个读取文件，返回 [(entry, 内容或 None)]；无法打开或读取的文件记录警告后跳过"""
+        read = []
+        for entry in entries:
+            try:
+                read.append((entry, self._read_chunks(entry, progress, keep)))
+            except OSError as e:
+                log.warning(f"⚠️ 读取文件失败，已跳过 {entry.path}: {e}")
+        return read
+
+    def _read_chunks(self, entry, progress, keep=False):
+        """按块读取文件并计算哈希 (写入 entry.hash)；keep=True 时返回读取的内容"""
+        h = new_hasher()
+        data = bytearray() if keep else None
+        with open(entry.path, 'rb') as f:
+            while True:
+                chunk = f.read(self.policy.chunk_size)
+                if not chunk:
+                    break
+                h.update(chunk)
+                if keep:
+                    data += chunk
+                progress.advance(len(chunk))
+        entry.hash = h.hexdigest()
+        return data
+
+    @staticmethod
+    def _combined_hash(entries, folders):
+        """所有文件的名称和内容哈希合并后的哈希，作为整个捕获的内容哈希"""
+        h = new_hasher()
+        for folder in folders:
+            h.update(f"{folder}/\n".encode('utf-8'))
+        for entry in entries:
+            h.update(f"{entry.arcname}\0{entry.hash}\n".encode('utf-8'))
+        return h.hexdigest()
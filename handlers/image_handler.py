@@ -6,86 +6,269 @@
 import logging
 import os
 import sys
-import hashlib
+import struct
 from datetime import datetime
-from PyQt5.QtCore import QMimeData, QBuffer, QByteArray, QIODevice
-from PyQt5.QtGui import QImage
-from handlers.base_handler import BaseHandler
+from PyQt5.QtCore import Qt, QMimeData, QBuffer, QByteArray, QIODevice, QSize
+from PyQt5.QtGui import QImage, QImageReader, QImageWriter
+from handlers.base_handler import BaseHandler, CapturePayload, new_hasher, register_handler
 
 log = logging.getLogger("ImageHandler")
 
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# JPEG 的 SOF 标记 (C4/C8/CC 不是帧头)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+MAX_IMAGE_SIDE = 65535
 
+# data_blob 的编码标记 (ClipboardItem.blob_codec)
+CODEC_FAST_PNG = 'png-fast'  # 捕获时的快速 PNG，等待后台重新压缩
+
+
+def probe_image_header(data):
+    """
+    只解析文件头，返回 (格式, 宽, 高)；不是有效的 PNG/JPEG 时返回 None
+    """
+    if len(data) >= 24 and data[:8] == PNG_SIGNATURE and data[12:16] == b'IHDR':
+        width, height = struct.unpack('>II', data[16:24])
+        fmt = 'PNG'
+    elif data[:2] == b'\xff\xd8':
+        width = height = 0
+        fmt = 'JPEG'
+        i = 2
+        while i + 4 <= len(data):
+            if data[i] != 0xFF:
+                return None
+            marker = data[i + 1]
+            if marker == 0xFF:  # 填充字节
+                i += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # 无长度的标记
+                i += 2
+                continue
+            if marker in JPEG_SOF_MARKERS:
+                if i + 9 > len(data):
+                    return None
+                height, width = struct.unpack('>HH', data[i + 5:i + 9])
+                break
+            i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    else:
+        return None
+    if not (0 < width <= MAX_IMAGE_SIDE and 0 < height <= MAX_IMAGE_SIDE):
+        return None
+    return fmt, width, height
+
+
+def bytes_hash(data):
+    """原始编码字节的内容哈希"""
+    h = new_hasher()
+    h.update(data)
+    return h.hexdigest()
+
+
+def pixel_hash(image):
+    """
+    像素缓冲区的内容哈希 (含格式和尺寸)，在编码之前计算
+    通过 memoryview 直接读取 constBits()，不复制像素；
+    每行末尾的对齐填充字节内容不确定，有填充时逐行只取有效部分。
+    """
+    h = new_hasher()
+    h.update(struct.pack('<IIII', int(image.format()), image.width(), image.height(), image.depth()))
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes() if hasattr(image, 'sizeInBytes') else image.byteCount())
+    buf = memoryview(bits)
+    stride = image.bytesPerLine()
+    row = (image.width() * image.depth() + 7) // 8
+    if row == stride:
+        h.update(buf)
+    else:
+        for y in range(image.height()):
+            h.update(buf[y * stride:y * stride + row])
+    return h.hexdigest()
+
+
+def stored_image_hash(data):
+    """
+    旧版本入库的图片 (剪贴板像素编码为 PNG) 解码后的像素哈希，用于给旧数据补充 payload_hash；
+    无法解码时返回 None。解码得到的像素格式与剪贴板提供的格式不同时，与新捕获的哈希不会一致。
+    """
+    image = QImage()
+    if not data or not image.loadFromData(data):
+        return None
+    return pixel_hash(image)
+
+
+def encode_image(image, fmt, quality=-1):
+    """把 QImage 编码为指定格式的字节，失败时返回 b''"""
+    byte_array = QByteArray()
+    buffer = QBuffer(byte_array)
+    buffer.open(QIODevice.WriteOnly)
+    if not image.save(buffer, fmt, quality):
+        return b""
+    return byte_array.data()
+
+
+class ImageCodecPolicy:
+    """
+    图片存储策略
+    捕获时用低压缩级别的 PNG 尽快入库，空闲时再由后台任务 (services.image_recompressor)
+    重新压缩为更紧凑的格式。
+
+    Attributes:
+        capture_quality: 捕获时 PNG 的 quality (Qt 换算为 zlib 级别，80 约为级别 1)
+        target: 重新压缩的目标格式 'auto' (PNG 与无损 WebP 取较小者) / 'png' / 'webp'
+        min_bytes: 小于该大小的图片不重新压缩
+        min_saving: 至少节省的比例，达不到时保留原数据
+    """
+    # 各目标格式的写入参数: PNG 用最高压缩级别，WebP 的 quality 100 为无损模式
+    TARGET_QUALITY = {'png': 0, 'webp': 100}
+
+    def __init__(self, capture_quality=80, target='auto', min_bytes=64 * 1024, min_saving=0.1):
+        self.capture_quality = capture_quality
+        self.target = target
+        self.min_bytes = min_bytes
+        self.min_saving = min_saving
+
+    def target_formats(self):
+        """本机 Qt 支持写入的重新压缩目标格式"""
+        supported = {bytes(f).decode().lower() for f in QImageWriter.supportedImageFormats()}
+        formats = ('png', 'webp') if self.target == 'auto' else (self.target,)
+        return [f for f in formats if f in supported and f in self.TARGET_QUALITY]
+
+
+@register_handler
 class ImageHandler(BaseHandler):
     """图片处理器"""
+
+    THUMB_SIZE = 200
     
-    def __init__(self):
+    def __init__(self, policy=None):
         super().__init__(priority=10)
+        self.policy = policy or ImageCodecPolicy()
     
     def can_handle(self, mime_data: QMimeData) -> bool:
-        """判断是否为图片数据"""
+        """判断是否为图片数据 (mime_data 为 ClipboardSnapshot，接口与 QMimeData 相同)"""
         return mime_data.hasImage()
     
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
-        """处理图片数据"""
+    def prepare(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
+        """编码图片、计算哈希并生成缩略图"""
         try:
+            payload = self._prepare_encoded(mime_data, db_manager, partition_info)
+            if payload is not None:
+                return payload
+
             image = mime_data.imageData()
             if not image or image.isNull():
                 log.warning("图片数据为空")
-                return None, False
+                return None
             
             qimage = QImage(image)
             if qimage.isNull():
                 log.warning("无法解析图片")
-                return None, False
+                return None
 
-            # 将 QImage 转换为二进制数据 (PNG格式)
-            byte_array = QByteArray()
-            buffer = QBuffer(byte_array)
-            buffer.open(QIODevice.WriteOnly)
-            qimage.save(buffer, "PNG")
-            image_blob = byte_array.data()
+            # 编码前先按像素哈希去重：重复复制同一张截图时不再付出编码的代价
+            img_hash = pixel_hash(qimage)
+            existing = self._find_existing(img_hash, db_manager)
+            if existing is not None:
+                return existing
 
-            # 计算哈希用于去重
-            img_hash = hashlib.md5(image_blob).hexdigest()
-            if self._is_duplicate(img_hash):
-                log.debug("图片重复，跳过")
-                return None, False
+            # 将 QImage 转换为二进制数据 (快速 PNG，空闲时由后台重新压缩)
+            image_blob = self._encode_png(qimage, self.policy.capture_quality)
 
             # 生成缩略图的二进制数据
             thumbnail_blob = self._create_thumbnail_blob(qimage)
 
-            partition_id = partition_info.get('id') if partition_info and partition_info.get('type') == 'partition' else None
-            
-            item, is_new = db_manager.add_item(
-                text=f"[图片] {qimage.width()}x{qimage.height()}",
-                item_type='image',
-                is_file=False,
-                data_blob=image_blob,
-                thumbnail_blob=thumbnail_blob,
-                partition_id=partition_id
+            return CapturePayload(
+                fields=dict(
+                    text=f"[图片] {qimage.width()}x{qimage.height()}",
+                    item_type='image',
+                    is_file=False,
+                    data_blob=image_blob,
+                    thumbnail_blob=thumbnail_blob,
+                    partition_id=self._partition_id(partition_info),
+                    payload_hash=img_hash,
+                    blob_codec=CODEC_FAST_PNG
+                ),
+                dedup_key=img_hash,
+                summary=f"✅ 捕获图片: {qimage.width()}x{qimage.height()} ({len(image_blob) / 1024:.1f}KB)"
             )
             
-            if is_new:
-                size_kb = len(image_blob) / 1024
-                log.info(f"✅ 捕获图片: {qimage.width()}x{qimage.height()} ({size_kb:.1f}KB)")
-
-            return item, is_new
-            
         except Exception as e:
             log.error(f"图片处理失败: {e}", exc_info=True)
-            return None, False
+            return None
+
+    def _find_existing(self, payload_hash, db_manager):
+        """
+        先查内存中最近捕获的哈希，再查数据库的 payload_hash 索引；
+        内容已存在时返回只需更新访问记录的结果，否则返回 None
+        """
+        item_id = self.recent.peek(f"payload:{payload_hash}")
+        if item_id is None and db_manager is not None:
+            item_id = db_manager.find_item_by_payload_hash(payload_hash)
+        if item_id is None:
+            return None
+        log.debug(f"图片已存在 (项目 {item_id})，跳过编码")
+        return CapturePayload(dedup_key=payload_hash, existing_id=item_id)
+
+    def _prepare_encoded(self, mime_data, db_manager, partition_info):
+        """
+        来源程序已提供 PNG/JPEG 字节时原样入库：只校验文件头和尺寸，不解码、不重新编码；
+        只有图片大于缩略图尺寸时才解码一次用于生成缩略图。
+        """
+        if not hasattr(mime_data, 'data'):
+            return None
+        for mime_type in ('image/png', 'image/jpeg'):
+            image_blob = bytes(mime_data.data(mime_type))
+            header = probe_image_header(image_blob) if image_blob else None
+            if header is None:
+                continue
+            fmt, width, height = header
+            img_hash = bytes_hash(image_blob)
+            existing = self._find_existing(img_hash, db_manager)
+            if existing is not None:
+                return existing
+            thumbnail_blob = None
+            if width > self.THUMB_SIZE or height > self.THUMB_SIZE:
+                thumbnail_blob = self._thumbnail_from_bytes(image_blob, width, height)
+                if thumbnail_blob is None:
+                    log.warning(f"{fmt} 数据无法解码，改为重新编码")
+                    continue
+            return CapturePayload(
+                fields=dict(
+                    text=f"[图片] {width}x{height}",
+                    item_type='image',
+                    is_file=False,
+                    data_blob=image_blob,
+                    thumbnail_blob=thumbnail_blob,
+                    partition_id=self._partition_id(partition_info),
+                    payload_hash=img_hash,
+                    blob_codec=fmt.lower()
+                ),
+                dedup_key=img_hash,
+                summary=f"✅ 捕获图片: {width}x{height} (原始 {fmt}, {len(image_blob) / 1024:.1f}KB)"
+            )
+        return None
+
+    def _thumbnail_from_bytes(self, image_blob, width, height):
+        """直接按缩略图尺寸解码 (JPEG 可在解码时缩小)，返回 PNG 字节；解码失败返回 None"""
+        buffer = QBuffer()
+        buffer.setData(QByteArray(image_blob))
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer)
+        reader.setScaledSize(QSize(width, height).scaled(self.THUMB_SIZE, self.THUMB_SIZE, Qt.KeepAspectRatio))
+        thumbnail = reader.read()
+        if thumbnail.isNull():
+            return None
+        return self._encode_png(thumbnail)
+
+    @staticmethod
+    def _encode_png(image, quality=-1):
+        return encode_image(image, "PNG", quality)
 
     def _create_thumbnail_blob(self, qimage: QImage) -> bytes:
         """创建缩略图并返回其二进制数据"""
         try:
-            thumb_size = 200
-            thumbnail = qimage.scaled(thumb_size, thumb_size, aspectRatioMode=Qt.KeepAspectRatio, transformMode=Qt.SmoothTransformation)
-            
-            byte_array = QByteArray()
-            buffer = QBuffer(byte_array)
-            buffer.open(QIODevice.WriteOnly)
-            thumbnail.save(buffer, "PNG")
-            return byte_array.data()
+            thumbnail = qimage.scaled(self.THUMB_SIZE, self.THUMB_SIZE, aspectRatioMode=Qt.KeepAspectRatio, transformMode=Qt.SmoothTransformation)
+            return self._encode_png(thumbnail)
         except Exception as e:
             log.error(f"创建缩略图失败: {e}")
             return None
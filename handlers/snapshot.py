@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+剪贴板快照
+GUI 线程把 QMimeData 复制为 ClipboardSnapshot 后，所有处理器都基于同一个快照工作：
+原始数据只复制一次，去除首尾空白的文本、URL 匹配、本地文件列表等派生数据在首次使用时计算并缓存，
+不再由每个处理器的 can_handle/prepare 各自重复计算 (大段文本时每次都是一次完整复制和正则扫描)。
+"""
+import re
+from PyQt5.QtGui import QImage
+
+from handlers.image_handler import probe_image_header
+
+# 来源程序直接提供这些编码格式时，快照保存原始字节，处理器可原样入库而无需重新编码
+RAW_IMAGE_FORMATS = ('image/png', 'image/jpeg')
+
+URL_PATTERN = re.compile(
+    r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b'
+    r'(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)'
+)
+
+_UNSET = object()
+
+
+class ClipboardSnapshot:
+    """
+    剪贴板内容的只读快照 (在 GUI 线程中创建)
+    QClipboard 返回的 QMimeData 只能在 GUI 线程中读取，且下一次剪贴板变化后即失效；
+    快照把处理器需要的数据复制出来 (QImage 为隐式共享，不复制像素)，之后可在工作线程中读取。
+    提供与 QMimeData 相同的读取接口，处理器无需区分两者；text() 每次返回同一个字符串对象。
+
+    剪贴板中有 PNG/JPEG 原始字节时只复制字节，不在 GUI 线程中解码图片；
+    imageData() 首次被调用时才 (在工作线程中) 从字节解码。
+    """
+    __slots__ = ('_formats', '_text', '_urls', '_image', '_raw', '_has_image',
+                 '_stripped', '_url_match', '_local_files')
+
+    def __init__(self, mime_data):
+        self._formats = list(mime_data.formats())
+        self._text = mime_data.text() if mime_data.hasText() else ""
+        self._urls = list(mime_data.urls()) if mime_data.hasUrls() else []
+        self._raw = {}
+        for fmt in RAW_IMAGE_FORMATS:
+            data = bytes(mime_data.data(fmt)) if fmt in self._formats else b""
+            if data and probe_image_header(data):  # 只解析文件头，头部无效时仍走 imageData()
+                self._raw[fmt] = data
+        self._has_image = bool(self._raw) or mime_data.hasImage()
+        if self._raw:
+            self._image = None
+        else:
+            image = mime_data.imageData() if self._has_image else None
+            self._image = QImage(image) if image is not None else QImage()
+        self._stripped = None
+        self._url_match = _UNSET
+        self._local_files = None
+
+    def formats(self):
+        return list(self._formats)
+
+    def hasFormat(self, mime_type):
+        return mime_type in self._formats
+
+    def hasText(self):
+        return bool(self._text)
+
+    def text(self):
+        return self._text
+
+    def hasUrls(self):
+        return bool(self._urls)
+
+    def urls(self):
+        return list(self._urls)
+
+    def data(self, mime_type):
+        """原始字节 (仅文件头有效的 RAW_IMAGE_FORMATS 格式)，没有时返回 b''"""
+        return self._raw.get(mime_type, b"")
+
+    def hasImage(self):
+        return self._has_image
+
+    def imageData(self):
+        if self._image is None:
+            self._image = QImage()
+            for data in self._raw.values():
+                if self._image.loadFromData(data):
+                    break
+        return self._image
+
+    # --- 派生数据 (首次使用时计算并缓存) ---
+    def stripped_text(self):
+        """去除首尾空白后的文本"""
+        if self._stripped is None:
+            self._stripped = self._text.strip()
+        return self._stripped
+
+    def url_match(self):
+        """文本开头的 URL 匹配结果 (re.Match 或 None)"""
+        if self._url_match is _UNSET:
+            text = self.stripped_text()
+            self._url_match = URL_PATTERN.match(text) if text else None
+        return self._url_match
+
+    def local_files(self):
+        """剪贴板中的本地文件路径"""
+        if self._local_files is None:
+            self._local_files = [u.toLocalFile() for u in self._urls if u.isLocalFile()]
+        return self._local_files
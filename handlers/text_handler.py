@@ -2,65 +2,115 @@
 """
 文本处理器
 处理纯文本剪贴板数据（排除URL）
+超过阈值的大段文本 (如日志) 按块编码并计算哈希，正文压缩后存入 text_overflow 表，
+项目行中只保留预览，避免巨大的行和整段复制。
 """
 import logging
-import re
-from PyQt5.QtCore import QMimeData
-from handlers.base_handler import BaseHandler
+import zlib
+from handlers.base_handler import BaseHandler, CapturePayload, new_hasher, register_handler
+from handlers.snapshot import ClipboardSnapshot
 
 log = logging.getLogger("TextHandler")
 
 
+class TextCapturePolicy:
+    """
+    文本捕获策略
+    Attributes:
+        inline_max_chars: 超过该字符数的文本使用压缩的溢出存储
+        preview_chars: 溢出存储时项目中保留的预览字符数
+        chunk_chars: 按块编码/哈希/压缩时每块的字符数
+        compress_level: zlib 压缩级别
+        index_oversized: 是否为超大文本保存完整的搜索文本 (否则只能搜索到预览)
+    """
+
+    def __init__(self, inline_max_chars=512 * 1024, preview_chars=4000, chunk_chars=1024 * 1024,
+                 compress_level=3, index_oversized=False):
+        self.inline_max_chars = inline_max_chars
+        self.preview_chars = preview_chars
+        self.chunk_chars = chunk_chars
+        self.compress_level = compress_level
+        self.index_oversized = index_oversized
+
+
+@register_handler
 class TextHandler(BaseHandler):
     """纯文本处理器"""
-    
-    def __init__(self):
+
+    def __init__(self, policy=None):
         super().__init__(priority=40)  # 最低优先级，作为兜底
-        self.url_pattern = re.compile(
-            r'https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b'
-            r'(?:[-a-zA-Z0-9()@:%_\+.~#?&/=]*)'
-        )
-    
-    def can_handle(self, mime_data: QMimeData) -> bool:
+        self.policy = policy or TextCapturePolicy()
+
+    def can_handle(self, mime_data: ClipboardSnapshot) -> bool:
         """判断是否为纯文本（排除URL）"""
-        if not mime_data.hasText():
-            return False
-        
-        text = mime_data.text().strip()
-        if not text:
-            return False
-        
-        # 如果是URL，交给URL处理器
-        if self.url_pattern.match(text):
+        if not mime_data.stripped_text():
             return False
-        
-        return True
-    
-    def handle(self, mime_data: QMimeData, db_manager, partition_info: dict = None):
+
+        # 如果是URL，交给URL处理器 (匹配结果由快照缓存，与 URLHandler 共享)
+        return mime_data.url_match() is None
+
+    def prepare(self, mime_data: ClipboardSnapshot, db_manager, partition_info: dict = None):
         """处理纯文本"""
         try:
-            text = mime_data.text().strip()
-            
-            # 去重检查
-            if self._is_duplicate(text):
-                log.debug("文本重复，跳过")
-                return None, False
-            
-            partition_id = partition_info.get('id') if partition_info and partition_info.get('type') == 'partition' else None
-            
-            # 保存到数据库
-            item, is_new = db_manager.add_item(
-                text=text,
-                item_type='text',
-                is_file=False,
-                partition_id=partition_id
+            text = mime_data.stripped_text()
+            if len(text) > self.policy.inline_max_chars:
+                return self._prepare_oversized(text, db_manager, partition_info)
+            return CapturePayload(
+                fields=dict(
+                    text=text,
+                    item_type='text',
+                    is_file=False,
+                    partition_id=self._partition_id(partition_info)
+                ),
+                dedup_key=text,
+                summary=f"✅ 捕获文本: {text[:50]}..."
             )
-            
-            if is_new:
-                log.info(f"✅ 捕获文本: {text[:50]}...")
-            
-            return item, is_new
-            
         except Exception as e:
             log.error(f"文本处理失败: {e}", exc_info=True)
-            return None, False
+            return None
+
+    def _chunks(self, text):
+        """按块编码为 UTF-8，避免一次性复制整段文本"""
+        step = self.policy.chunk_chars
+        for start in range(0, len(text), step):
+            yield text[start:start + step].encode('utf-8')
+
+    def _prepare_oversized(self, text, db_manager, partition_info):
+        """超大文本：先按块计算哈希，已存在则只更新访问记录；否则压缩正文，项目中只保留预览"""
+        h = new_hasher()
+        size_bytes = 0
+        for chunk in self._chunks(text):
+            h.update(chunk)
+            size_bytes += len(chunk)
+        text_hash = h.hexdigest()
+
+        existing_id = self.recent.peek(f"payload:{text_hash}")
+        if existing_id is None and db_manager is not None:
+            existing_id = db_manager.find_item_by_payload_hash(text_hash)
+        if existing_id is not None:
+            return CapturePayload(dedup_key=text_hash, existing_id=existing_id)
+
+        compressor = zlib.compressobj(self.policy.compress_level)
+        parts = [compressor.compress(chunk) for chunk in self._chunks(text)]
+        parts.append(compressor.flush())
+        data = b"".join(parts)
+
+        preview = text[:self.policy.preview_chars]
+        return CapturePayload(
+            fields=dict(
+                text=preview,
+                item_type='text',
+                is_file=False,
+                partition_id=self._partition_id(partition_info),
+                payload_hash=text_hash,
+                text_overflow={
+                    'codec': 'zlib',
+                    'data': data,
+                    'size_bytes': size_bytes,
+                    'size_chars': len(text),
+                    'search_text': text if self.policy.index_oversized else None,
+                }
+            ),
+            dedup_key=text_hash,
+            summary=f"✅ 捕获大段文本: {size_bytes / 1024 / 1024:.1f}MB (压缩后 {len(data) / 1024 / 1024:.1f}MB)"
+        )
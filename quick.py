@@ -6,10 +6,11 @@ from ctypes import wintypes
 import time
 import datetime
 import subprocess  # <--- 新增导入，用于启动外部进程
-from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QListWidget, QLineEdit, 
-                             QListWidgetItem, QHBoxLayout, QTreeWidget, QTreeWidgetItem, 
+from types import SimpleNamespace
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QListView, QLineEdit, 
+                             QHBoxLayout, QTreeWidget,
                              QPushButton, QStyle, QAction, QSplitter, QGraphicsDropShadowEffect, QLabel)
-from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, QSettings, QUrl, QMimeData
+from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, QSettings, QUrl, QAbstractListModel, QModelIndex
 from PyQt5.QtGui import QImage, QColor, QCursor
 
 # =================================================================================
@@ -65,10 +66,21 @@ try:
 except ImportError:
     class DBManager:
         def get_items(self, **kwargs): return []
+        def get_item_records(self, **kwargs): return []
+        def get_item_records_by_ids(self, ids): return []
+        def get_item(self, item_id): return None
+        def get_item_payload(self, item_id): return None
+        def get_item_files(self, item_id): return None
         def get_partitions_tree(self): return []
     class ClipboardManager:
         def __init__(self, db_manager): pass
         def process_clipboard(self, mime_data): pass
+from services.recent_index import RecentIndex
+from services.payload_cache import PayloadCache
+from services import file_archive
+from services.clipboard_monitor import ClipboardMonitor, own_mime_data
+from core.shared import get_color_icon
+from ui.partition_tree_sync import PartitionTreeSync
 
 # =================================================================================
 #   样式表
@@ -93,17 +105,17 @@ QLabel#TitleLabel {
     padding-left: 5px;
 }
 
-QListWidget, QTreeWidget {
+QListView, QTreeWidget {
     border: none;
     background-color: #2E2E2E;
     alternate-background-color: #383838;
     outline: none;
 }
-QListWidget::item { padding: 8px; border: none; }
-QListWidget::item:selected, QTreeWidget::item:selected {
+QListView::item { padding: 8px; border: none; }
+QListView::item:selected, QTreeWidget::item:selected {
     background-color: #4D79C4; color: #FFFFFF;
 }
-QListWidget::item:hover { background-color: #444444; }
+QListView::item:hover { background-color: #444444; }
 
 QSplitter::handle { background-color: #444; width: 2px; }
 QSplitter::handle:hover { background-color: #4D79C4; }
@@ -136,6 +148,36 @@ QPushButton#PinButton:hover { background-color: #444; }
 QPushButton#PinButton:checked { background-color: #0078D4; color: white; border: 1px solid #005A9E; }
 """
 
+class QuickListModel(QAbstractListModel):
+    """快速面板列表模型：直接展示 RecentIndex 的条目，不复制任何数据"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []
+
+    def set_entries(self, entries):
+        self.beginResetModel()
+        self._entries = entries
+        self.endResetModel()
+
+    def entry(self, row):
+        return self._entries[row] if 0 <= row < len(self._entries) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._entries[index.row()]
+        if role == Qt.DisplayRole:
+            return entry.display
+        if role == Qt.ToolTipRole:
+            return entry.tooltip[:500] if entry.tooltip else None
+        if role == Qt.UserRole:
+            return entry.id
+        return None
+
 class MainWindow(QWidget):
     RESIZE_MARGIN = 18 
 
@@ -157,9 +199,14 @@ class MainWindow(QWidget):
         # --- Clipboard Manager ---
         self.cm = ClipboardManager(self.db)
         self.clipboard = QApplication.clipboard()
-        self.clipboard.dataChanged.connect(self.on_clipboard_changed)
-        self.cm.data_captured.connect(self._update_list)
-        self._processing_clipboard = False
+        # 剪贴板事件经合并后再捕获 (quick.py 默认不与特定分区关联)，本程序自己写入的内容直接丢弃
+        self.clipboard_monitor = ClipboardMonitor(self.clipboard, self.cm, parent=self)
+        self.cm.item_captured.connect(self._on_item_captured)
+        
+        # --- 常驻内存的最近项目索引 (搜索完全在内存中完成) ---
+        self.recent_index = RecentIndex(self.db)
+        # --- 列表只持有ID和显示字段，粘贴时按ID读取完整内容 (最近用过的几条常驻小缓存) ---
+        self.payload_cache = PayloadCache(self.db)
         
         self._init_ui()
         self._restore_window_state()
@@ -171,12 +218,8 @@ class MainWindow(QWidget):
         self.monitor_timer.timeout.connect(self._monitor_foreground_window)
         self.monitor_timer.start(200)
 
-        self.search_timer = QTimer(self)
-        self.search_timer.setSingleShot(True)
-        self.search_timer.timeout.connect(self._update_list)
-        
         self.search_box.textChanged.connect(self._on_search_text_changed)
-        self.list_widget.itemActivated.connect(self._on_item_activated)
+        self.list_view.activated.connect(self._on_item_activated)
         self.partition_tree.currentItemChanged.connect(self._on_partition_selection_changed)
         
         self.clear_action.triggered.connect(self.search_box.clear)
@@ -190,9 +233,9 @@ class MainWindow(QWidget):
         self.btn_minimize.clicked.connect(self.showMinimized) 
         self.btn_close.clicked.connect(self.close)
         
+        self.recent_index.rebuild()
         self._update_partition_tree()
         self._update_list()
-        self._add_debug_test_item()
 
     def _init_ui(self):
         self.setWindowTitle("Clipboard Pro")
@@ -291,19 +334,23 @@ class MainWindow(QWidget):
         self.splitter = QSplitter(Qt.Horizontal)
         self.splitter.setHandleWidth(4)
         
-        self.list_widget = QListWidget()
-        self.list_widget.setFocusPolicy(Qt.StrongFocus)
-        self.list_widget.setAlternatingRowColors(True)
-        self.list_widget.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.list_widget.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_model = QuickListModel(self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.list_model)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setFocusPolicy(Qt.StrongFocus)
+        self.list_view.setAlternatingRowColors(True)
+        self.list_view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
 
         self.partition_tree = QTreeWidget()
+        self.partition_sync = PartitionTreeSync(self.partition_tree, self._create_color_icon)
         self.partition_tree.setHeaderHidden(True)
         self.partition_tree.setFocusPolicy(Qt.NoFocus)
         self.partition_tree.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.partition_tree.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         
-        self.splitter.addWidget(self.list_widget)
+        self.splitter.addWidget(self.list_view)
         self.splitter.addWidget(self.partition_tree)
         self.splitter.setStretchFactor(0, 1)
         self.splitter.setStretchFactor(1, 0)
@@ -351,6 +398,9 @@ class MainWindow(QWidget):
     def closeEvent(self, event):
         self.settings.setValue("geometry", self.saveGeometry())
         self.settings.setValue("splitter_state", self.splitter.saveState())
+        self.clipboard_monitor.flush()
+        if hasattr(self.cm, 'wait_for_pending'):
+            self.cm.wait_for_pending()  # 让已提交的捕获写完数据库
         super().closeEvent(event)
 
     # --- Mouse Logic ---
@@ -444,102 +494,59 @@ class MainWindow(QWidget):
             finally:
                 if attached: user32.AttachThreadInput(curr_thread, self.last_thread_id, False)
 
-    def _on_search_text_changed(self): self.search_timer.start(300)
+    def _on_search_text_changed(self): self._update_list()
+
+    def _on_item_captured(self, item_id):
+        """新捕获的项目只增量写入索引，不重新查询数据库"""
+        self.recent_index.upsert([item_id])
+        self._update_list()
 
     def _update_list(self):
         search_text = self.search_box.text()
-        partition_filter = None
-        date_modify_filter = None # 新增变量
+        partition_ids = None
+        today_only = False
         current_partition = self.partition_tree.currentItem()
         if current_partition:
             partition_data = current_partition.data(0, Qt.UserRole)
             if partition_data:
                 if partition_data['type'] == 'today':
-                    date_modify_filter = '今日'
-                    # partition_filter 保持为 None
-                elif partition_data['type'] != 'all':
-                    partition_filter = partition_data
-        items = self.db.get_items(search=search_text, partition_filter=partition_filter, date_modify_filter=date_modify_filter, limit=None)
-        self.list_widget.clear()
-        self._add_debug_test_item()
-        for item in items:
-            display_text = self._get_content_display(item)
-            list_item = QListWidgetItem(display_text)
-            list_item.setData(Qt.UserRole, item)
-            if getattr(item, 'content', ''):
-                list_item.setToolTip(str(item.content)[:500])
-            self.list_widget.addItem(list_item)
-        if self.list_widget.count() > 0: self.list_widget.setCurrentRow(0)
-
-    def _get_content_display(self, item):
-        if getattr(item, 'item_type', '') == 'file' and getattr(item, 'file_path', ''):
-            return os.path.basename(item.file_path)
-        elif getattr(item, 'item_type', '') == 'url' and getattr(item, 'url_domain', None):
-            return f"[{item.url_domain}] {item.url_title or ''}"
-        elif getattr(item, 'item_type', '') == 'image':
-            return "[图片] " + (os.path.basename(item.image_path) if getattr(item, 'image_path', None) else "")
-        else:
-            return getattr(item, 'content', '').replace('\n', ' ').replace('\r', '').strip()[:150]
+                    today_only = True
+                elif partition_data['type'] == 'partition':
+                    partition_ids = self._collect_partition_ids(current_partition)
+        entries = self.recent_index.search(search_text, partition_ids=partition_ids, today_only=today_only)
+        if not entries and not self.recent_index.entries:
+            entries = self._debug_test_entries()
+        self.list_model.set_entries(entries)
+        if entries: self.list_view.setCurrentIndex(self.list_model.index(0))
+
+    def _collect_partition_ids(self, tree_item):
+        """收集分区及其所有子分区的ID (与数据库按分区筛选的范围一致)"""
+        ids = set()
+        stack = [tree_item]
+        while stack:
+            node = stack.pop()
+            data = node.data(0, Qt.UserRole)
+            if data and data.get('type') == 'partition':
+                ids.add(data['id'])
+            stack.extend(node.child(i) for i in range(node.childCount()))
+        return ids
 
     def _create_color_icon(self, color_str):
-        from PyQt5.QtGui import QPixmap, QPainter, QIcon
-        pixmap = QPixmap(16, 16)
-        pixmap.fill(Qt.transparent)
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setBrush(QColor(color_str or "#808080"))
-        painter.setPen(Qt.NoPen)
-        painter.drawRoundedRect(2, 2, 12, 12, 4, 4)
-        painter.end()
-        return QIcon(pixmap)
+        return get_color_icon(color_str or "#808080", shape='rounded')
 
     def _update_partition_tree(self):
-        current_selection = self.partition_tree.currentItem().data(0, Qt.UserRole) if self.partition_tree.currentItem() else None
-        self.partition_tree.clear()
-        
         counts = self.db.get_partition_item_counts()
         partition_counts = counts.get('partitions', {})
 
-        # -- 添加静态项 --
+        # -- 静态项 --
         static_items = [
-            ("全部数据", {'type': 'all', 'id': -1}, QStyle.SP_DirHomeIcon, counts.get('total', 0)),
-            ("今日数据", {'type': 'today', 'id': -5}, QStyle.SP_FileDialogDetailedView, counts.get('today_modified', 0)),
+            ("全部数据", {'type': 'all', 'id': -1}, self.style().standardIcon(QStyle.SP_DirHomeIcon), counts.get('total', 0)),
+            ("今日数据", {'type': 'today', 'id': -5}, self.style().standardIcon(QStyle.SP_FileDialogDetailedView), counts.get('today_modified', 0)),
         ]
         
-        for name, data, icon, count in static_items:
-            item = QTreeWidgetItem(self.partition_tree, [f"{name} ({count})"])
-            item.setData(0, Qt.UserRole, data)
-            item.setIcon(0, self.style().standardIcon(icon))
-        
-        # -- 递归添加用户分区 --
+        # -- 与当前树比对后增量更新用户分区 --
         top_level_partitions = self.db.get_partitions_tree()
-        self._add_partition_recursive(top_level_partitions, self.partition_tree, partition_counts)
-
-        self.partition_tree.expandAll()
-        
-        # 恢复之前的选择
-        if current_selection:
-            it = QTreeWidgetItemIterator(self.partition_tree)
-            while it.value():
-                item = it.value()
-                item_data = item.data(0, Qt.UserRole)
-                if item_data and item_data.get('id') == current_selection.get('id') and item_data.get('type') == current_selection.get('type'):
-                    self.partition_tree.setCurrentItem(item)
-                    break
-                it += 1
-        else:
-            if self.partition_tree.topLevelItemCount() > 0:
-                self.partition_tree.setCurrentItem(self.partition_tree.topLevelItem(0))
-
-    def _add_partition_recursive(self, partitions, parent_item, partition_counts):
-        for partition in partitions:
-            count = partition_counts.get(partition.id, 0)
-            item = QTreeWidgetItem(parent_item, [f"{partition.name} ({count})"])
-            item.setData(0, Qt.UserRole, {'type': 'partition', 'id': partition.id, 'color': partition.color})
-            item.setIcon(0, self._create_color_icon(partition.color))
-            
-            if partition.children:
-                self._add_partition_recursive(partition.children, item, partition_counts)
+        self.partition_sync.sync(static_items, top_level_partitions, partition_counts, default_selection={'type': 'all', 'id': -1})
 
     def _on_partition_selection_changed(self, c, p): self._update_list()
     def _toggle_partition_panel(self): self.partition_tree.setVisible(not self.partition_tree.isVisible())
@@ -552,28 +559,33 @@ class MainWindow(QWidget):
         else:
             user32.SetWindowPos(hwnd, HWND_NOTOPMOST, 0, 0, 0, 0, SWP_FLAGS)
 
-    def _on_item_activated(self, item):
-        db_item = item.data(Qt.UserRole)
+    def _on_item_activated(self, index):
+        entry = self.list_model.entry(index.row())
+        if not entry: return
+        # 索引只保存预览，激活时才按ID读取完整数据
+        db_item = self.payload_cache.get(entry.id, entry.modified_at) if entry.id is not None else entry
         if not db_item: return
         try:
             clipboard = QApplication.clipboard()
+            # 写入的数据带有来源标记，ClipboardMonitor 不会再次捕获
             
             # 1. 处理图片
             if getattr(db_item, 'item_type', '') == 'image' and getattr(db_item, 'data_blob', None):
                 image = QImage()
                 image.loadFromData(db_item.data_blob)
-                clipboard.setImage(image)
+                clipboard.setMimeData(own_mime_data(image=image))
             
             # 2. 处理文件：构建 URI 列表
             elif getattr(db_item, 'item_type', '') == 'file' and getattr(db_item, 'file_path', ''):
-                mime_data = QMimeData()
-                urls = [QUrl.fromLocalFile(p) for p in db_item.file_path.split(';') if p]
-                mime_data.setUrls(urls)
-                clipboard.setMimeData(mime_data)
+                # 原文件已不存在时还原保存的内容 (多文件为 ZIP)
+                paths = file_archive.paste_paths(self.db, entry.id, db_item.file_path) if entry.id is not None \
+                    else [p for p in db_item.file_path.split(';') if p]
+                urls = [QUrl.fromLocalFile(p) for p in paths]
+                clipboard.setMimeData(own_mime_data(urls=urls))
                 
             # 3. 处理普通文本/链接
             else:
-                clipboard.setText(db_item.content)
+                clipboard.setMimeData(own_mime_data(text=db_item.content))
             
             self._paste_ditto_style()
         except Exception as e: log(f"❌ 操作失败: {e}")
@@ -600,33 +612,18 @@ class MainWindow(QWidget):
         finally:
             if attached: user32.AttachThreadInput(curr_thread, target_thread, False)
 
-    def on_clipboard_changed(self):
-        if self._processing_clipboard:
-            return
-        self._processing_clipboard = True
-        try:
-            mime = self.clipboard.mimeData()
-            # quick.py 默认不与特定分区关联，所以传入 None
-            self.cm.process_clipboard(mime, None)
-        finally:
-            self._processing_clipboard = False
-
     def keyPressEvent(self, event):
         key = event.key()
         if key == Qt.Key_Escape: self.close()
         elif key in (Qt.Key_Up, Qt.Key_Down):
-            if not self.list_widget.hasFocus():
-                self.list_widget.setFocus()
-                QApplication.sendEvent(self.list_widget, event)
+            if not self.list_view.hasFocus():
+                self.list_view.setFocus()
+                QApplication.sendEvent(self.list_view, event)
         else: super().keyPressEvent(event)
 
-    def _add_debug_test_item(self):
-        if self.list_widget.count() == 0 and not self.db.get_items():
-            for i in range(20):
-                item = QListWidgetItem(f"测试数据 {i+1}")
-                mock_data = type('obj', (object,), {'item_type': 'text', 'content': f'Content {i}'})
-                item.setData(Qt.UserRole, mock_data)
-                self.list_widget.addItem(item)
+    def _debug_test_entries(self):
+        return [SimpleNamespace(id=None, display=f"测试数据 {i+1}", tooltip=None, item_type='text', content=f'Content {i}')
+                for i in range(20)]
 
 if __name__ == '__main__':
     log("🚀 程序启动 (quick.py 作为主入口)")
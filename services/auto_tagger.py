@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+捕获时的自动标签
+把数据库中的自动标签规则 (auto_tag_rules) 编译为一次性匹配的结构：
+- 关键词 (不区分大小写) 编译为一个 Aho-Corasick 自动机，文本只扫描一遍，报告所有命中的关键词
+  (重叠的关键词、互为前缀的关键词都会命中)
+- 正则规则逐条单独编译并分别 search，带全局内联标记 (如 (?i)) 的正则也能使用；无效的正则只跳过该条
+- 域名规则为字典，按 URL 域名及其各级上级域名查找
+- 文件类型规则为字典，按文件扩展名或项目类型 (image/url/file/text) 查找
+分区预设标签按分区层级预先合并 (子分区继承所有上级分区的标签)，与规则匹配相互独立，始终会被应用。
+规则或分区变化后 (db.tag_rule_version / db.partition_version 变化) 下次匹配时自动重新编译。
+匹配在捕获的准备阶段完成，得到的标签由 DBManager.add_item 在插入项目的同一事务中写入。
+"""
+import os
+import re
+import logging
+import threading
+
+try:
+    import ahocorasick  # 可选依赖 (pyahocorasick)：安装后关键词匹配使用 C 实现的自动机
+except ImportError:
+    ahocorasick = None
+
+log = logging.getLogger("AutoTagger")
+
+RULE_KINDS = ('keyword', 'regex', 'domain', 'filetype')
+
+
+class KeywordAutomaton:
+    """
+    不区分大小写的多关键词匹配 (Aho-Corasick)
+    add() 全部关键词后调用 build()，find_all(text) 返回文本中出现的所有关键词对应的值。
+    """
+
+    def __init__(self):
+        self._values = {}  # {小写关键词: [值]}
+        self._native = None
+        self._goto = [{}]  # 纯 Python 实现：每个状态的转移表
+        self._fail = [0]
+        self._out = [()]   # 每个状态 (含失败链上的状态) 命中的关键词
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, keyword, value):
+        keyword = keyword.lower()
+        if keyword:
+            self._values.setdefault(keyword, []).append(value)
+
+    def build(self):
+        if ahocorasick is not None:
+            self._native = ahocorasick.Automaton()
+            for keyword in self._values:
+                self._native.add_word(keyword, keyword)
+            if self._values:
+                self._native.make_automaton()
+            return
+        goto, out = [{}], [[]]
+        for keyword in self._values:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(keyword)
+        # 按层次遍历计算失败指针，并把失败链上的输出合并到当前状态
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt].extend(out[fail[nxt]])
+        self._goto, self._fail, self._out = goto, fail, [tuple(o) for o in out]
+
+    def find_all(self, text):
+        """返回命中的值 (按关键词首次出现的顺序，不重复)；全部关键词都命中后提前结束"""
+        text = text.lower()
+        found = {}
+        total = len(self._values)
+        if not total:
+            return []
+        if self._native is not None:
+            for _, keyword in self._native.iter(text):
+                found.setdefault(keyword, None)
+                if len(found) == total:
+                    break
+        else:
+            goto, fail, out = self._goto, self._fail, self._out
+            state = 0
+            for ch in text:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                if out[state]:
+                    for keyword in out[state]:
+                        found.setdefault(keyword, None)
+                    if len(found) == total:
+                        break
+        return [v for keyword in found for v in self._values[keyword]]
+
+
+class AutoTagger:
+    """
+    Args:
+        db_manager: 数据库管理器 (读取规则和分区标签)
+        scan_chars: 关键词/正则最多扫描的文本长度
+    """
+
+    SCAN_CHARS = 64 * 1024
+
+    def __init__(self, db_manager, scan_chars=SCAN_CHARS):
+        self.db = db_manager
+        self.scan_chars = scan_chars
+        self._lock = threading.Lock()
+        self._versions = None
+        self._keywords = KeywordAutomaton()
+        self._regexes = []        # [(编译后的正则, 标签名)]
+        self._domains = {}        # {域名: [标签名]}
+        self._filetypes = {}      # {扩展名或项目类型: [标签名]}
+        self._partition_tags = {}  # {分区ID: [标签名] (含继承)}
+
+    def _ensure_compiled(self):
+        versions = (self.db.tag_rule_version, self.db.partition_version)
+        with self._lock:
+            if versions != self._versions:
+                # 先记录版本：即使编译出错也不会在之后的每次捕获中反复重试
+                self._versions = versions
+                self._partition_tags = self.db.get_inherited_partition_tags()
+                self.compile_rules(self.db.get_auto_tag_rules())
+
+    def compile_rules(self, rules):
+        """编译规则 [(id, kind, pattern, tag_name, enabled)]；有问题的规则记录警告后跳过，不影响其他规则"""
+        keywords, regexes, domains, filetypes = KeywordAutomaton(), [], {}, {}
+        for rule_id, kind, pattern, tag_name, _ in rules:
+            pattern = (pattern or "").strip()
+            if not pattern or not tag_name:
+                continue
+            if kind == 'keyword':
+                keywords.add(pattern, tag_name)
+            elif kind == 'regex':
+                try:
+                    regexes.append((re.compile(pattern), tag_name))
+                except re.error as e:
+                    log.warning(f"⚠️ 忽略无效的自动标签正则 (规则 {rule_id}) {pattern!r}: {e}")
+            elif kind == 'domain':
+                domains.setdefault(pattern.lower().lstrip('.'), []).append(tag_name)
+            elif kind == 'filetype':
+                filetypes.setdefault(pattern.lower().lstrip('.'), []).append(tag_name)
+            else:
+                log.warning(f"⚠️ 未知的自动标签规则类型 (规则 {rule_id}): {kind}")
+        keywords.build()
+        self._keywords = keywords
+        self._regexes = regexes
+        self._domains = domains
+        self._filetypes = filetypes
+        log.debug(f"🏷️ 自动标签已编译: {len(keywords)} 个关键词, {len(regexes)} 条正则, {len(domains)} 个域名, "
+                  f"{len(filetypes)} 个文件类型, {len(self._partition_tags)} 个分区")
+
+    def tags_for(self, fields):
+        """
+        计算新项目应打的标签 (捕获工作线程中调用)
+        Args:
+            fields: DBManager.add_item 的关键字参数
+        Returns:
+            list: 标签名 (去重，保持顺序)；规则匹配出错时仍返回分区预设标签
+        """
+        try:
+            self._ensure_compiled()
+        except Exception as e:
+            log.error(f"编译自动标签规则失败: {e}", exc_info=True)
+        tags = list(self._partition_tags.get(fields.get('partition_id'), ()))
+        try:
+            tags.extend(self._match_rules(fields))
+        except Exception as e:
+            log.error(f"自动标签规则匹配失败: {e}", exc_info=True)
+        return list(dict.fromkeys(tags))
+
+    def _match_rules(self, fields):
+        tags = []
+        text = (fields.get('text') or "")[:self.scan_chars]
+        if text:
+            tags.extend(self._keywords.find_all(text))
+            tags.extend(tag for regex, tag in self._regexes if regex.search(text) is not None)
+
+        if self._domains and fields.get('url_domain'):
+            domain = fields['url_domain'].lower().split(':')[0]
+            labels = domain.split('.')
+            for i in range(len(labels) - 1):
+                tags.extend(self._domains.get('.'.join(labels[i:]), ()))
+
+        if self._filetypes:
+            tags.extend(self._filetypes.get(fields.get('item_type') or "", ()))
+            for path in (fields.get('file_path') or "").split(';'):
+                ext = os.path.splitext(path.rstrip('/\\'))[1].lower().lstrip('.')
+                if ext:
+                    tags.extend(self._filetypes.get(ext, ()))
+        return tags
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+捕获过滤
+在任何哈希、编码和数据库写入之前丢弃不需要的剪贴板内容：
+- GUI 线程 (创建快照之前)：按 MIME 格式排除 (如密码管理器标记的内容) 和频率限制
+- 捕获工作线程 (选择处理器之前)：按类型的大小上限、关键词和正则黑名单
+所有黑名单规则编译为一个正则 (每条规则一个命名分组)，文本只扫描一遍；每条规则都有命中计数。
+无法放入合并正则的规则 (如带有 (?i) 等全局内联标记) 单独编译、逐条检查。
+"""
+import os
+import re
+import time
+import logging
+import threading
+from collections import deque
+
+from handlers.image_handler import probe_image_header
+
+log = logging.getLogger("CaptureFilter")
+
+# 密码管理器等程序用这些格式标记不应被剪贴板历史记录的内容
+# (Windows 上 Qt 以 application/x-qt-windows-mime;value="..." 的形式列出注册格式，因此按子串匹配)
+DEFAULT_EXCLUDED_FORMATS = (
+    'ExcludeClipboardContentFromMonitorProcessing',
+    'Clipboard Viewer Ignore',
+    'x-kde-passwordManagerHint',
+)
+
+
+class CaptureFilterPolicy:
+    """
+    捕获过滤策略 (None 或空表示不限制)
+    Attributes:
+        excluded_formats: 剪贴板包含这些格式 (子串匹配) 时不捕获
+        deny_keywords: 文本包含这些关键词 (不区分大小写) 时不捕获
+        deny_patterns: 文本匹配这些正则时不捕获
+        deny_scan_chars: 黑名单最多扫描的文本长度
+        max_text_chars: 文本/URL 的最大字符数
+        max_image_pixels: 图片的最大像素数
+        max_files: 一次复制的最大文件数
+        max_file_bytes: 一次复制的文件总大小上限 (只统计文件，不展开文件夹)
+        rate_limit: (次数, 秒)，时间窗口内超过该次数的剪贴板变化不捕获
+    """
+
+    def __init__(self, excluded_formats=DEFAULT_EXCLUDED_FORMATS, deny_keywords=(), deny_patterns=(),
+                 deny_scan_chars=256 * 1024, max_text_chars=None, max_image_pixels=100 * 1000 * 1000,
+                 max_files=None, max_file_bytes=None, rate_limit=(30, 10.0)):
+        self.excluded_formats = list(excluded_formats)
+        self.deny_keywords = list(deny_keywords)
+        self.deny_patterns = list(deny_patterns)
+        self.deny_scan_chars = deny_scan_chars
+        self.max_text_chars = max_text_chars
+        self.max_image_pixels = max_image_pixels
+        self.max_files = max_files
+        self.max_file_bytes = max_file_bytes
+        self.rate_limit = rate_limit
+
+
+class CaptureFilter:
+    """
+    - check_formats(formats): GUI 线程中、创建快照之前调用 (格式排除 + 频率限制)
+    - check_snapshot(snapshot): 工作线程中、选择处理器之前调用 (大小上限 + 黑名单)
+    两者返回命中的规则名，None 表示放行。修改策略后调用 compile() 生效。
+    """
+
+    def __init__(self, policy=None):
+        self.policy = policy or CaptureFilterPolicy()
+        self.hits = {}  # {规则名: 命中次数}
+        self._lock = threading.Lock()
+        self._recent = deque()  # 频率限制窗口内放行的时间
+        self._deny = None
+        self._deny_rules = {}  # {分组名: 规则名}
+        self._deny_separate = []  # [(规则名, 单独编译的正则)]，无法合并的规则
+        self.compile()
+
+    def compile(self):
+        """
+        把关键词和正则黑名单编译为一个正则；无效的正则跳过并记录警告。
+        每条规则先以包装后的形式 (?P<分组>...) 单独校验，无法包装的规则 (如带全局内联标记) 改为单独检查；
+        合并编译仍然失败时 (如多条规则使用了同名分组) 全部改为逐条检查，任何规则都不会导致初始化失败。
+        """
+        exprs = [(f"keyword:{keyword}", f"(?i:{re.escape(keyword)})") for keyword in self.policy.deny_keywords if keyword]
+        for pattern in self.policy.deny_patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                log.warning(f"⚠️ 忽略无效的过滤正则 {pattern!r}: {e}")
+                continue
+            exprs.append((f"pattern:{pattern}", pattern))
+
+        wrapped, separate = [], []  # wrapped: [(分组名, 规则名, 包装后的表达式)]
+        for i, (rule, expr) in enumerate(exprs):
+            name = f"_deny{i}"
+            try:
+                re.compile(f"(?P<{name}>{expr})")
+                wrapped.append((name, rule, f"(?P<{name}>{expr})"))
+            except re.error as e:
+                log.debug(f"过滤规则 {rule!r} 无法合并 ({e})，单独检查")
+                separate.append((rule, re.compile(expr)))
+
+        self._deny = None
+        self._deny_rules = {}
+        if wrapped:
+            try:
+                self._deny = re.compile("|".join(w[2] for w in wrapped))
+                self._deny_rules = {name: rule for name, rule, _ in wrapped}
+            except re.error as e:
+                log.warning(f"⚠️ 过滤规则无法合并为一个正则 ({e})，改为逐条检查")
+                separate = [(rule, re.compile(expr)) for rule, expr in exprs]
+        self._deny_separate = separate
+
+    def check_formats(self, formats):
+        """按 MIME 格式排除和频率限制 (只读取格式列表，不读取内容)"""
+        for fmt in formats:
+            for excluded in self.policy.excluded_formats:
+                if excluded in fmt:
+                    return self._hit(f"format:{excluded}")
+        if self.policy.rate_limit:
+            count, seconds = self.policy.rate_limit
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > seconds:
+                self._recent.popleft()
+            if len(self._recent) >= count:
+                return self._hit("rate_limit")
+            self._recent.append(now)
+        return None
+
+    def check_snapshot(self, snapshot):
+        """按内容类型检查大小上限，文本再按黑名单扫描 (判断顺序与处理器优先级一致：图片、文件、文本)"""
+        p = self.policy
+        if snapshot.hasImage():
+            if p.max_image_pixels:
+                width, height = self._image_size(snapshot)
+                if width * height > p.max_image_pixels:
+                    return self._hit("size:image")
+            return None
+        files = snapshot.local_files()
+        if files:
+            if p.max_files and len(files) > p.max_files:
+                return self._hit("size:files")
+            if p.max_file_bytes and self._files_size(files) > p.max_file_bytes:
+                return self._hit("size:file_bytes")
+            return None
+        text = snapshot.stripped_text()
+        if not text:
+            return None
+        if p.max_text_chars and len(text) > p.max_text_chars:
+            return self._hit("size:text")
+        end = p.deny_scan_chars or len(text)
+        if self._deny is not None:
+            match = self._deny.search(text, 0, end)
+            if match is not None:
+                return self._hit(self._deny_rules[match.lastgroup])
+        for rule, regex in self._deny_separate:
+            if regex.search(text, 0, end) is not None:
+                return self._hit(rule)
+        return None
+
+    @staticmethod
+    def _image_size(snapshot):
+        """优先从原始字节的文件头读取尺寸，避免解码"""
+        for fmt in snapshot.formats():
+            data = snapshot.data(fmt)
+            header = probe_image_header(data) if data else None
+            if header:
+                return header[1], header[2]
+        image = snapshot.imageData()
+        return (image.width(), image.height()) if image is not None and not image.isNull() else (0, 0)
+
+    @staticmethod
+    def _files_size(paths):
+        total = 0
+        for path in paths:
+            try:
+                if os.path.isfile(path):
+                    total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _hit(self, rule):
+        with self._lock:
+            self.hits[rule] = self.hits.get(rule, 0) + 1
+        log.debug(f"🚫 过滤剪贴板内容: {rule}")
+        return rule
+
+    def stats(self):
+        """各规则的命中次数"""
+        with self._lock:
+            return dict(self.hits)
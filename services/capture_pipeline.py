@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+剪贴板捕获流水线
+GUI 线程只负责把 QMimeData 复制为快照 (handlers.snapshot.ClipboardSnapshot)，其余工作都在线程池中完成：
+- 准备阶段 (prepare)：选择处理器、编码、计算哈希、生成缩略图，多个捕获可以并行
+- 保存阶段 (store)：写入数据库，严格按捕获顺序逐个执行
+每个阶段的耗时都会记录，可通过 stats() 查看汇总。
+"""
+import time
+import logging
+import threading
+from PyQt5.QtCore import QThreadPool
+
+from core.shared import BackgroundTask
+from handlers.snapshot import ClipboardSnapshot  # noqa: F401  快照类原先定义在本模块
+
+log = logging.getLogger("CapturePipeline")
+
+# 阶段名称 (按执行顺序)
+STAGES = ('snapshot', 'queue', 'prepare', 'wait', 'store', 'total')
+
+
+class CaptureJob:
+    """流水线中的一次捕获"""
+    __slots__ = ('seq', 'snapshot', 'partition_info', 'handler', 'payload',
+                 'item_id', 'is_new', 'timings', '_submitted', '_prepared')
+
+    def __init__(self, seq, snapshot, partition_info):
+        self.seq = seq
+        self.snapshot = snapshot
+        self.partition_info = partition_info
+        self.handler = None
+        self.payload = None
+        self.item_id = None
+        self.is_new = False
+        self.timings = {}  # {阶段: 毫秒}
+        self._submitted = 0.0
+        self._prepared = 0.0
+
+
+class CapturePipeline:
+    """
+    Args:
+        prepare_fn(job): 准备阶段，设置 job.handler / job.payload (工作线程，可并行)
+        store_fn(job): 保存阶段，设置 job.item_id / job.is_new (工作线程，按 seq 顺序)
+        done_fn(job): 每个捕获完成后调用 (在执行保存阶段的线程中)
+        workers: 线程数
+    """
+
+    def __init__(self, prepare_fn, store_fn, done_fn=None, workers=2):
+        self.prepare_fn = prepare_fn
+        self.store_fn = store_fn
+        self.done_fn = done_fn
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(workers)
+        self._next_seq = 0
+        self._next_store = 0
+        self._ready = {}         # {seq: 已完成准备阶段的 job}
+        self._storing = False    # 是否已有线程在按顺序执行保存阶段
+        self._lock = threading.Lock()
+        self._stats = {stage: [0, 0.0, 0.0, 0.0] for stage in STAGES}  # [次数, 总耗时, 最大, 最近]
+
+    def submit(self, snapshot, partition_info=None, snapshot_ms=0.0):
+        """提交一次捕获 (GUI 线程调用)，返回序号"""
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+        job = CaptureJob(seq, snapshot, partition_info)
+        job.timings['snapshot'] = snapshot_ms
+        job._submitted = time.perf_counter()
+        self.pool.start(BackgroundTask(self._run, job))
+        return seq
+
+    def pending(self):
+        with self._lock:
+            return self._next_seq - self._next_store
+
+    def wait(self, msecs=-1):
+        """等待所有已提交的捕获完成 (退出程序前调用)"""
+        return self.pool.waitForDone(msecs)
+
+    def stats(self):
+        """{阶段: {'count', 'avg_ms', 'max_ms', 'last_ms'}}"""
+        with self._lock:
+            return {stage: {'count': c, 'avg_ms': (total / c) if c else 0.0, 'max_ms': mx, 'last_ms': last}
+                    for stage, (c, total, mx, last) in self._stats.items()}
+
+    # --- 以下在工作线程中执行 ---
+    def _run(self, job):
+        start = time.perf_counter()
+        job.timings['queue'] = (start - job._submitted) * 1000
+        try:
+            self.prepare_fn(job)
+        except Exception as e:
+            log.error(f"捕获 #{job.seq} 准备阶段失败: {e}", exc_info=True)
+            job.payload = None
+        job._prepared = time.perf_counter()
+        job.timings['prepare'] = (job._prepared - start) * 1000
+
+        # 准备完成的 job 进入待保存队列；若已有线程在保存，由它按顺序接着处理
+        with self._lock:
+            self._ready[job.seq] = job
+            if self._storing:
+                return
+            self._storing = True
+        self._store_in_order()
+
+    def _store_in_order(self):
+        while True:
+            with self._lock:
+                job = self._ready.pop(self._next_store, None)
+                if job is None:
+                    self._storing = False
+                    return
+                self._next_store += 1
+            start = time.perf_counter()
+            job.timings['wait'] = (start - job._prepared) * 1000
+            if job.payload is not None:
+                try:
+                    self.store_fn(job)
+                except Exception as e:
+                    log.error(f"捕获 #{job.seq} 保存阶段失败: {e}", exc_info=True)
+            end = time.perf_counter()
+            job.timings['store'] = (end - start) * 1000
+            job.timings['total'] = job.timings['snapshot'] + (end - job._submitted) * 1000
+            self._record(job.timings)
+            log.debug(f"捕获 #{job.seq} 完成: " + ", ".join(f"{k} {v:.1f}ms" for k, v in job.timings.items()))
+            if self.done_fn:
+                try:
+                    self.done_fn(job)
+                except Exception as e:
+                    log.error(f"捕获 #{job.seq} 完成回调失败: {e}", exc_info=True)
+
+    def _record(self, timings):
+        with self._lock:
+            for stage, ms in timings.items():
+                s = self._stats[stage]
+                s[0] += 1
+                s[1] += ms
+                s[2] = max(s[2], ms)
+                s[3] = ms
@@ -2,99 +2,206 @@
 """
 剪贴板管理器
 使用策略模式处理不同类型的剪贴板数据
+GUI 线程只创建剪贴板快照，处理器的编码、哈希和数据库写入都在捕获流水线的工作线程中完成。
+重复复制最近捕获过的内容时在内存中命中 (RecentContent)，访问记录延迟后批量写入。
+不需要的内容在任何处理之前由捕获过滤 (services.capture_filter) 丢弃。
+新项目的自动标签和分区预设标签在准备阶段计算 (services.auto_tagger)，与项目在同一事务中写入。
 """
+import time
 import logging
-from PyQt5.QtCore import QObject, pyqtSignal, QMimeData
+import threading
+from datetime import datetime
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, QMimeData
+
+from core.shared import BackgroundTask
+from handlers.base_handler import RecentContent
+from handlers.snapshot import ClipboardSnapshot
+from handlers.image_handler import ImageCodecPolicy
+from handlers.file_handler import FileCapturePolicy
+from handlers.text_handler import TextCapturePolicy
+from services.capture_pipeline import CapturePipeline
+from services.capture_filter import CaptureFilter
+from services.auto_tagger import AutoTagger
 
 log = logging.getLogger("ClipboardSvc")
 
 
+class CaptureResult:
+    """一次捕获的结果 (capture_finished 信号的参数)"""
+    __slots__ = ('seq', 'handler', 'item_id', 'is_new', 'timings')
+
+    def __init__(self, job):
+        self.seq = job.seq
+        self.handler = job.handler.__class__.__name__ if job.handler else None
+        self.item_id = job.item_id
+        self.is_new = job.is_new
+        self.timings = dict(job.timings)
+
+
 class ClipboardManager(QObject):
     """剪贴板管理器 - 使用策略模式"""
-    
+
     data_captured = pyqtSignal(bool)
+    item_captured = pyqtSignal(int)  # 新捕获项目的ID
+    capture_finished = pyqtSignal(object)  # CaptureResult，每次捕获处理完成后发出 (无论是否产生新项目)
+    capture_progress = pyqtSignal(str, object, object)  # (标签, 已完成字节, 总字节)，读取大文件时定期发出
+    item_touched = pyqtSignal(int)  # 重复复制了最近捕获过的项目 (访问记录稍后批量写入，不需要刷新列表)
+    _visits_pending = pyqtSignal()
+
+    VISIT_FLUSH_MS = 2000  # 访问记录的延迟写入时间
 
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, image_policy=None, file_policy=None, text_policy=None, filter_policy=None):
         super().__init__()
         self.db = db_manager
+        self.image_policy = image_policy or ImageCodecPolicy()
+        self.file_policy = file_policy or FileCapturePolicy()
+        self.text_policy = text_policy or TextCapturePolicy()
+        self.filter = CaptureFilter(filter_policy)
+        self.tagger = AutoTagger(db_manager)
+        self.recent = RecentContent()  # 所有处理器共享的最近内容
+        self._purge_version = db_manager.purge_version
         self.handlers = []
         self._register_handlers()
-    
+        # 信号在工作线程中发出，Qt 会自动以队列方式投递到 GUI 线程中的槽函数
+        self.pipeline = CapturePipeline(self._prepare, self._store, self._finished)
+
+        # 内存命中的重复复制只累计访问记录 {项目ID: (次数, 最后访问时间)}，定时合并为一次批量写入
+        self._visits = {}
+        self._visits_lock = threading.Lock()
+        self.visit_timer = QTimer(self)
+        self.visit_timer.setSingleShot(True)
+        self.visit_timer.setInterval(self.VISIT_FLUSH_MS)
+        self.visit_timer.timeout.connect(lambda: self.pipeline.pool.start(BackgroundTask(self.flush_visits)))
+        self._visits_pending.connect(self._schedule_visit_flush)
+
     def _register_handlers(self):
-        """注册所有处理器，按优先级排序"""
+        """创建所有已注册 (@register_handler) 的处理器，按优先级排序"""
         try:
-            from handlers import ImageHandler, FileHandler, URLHandler, TextHandler
-            
-            # 创建处理器实例
-            self.handlers = [
-                ImageHandler(),   # 优先级 10 - 最高
-                FileHandler(),    # 优先级 20
-                URLHandler(),     # 优先级 30
-                TextHandler(),    # 优先级 40 - 最低（兜底）
-            ]
-            
+            from handlers import registered_handlers, ImageHandler, FileHandler, TextHandler
+
+            # 需要构造参数的处理器，其余处理器使用默认参数
+            options = {
+                ImageHandler: {'policy': self.image_policy},
+                FileHandler: {'policy': self.file_policy},
+                TextHandler: {'policy': self.text_policy},
+            }
+            self.handlers = [cls(**options.get(cls, {})) for cls in registered_handlers()]
+
             # 按优先级排序（数字越小优先级越高）
             self.handlers.sort(key=lambda h: h.priority)
-            
+            for handler in self.handlers:
+                handler.on_progress = self.capture_progress.emit
+                handler.recent = self.recent
+
             log.info(f"✅ 注册了 {len(self.handlers)} 个处理器")
             for handler in self.handlers:
                 log.debug(f"  - {handler.__class__.__name__} (优先级: {handler.priority})")
-                
+
         except Exception as e:
             log.error(f"处理器注册失败: {e}", exc_info=True)
             self.handlers = []
-    
+
     def process_clipboard(self, mime_data: QMimeData, partition_info: dict = None):
         """
-        使用责任链模式处理剪贴板数据
-        
+        捕获剪贴板数据：在当前 (GUI) 线程中创建快照，提交到捕获流水线后立即返回
+
         Args:
             mime_data: Qt剪贴板数据对象
             partition_info: (可选) 当前选中的分区信息
-            
+
         Returns:
-            bool: True表示成功处理，False表示未处理
+            bool: True表示已提交处理，False表示被过滤或快照失败
         """
         try:
-            # 遍历所有处理器
-            for handler in self.handlers:
-                if handler.can_handle(mime_data):
-                    log.debug(f"使用 {handler.__class__.__name__} 处理")
-                    item, is_new = handler.handle(mime_data, self.db, partition_info)
-                    
-                    if item and is_new:
-                        # 成功创建了新项目
-                        # 检查是否需要添加预设标签 (合并组和区的标签)
-                        if partition_info and partition_info.get('type') == 'partition' and item.partition:
-                            all_tags = set()
-                            
-                            # 获取区的标签
-                            partition_tags = self.db.get_partition_tags(item.partition.id)
-                            if partition_tags:
-                                all_tags.update(partition_tags)
-                            
-                            # 获取组的标签
-                            if item.partition.group_id:
-                                group_tags = self.db.get_partition_group_tags(item.partition.group_id)
-                                if group_tags:
-                                    all_tags.update(group_tags)
-
-                            if all_tags:
-                                final_tags = list(all_tags)
-                                log.info(f"为新项目 {item.id} 添加预设标签: {final_tags}")
-                                self.db.add_tags_to_items([item.id], final_tags)
-
-                        self.data_captured.emit(True)
-                        return True
-                    elif not is_new and item:
-                        # 项目已存在
-                        return False
-            
-            # 没有处理器能处理该数据
-            formats = mime_data.formats()
-            log.debug(f"没有合适的处理器。可用格式: {list(formats)}")
-            return False
-            
+            if self.filter.check_formats(mime_data.formats()) is not None:
+                return False
+            start = time.perf_counter()
+            snapshot = ClipboardSnapshot(mime_data)
+            self.pipeline.submit(snapshot, partition_info, (time.perf_counter() - start) * 1000)
+            return True
         except Exception as e:
             log.error(f"处理错误: {e}", exc_info=True)
             return False
+
+    def stage_stats(self):
+        """各阶段耗时汇总 {阶段: {'count', 'avg_ms', 'max_ms', 'last_ms'}}"""
+        return self.pipeline.stats()
+
+    def wait_for_pending(self, msecs=3000):
+        """等待尚未完成的捕获写入数据库，并写入延迟的访问记录 (退出前调用)"""
+        done = self.pipeline.wait(msecs)
+        self.flush_visits()
+        return done
+
+    def filter_stats(self):
+        """捕获过滤各规则的命中次数"""
+        return self.filter.stats()
+
+    def recent_stats(self):
+        """最近内容缓存的命中统计 {'size', 'hits', 'misses'}"""
+        return self.recent.stats()
+
+    def _schedule_visit_flush(self):
+        # 连续的重复复制不推迟已计划的写入
+        if not self.visit_timer.isActive():
+            self.visit_timer.start()
+
+    def flush_visits(self):
+        """把累计的访问记录批量写入数据库 (任意线程)"""
+        with self._visits_lock:
+            visits, self._visits = self._visits, {}
+        if visits:
+            self.db.bump_visits(visits)
+
+    # --- 以下在捕获流水线的工作线程中执行 ---
+    def _prepare(self, job):
+        """先按过滤规则检查，再使用责任链模式选择处理器并完成准备阶段"""
+        if self.filter.check_snapshot(job.snapshot) is not None:
+            return
+        for handler in self.handlers:
+            if handler.can_handle(job.snapshot):
+                log.debug(f"使用 {handler.__class__.__name__} 处理")
+                job.handler = handler
+                job.payload = handler.prepare(job.snapshot, self.db, job.partition_info)
+                if job.payload is not None and job.payload.fields is not None:
+                    try:
+                        job.payload.fields['tags'] = self.tagger.tags_for(job.payload.fields)
+                    except Exception as e:
+                        log.error(f"计算自动标签失败: {e}", exc_info=True)
+                return
+
+        # 没有处理器能处理该数据
+        log.debug(f"没有合适的处理器。可用格式: {job.snapshot.formats()}")
+
+    def _store(self, job):
+        # 项目被永久删除后，记住的项目ID可能已失效
+        purge_version = self.db.purge_version
+        if purge_version != self._purge_version:
+            self._purge_version = purge_version
+            self.recent.clear()
+
+        key = job.payload.recent_key()
+        item_id = self.recent.get(key) if key is not None else None
+        if item_id is not None:
+            self._record_visit(item_id)
+            job.item_id = item_id
+            self.item_touched.emit(item_id)
+            return
+
+        item, is_new = job.handler.store(job.payload, self.db)
+        if not item:
+            return
+        job.item_id = item.id
+        job.is_new = is_new
+        if is_new:
+            self.item_captured.emit(item.id)
+            self.data_captured.emit(True)
+
+    def _record_visit(self, item_id):
+        with self._visits_lock:
+            count, _ = self._visits.get(item_id, (0, None))
+            self._visits[item_id] = (count + 1, datetime.now())
+        self._visits_pending.emit()
+
+    def _finished(self, job):
+        self.capture_finished.emit(CaptureResult(job))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+剪贴板事件前端
+QClipboard.dataChanged 在一次复制中经常触发多次 (来源程序按顺序写入多种格式)，
+本模块把短时间内连续的事件合并为一次，只处理合并窗口结束时剪贴板的最终内容；
+本程序自己写入剪贴板的数据 (粘贴历史项目) 带有私有 MIME 标记，读到标记时直接丢弃，
+不创建快照，也不经过任何处理器。被合并和被丢弃的事件次数可通过 stats() 查看。
+"""
+import os
+import time
+import logging
+from PyQt5.QtCore import QObject, QTimer, QMimeData, QByteArray
+
+log = logging.getLogger("ClipboardMonitor")
+
+# 本程序写入剪贴板时附加的私有格式 (内容为写入进程的 PID，仅用于调试)
+ORIGIN_MIME = 'application/x-clipboardpro-origin'
+
+
+def mark_own(mime_data):
+    """给将要写入剪贴板的 QMimeData 加上本程序的来源标记"""
+    mime_data.setData(ORIGIN_MIME, QByteArray(str(os.getpid()).encode('ascii')))
+    return mime_data
+
+
+def own_mime_data(text=None, image=None, urls=None):
+    """创建带来源标记的 QMimeData，用于代替 QClipboard.setText/setImage"""
+    mime = QMimeData()
+    if text is not None:
+        mime.setText(text)
+    if image is not None:
+        mime.setImageData(image)
+    if urls:
+        mime.setUrls(urls)
+    return mark_own(mime)
+
+
+def is_own(mime_data):
+    """剪贴板内容是否由本程序 (主窗口或快速面板) 写入"""
+    return mime_data is not None and mime_data.hasFormat(ORIGIN_MIME)
+
+
+class ClipboardMonitor(QObject):
+    """
+    监听剪贴板变化并提交给 ClipboardManager
+    - 每次事件重新开始 window_ms 的合并计时，但从第一次事件起最多等待 max_delay_ms
+    - 计时结束时读取剪贴板：带来源标记则丢弃，否则交给 ClipboardManager 捕获
+    Args:
+        clipboard: QApplication.clipboard()
+        clipboard_manager: ClipboardManager
+        partition_provider: 返回当前分区信息的函数 (可选)
+    """
+
+    WINDOW_MS = 60
+    MAX_DELAY_MS = 300
+
+    def __init__(self, clipboard, clipboard_manager, partition_provider=None,
+                 window_ms=WINDOW_MS, max_delay_ms=MAX_DELAY_MS, parent=None):
+        super().__init__(parent)
+        self.clipboard = clipboard
+        self.cm = clipboard_manager
+        self.partition_provider = partition_provider
+        self.window_ms = window_ms
+        self.max_delay_ms = max_delay_ms
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._flush)
+        # events: 收到的事件  captured: 提交捕获的次数  coalesced: 被合并的事件
+        # self_origin: 本程序写入而被丢弃的事件  empty: 合并后剪贴板为空的次数
+        self.counts = {'events': 0, 'captured': 0, 'coalesced': 0, 'self_origin': 0, 'empty': 0}
+        self._pending = 0
+        self._first_event = 0.0
+        self.clipboard.dataChanged.connect(self._on_changed)
+
+    def _on_changed(self):
+        self.counts['events'] += 1
+        now = time.monotonic()
+        if not self._pending:
+            self._first_event = now
+        self._pending += 1
+        remaining = self.max_delay_ms - (now - self._first_event) * 1000
+        self.timer.start(int(max(0, min(self.window_ms, remaining))))
+
+    def flush(self):
+        """立即处理尚未到期的事件 (退出前调用)"""
+        if self._pending:
+            self.timer.stop()
+            self._flush()
+
+    def _flush(self):
+        events, self._pending = self._pending, 0
+        if not events:
+            return
+        self.counts['coalesced'] += events - 1
+        mime = self.clipboard.mimeData()
+        if is_own(mime):
+            self.counts['self_origin'] += events
+            log.debug(f"🔁 忽略本程序写入的剪贴板内容 ({events} 个事件)")
+            return
+        if mime is None or not mime.formats():
+            self.counts['empty'] += 1
+            return
+        if events > 1:
+            log.debug(f"合并了 {events} 个剪贴板事件")
+        partition_info = self.partition_provider() if self.partition_provider else None
+        if self.cm.process_clipboard(mime, partition_info):
+            self.counts['captured'] += 1
+
+    def stats(self):
+        return dict(self.counts, suppressed=self.counts['coalesced'] + self.counts['self_origin'])
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+详情面板异步加载器
+在线程池中读取项目详情并把图片解码为 QImage (线程安全)，
+解码结果放入按内存大小限制的 LRU，分区路径通过缓存计算，
+并支持预取相邻行，使上下键浏览截图时无需等待。
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QThreadPool, pyqtSignal, Qt
+from PyQt5.QtGui import QImage
+
+from core.shared import BackgroundTask
+from core.memory_budget import memory_budget
+
+log = logging.getLogger("DetailLoader")
+
+
+def image_nbytes(image):
+    """QImage 占用的字节数 (兼容旧版 PyQt5)"""
+    return image.sizeInBytes() if hasattr(image, 'sizeInBytes') else image.byteCount()
+
+
+class ImageLRU:
+    """
+    按字节数限制容量的解码图片 LRU (线程安全)
+    指定 name 时同时注册到全局内存预算，超出全局上限时会被按全局 LRU 淘汰。
+    """
+
+    def __init__(self, budget_bytes, name=None, label=None):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.account = memory_budget.register(name, self._drop, label) if name else None
+
+    def get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._images.move_to_end(key)
+        if self.account:
+            self.account.touch(key)
+        return image
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._images
+
+    def put(self, key, image):
+        size = image_nbytes(image)
+        if size > self.budget_bytes:
+            return
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self.used_bytes -= image_nbytes(old)
+            self._images[key] = image
+            self.used_bytes += size
+            evicted = self._evict()
+        # 在释放自身锁之后再通知预算，预算的淘汰回调会重新获取该锁
+        if self.account:
+            for old_key in evicted:
+                self.account.forget(old_key)
+            self.account.touch(key, size)
+
+    def discard(self, key):
+        if self._drop(key) and self.account:
+            self.account.forget(key)
+
+    def set_budget(self, budget_bytes):
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            evicted = self._evict()
+        if self.account:
+            for old_key in evicted:
+                self.account.forget(old_key)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self.used_bytes = 0
+        if self.account:
+            self.account.reset()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'count': len(self._images),
+                'used_bytes': self.used_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total) if total else 0.0,
+            }
+
+    def _drop(self, key):
+        """移除条目但不通知预算 (也作为预算的淘汰回调)"""
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self.used_bytes -= image_nbytes(old)
+            return old is not None
+
+    def _evict(self):
+        evicted = []
+        while self.used_bytes > self.budget_bytes and self._images:
+            old_key, old = self._images.popitem(last=False)
+            self.used_bytes -= image_nbytes(old)
+            evicted.append(old_key)
+        return evicted
+
+
+class DetailData:
+    """一次详情加载的结果"""
+    __slots__ = ('item_id', 'content', 'note', 'tags', 'group_name', 'partition_name',
+                 'item_type', 'image_path', 'file_path', 'image')
+
+    def __init__(self, item_id, detail, group_name, partition_name, image):
+        self.item_id = item_id
+        self.content = detail['content']
+        self.note = detail['note']
+        self.tags = detail['tags']
+        self.item_type = detail['item_type']
+        self.image_path = detail['image_path']
+        self.file_path = detail['file_path']
+        self.group_name = group_name
+        self.partition_name = partition_name
+        self.image = image
+
+
+class DetailLoader(QObject):
+    """
+    详情面板的后台加载器
+    - request(item_id): 加载完整详情，完成后发出 loaded(DetailData)
+    - prefetch(item_ids): 仅预先解码图片，放入 LRU
+    """
+
+    loaded = pyqtSignal(object)
+
+    # 详情面板中的图片只需预览尺寸，解码后缩小到此边长以内再缓存
+    MAX_PREVIEW_SIDE = 1024
+
+    def __init__(self, db_manager, image_budget_mb=64, parent=None):
+        super().__init__(parent)
+        self.db = db_manager
+        self.images = ImageLRU(image_budget_mb * 1024 * 1024, "detail_images", "详情图片")
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self._generation = 0
+        self._pending_prefetch = set()
+        self._lock = threading.Lock()
+        # 分区路径缓存 {partition_id: (group_name, partition_name)}，随 db.partition_version 失效
+        self._breadcrumbs = {}
+        self._links = {}
+        self._breadcrumb_version = None
+
+    def request(self, item_id):
+        """请求加载详情；只有最后一次请求的结果会被发出"""
+        self._generation += 1
+        self.pool.start(BackgroundTask(self._load, item_id, self._generation))
+
+    def prefetch(self, item_ids):
+        for item_id in item_ids:
+            with self._lock:
+                if item_id in self._pending_prefetch or item_id in self.images:
+                    continue
+                self._pending_prefetch.add(item_id)
+            self.pool.start(BackgroundTask(self._prefetch, item_id))
+
+    def invalidate(self, item_id):
+        self.images.discard(item_id)
+
+    # --- 以下在工作线程中执行 ---
+    def _load(self, item_id, generation):
+        if generation != self._generation:
+            return  # 已经有更新的请求，跳过
+        detail = self.db.get_item_detail(item_id)
+        if detail is None:
+            return
+        image = None
+        if detail['item_type'] == 'image':
+            image = self._get_image(item_id, detail['image_path'] or detail['file_path'])
+        group_name, partition_name = self._breadcrumb(detail['partition_id'])
+        if generation == self._generation:
+            self.loaded.emit(DetailData(item_id, detail, group_name, partition_name, image))
+
+    def _prefetch(self, item_id):
+        try:
+            self._get_image(item_id, None)
+        finally:
+            with self._lock:
+                self._pending_prefetch.discard(item_id)
+
+    def _get_image(self, item_id, fallback_path):
+        image = self.images.get(item_id)
+        if image is not None:
+            return image
+        image = QImage()
+        blob = self.db.get_item_blob(item_id)
+        if blob:
+            image.loadFromData(blob)
+        elif fallback_path and os.path.exists(fallback_path):  # 兼容旧数据
+            image.load(fallback_path)
+        if image.isNull():
+            return None
+        if image.width() > self.MAX_PREVIEW_SIDE or image.height() > self.MAX_PREVIEW_SIDE:
+            image = image.scaled(self.MAX_PREVIEW_SIDE, self.MAX_PREVIEW_SIDE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.images.put(item_id, image)
+        return image
+
+    def _breadcrumb(self, partition_id):
+        if partition_id is None:
+            return None, None
+        with self._lock:
+            if self._breadcrumb_version != self.db.partition_version:
+                self._breadcrumbs = {}
+                self._links = self.db.get_partition_links()
+                self._breadcrumb_version = self.db.partition_version
+            if partition_id in self._breadcrumbs:
+                return self._breadcrumbs[partition_id]
+            path_parts = []
+            current, seen = partition_id, set()
+            while current is not None and current in self._links and current not in seen:
+                seen.add(current)
+                name, parent_id = self._links[current]
+                path_parts.append(name)
+                current = parent_id
+            path_parts.reverse()  # 反转得到 "父 -> 子" 的顺序
+            result = (path_parts[0] if path_parts else None, " -> ".join(path_parts) if path_parts else None)
+            self._breadcrumbs[partition_id] = result
+            return result
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+文件项目的按需还原
+多文件/文件夹捕获只保存清单 (file_manifest) 和按内容哈希去重的文件内容 (file_blobs 表)，
+只有在导出或原文件已不存在而需要粘贴时，才把清单还原为 ZIP 压缩包。
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import zipfile
+
+log = logging.getLogger("FileArchive")
+
+CHUNK_SIZE = 1024 * 1024
+PASTE_DIR = os.path.join(tempfile.gettempdir(), "ClipboardPro")
+
+
+def load_manifest(text):
+    """解析 file_manifest，返回 {'folders', 'files', 'stored'}；没有清单时返回 None"""
+    if not text:
+        return None
+    manifest = json.loads(text)
+    if isinstance(manifest, list):  # 早期格式只有文件列表 (均为引用)
+        manifest = {'folders': [], 'files': manifest, 'stored': False}
+    return manifest
+
+
+def _reference_unchanged(entry):
+    """只保存引用的文件：原文件仍存在且大小和修改时间未变"""
+    try:
+        st = os.stat(entry['path'])
+    except OSError:
+        return False
+    return st.st_size == entry['size'] and int(st.st_mtime) == entry['mtime']
+
+
+def write_archive(db, manifest, fileobj):
+    """
+    按清单写出 ZIP：已存储的文件从 file_blobs 逐个读取，只保存引用的文件从原路径流式读取
+    Returns:
+        list: 无法还原 (内容缺失或原文件已变化) 的文件名
+    """
+    skipped = []
+    with zipfile.ZipFile(fileobj, mode='w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for folder in manifest.get('folders', []):
+            zf.writestr(folder.rstrip('/') + '/', b"")
+        for entry in manifest['files']:
+            info = zipfile.ZipInfo(entry['name'], date_time=_zip_time(entry['mtime']))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            if manifest.get('stored'):
+                data = db.get_file_blob(entry['hash'])
+                if data is None:
+                    skipped.append(entry['name'])
+                    continue
+                zf.writestr(info, data)
+            elif _reference_unchanged(entry):
+                info.file_size = entry['size']
+                with open(entry['path'], 'rb') as src, zf.open(info, 'w', force_zip64=True) as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            else:
+                skipped.append(entry['name'])
+    if skipped:
+        log.warning(f"⚠️ {len(skipped)} 个文件无法还原: {', '.join(skipped[:5])}")
+    return skipped
+
+
+def _zip_time(mtime):
+    return time.localtime(max(mtime, 315532800))[:6]  # ZIP 不支持 1980 年之前的时间
+
+
+def _single_entry(manifest):
+    """清单只包含一个文件 (且没有文件夹) 时返回该文件，否则返回 None"""
+    if len(manifest['files']) == 1 and not manifest.get('folders'):
+        return manifest['files'][0]
+    return None
+
+
+def _write_single(db, manifest, entry, fileobj):
+    if manifest.get('stored'):
+        data = db.get_file_blob(entry['hash'])
+        if data is None:
+            return False
+        fileobj.write(data)
+        return True
+    if not _reference_unchanged(entry):
+        return False
+    with open(entry['path'], 'rb') as src:
+        shutil.copyfileobj(src, fileobj, CHUNK_SIZE)
+    return True
+
+
+def export_name(item_id, file_path, manifest_text):
+    """导出/还原时的默认文件名：单个文件保留原名，多文件和文件夹为 ZIP"""
+    manifest = load_manifest(manifest_text)
+    paths = [p for p in (file_path or "").split(';') if p]
+    if len(paths) == 1 and (manifest is None or _single_entry(manifest) is not None):
+        return os.path.basename(paths[0])
+    if len(paths) == 1:
+        return os.path.basename(paths[0].rstrip('/\\')) + ".zip"
+    return f"ClipboardPro_{item_id}.zip"
+
+
+def export_item(db, item_id, dest_path):
+    """
+    把文件项目导出到 dest_path：单个文件直接写出，多文件/文件夹写为 ZIP
+    Returns:
+        Tuple[bool, list]: (是否成功, 无法还原的文件名)
+    """
+    row = db.get_item_files(item_id)
+    if row is None:
+        return False, []
+    file_path, manifest_text, data_blob = row
+    manifest = load_manifest(manifest_text)
+    try:
+        if data_blob is not None:
+            with open(dest_path, 'wb') as f:
+                f.write(data_blob)
+            return True, []
+        if manifest is None:
+            return False, []
+        single = _single_entry(manifest)
+        with open(dest_path, 'wb') as f:
+            if single is not None:
+                ok = _write_single(db, manifest, single, f)
+                skipped = [] if ok else [single['name']]
+            else:
+                skipped = write_archive(db, manifest, f)
+        if single is not None and skipped:
+            os.remove(dest_path)
+            return False, skipped
+        return True, skipped
+    except OSError as e:
+        log.error(f"导出项目 {item_id} 失败: {e}")
+        return False, []
+
+
+def paste_paths(db, item_id, file_path):
+    """
+    粘贴文件项目时使用的本地路径：原文件都还在时直接使用原路径，
+    否则把保存的内容还原到临时目录 (多文件为 ZIP)；无法还原时返回原路径中仍存在的部分
+    """
+    paths = [p for p in (file_path or "").split(';') if p]
+    existing = [p for p in paths if os.path.exists(p)]
+    if paths and len(existing) == len(paths):
+        return paths
+    row = db.get_item_files(item_id)
+    if row is None:
+        return existing
+    _, manifest_text, data_blob = row
+    if data_blob is None and load_manifest(manifest_text) is None:
+        return existing
+    dest_dir = os.path.join(PASTE_DIR, str(item_id))
+    dest = os.path.join(dest_dir, export_name(item_id, file_path, manifest_text))
+    if not os.path.exists(dest):
+        os.makedirs(dest_dir, exist_ok=True)
+        ok, _ = export_item(db, item_id, dest)
+        if not ok:
+            return existing
+        log.info(f"📦 原文件已不存在，已还原到 {dest}")
+    return [dest]
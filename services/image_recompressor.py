@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+图片后台重新压缩
+捕获时图片以快速 PNG 入库 (见 ImageCodecPolicy)，一段时间没有新的捕获后，
+在低优先级的工作线程中逐张重新压缩为更紧凑的格式 (最高压缩级别的 PNG 或无损 WebP)：
+- 解码新数据并与原图逐像素比较，一致才替换
+- 替换是一条带条件的 UPDATE，期间数据被修改则放弃
+- 每轮结束后汇总节省的字节数
+"""
+import time
+import logging
+import threading
+from PyQt5.QtCore import QObject, QThread, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from core.shared import BackgroundTask, format_bytes
+from handlers.image_handler import CODEC_FAST_PNG, ImageCodecPolicy, encode_image, probe_image_header
+
+log = logging.getLogger("ImageRecompressor")
+
+
+class ImageRecompressor(QObject):
+    """
+    - schedule(): 有新的捕获时调用，重新开始空闲计时；正在进行的一轮会在当前图片完成后暂停
+    - start_pass(): 立即开始一轮
+    - stats(): 累计结果
+    """
+
+    finished = pyqtSignal(dict)  # 一轮结束: {'items', 'recompressed', 'bytes_before', 'bytes_after', 'interrupted'}
+
+    IDLE_MS = 30000
+    BATCH = 8
+
+    def __init__(self, db_manager, policy=None, idle_ms=IDLE_MS, parent=None):
+        super().__init__(parent)
+        self.db = db_manager
+        self.policy = policy or ImageCodecPolicy()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(idle_ms)
+        self.timer.timeout.connect(self.start_pass)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.totals = {'items': 0, 'recompressed': 0, 'bytes_before': 0, 'bytes_after': 0}
+        self._running = False
+        self._stopped = False
+        self._interrupt = threading.Event()
+        self._lock = threading.Lock()
+        self.finished.connect(self._on_finished)
+
+    def schedule(self):
+        if self._running:
+            self._interrupt.set()
+        self.timer.start()
+
+    def start_pass(self):
+        with self._lock:
+            if self._running or not self.policy.target_formats():
+                return
+            self._running = True
+        self._interrupt.clear()
+        self.pool.start(BackgroundTask(self._run))
+
+    def stop(self, msecs=3000):
+        """停止后台任务 (退出前调用)"""
+        self._stopped = True
+        self.timer.stop()
+        self._interrupt.set()
+        return self.pool.waitForDone(msecs)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.totals, saved=self.totals['bytes_before'] - self.totals['bytes_after'])
+
+    def _on_finished(self, report):
+        if report['interrupted'] and not self._stopped and not self.timer.isActive():
+            self.timer.start()
+
+    # --- 以下在工作线程中执行 ---
+    def _run(self):
+        QThread.currentThread().setPriority(QThread.LowestPriority)
+        report = {'items': 0, 'recompressed': 0, 'bytes_before': 0, 'bytes_after': 0, 'interrupted': False}
+        start = time.perf_counter()
+        seen = set()  # 本轮已处理的项目 (替换失败时不会在同一轮中反复重试)
+        try:
+            while not self._interrupt.is_set():
+                candidates = self.db.get_recompress_candidates(
+                    (CODEC_FAST_PNG, None), self.policy.min_bytes, self.BATCH + len(seen))
+                candidates = [c for c in candidates if c[0] not in seen]
+                if not candidates:
+                    break
+                for item_id, codec in candidates[:self.BATCH]:
+                    seen.add(item_id)
+                    if self._interrupt.is_set():
+                        break
+                    self._recompress(item_id, codec, report)
+            report['interrupted'] = self._interrupt.is_set()
+        finally:
+            with self._lock:
+                self._running = False
+                for key in ('items', 'recompressed', 'bytes_before', 'bytes_after'):
+                    self.totals[key] += report[key]
+            if report['recompressed']:
+                saved = report['bytes_before'] - report['bytes_after']
+                log.info(f"♻️ 重新压缩 {report['recompressed']}/{report['items']} 张图片: "
+                         f"{format_bytes(report['bytes_before'])} → {format_bytes(report['bytes_after'])}，"
+                         f"节省 {format_bytes(saved)} ({(time.perf_counter() - start):.1f}s)")
+            self.finished.emit(report)
+
+    def _recompress(self, item_id, codec, report):
+        """重新压缩一张图片；无论是否替换都会更新编码标记，避免重复处理"""
+        blob = self.db.get_item_blob(item_id)
+        if not blob:
+            return
+        report['items'] += 1
+        header = probe_image_header(blob)
+        original_codec = header[0].lower() if header else 'unknown'
+        image = QImage()
+        if not image.loadFromData(blob):
+            log.warning(f"图片 {item_id} 无法解码，跳过重新压缩")
+            self.db.replace_item_blob(item_id, codec, len(blob), original_codec)
+            return
+
+        best_codec, best = None, None
+        for fmt in self.policy.target_formats():
+            data = encode_image(image, fmt.upper(), ImageCodecPolicy.TARGET_QUALITY[fmt])
+            if data and (best is None or len(data) < len(best)):
+                best_codec, best = fmt, data
+
+        if best is None or len(best) > len(blob) * (1 - self.policy.min_saving):
+            self.db.replace_item_blob(item_id, codec, len(blob), original_codec)
+            return
+        if not self._verify(image, best):
+            log.warning(f"图片 {item_id} 重新压缩为 {best_codec} 后像素不一致，保留原数据")
+            self.db.replace_item_blob(item_id, codec, len(blob), original_codec)
+            return
+        if self.db.replace_item_blob(item_id, codec, len(blob), best_codec, best):
+            report['recompressed'] += 1
+            report['bytes_before'] += len(blob)
+            report['bytes_after'] += len(best)
+            log.debug(f"图片 {item_id}: {format_bytes(len(blob))} → {best_codec} {format_bytes(len(best))}")
+
+    @staticmethod
+    def _verify(image, data):
+        """解码新数据并与原图逐像素比较"""
+        decoded = QImage()
+        if not decoded.loadFromData(data):
+            return False
+        fmt = QImage.Format_ARGB32
+        return decoded.convertToFormat(fmt) == image.convertToFormat(fmt)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+分页预取缓存
+当前页显示后，在后台线程中预先读取相邻页的轻量记录 (ItemRecord)，
+翻页时直接命中缓存，无需再次计数和查询。
+缓存条目带有数据库的 data_version，任何写操作提交后自动失效。
+"""
+import logging
+import threading
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QThreadPool
+
+from core.shared import BackgroundTask
+from core.memory_budget import memory_budget
+
+log = logging.getLogger("PageCache")
+
+
+class PageCache(QObject):
+    """
+    - get(query, page_size, page): 命中返回 (总数, 记录列表)，否则返回 None
+    - put(...): 保存刚加载的当前页
+    - prefetch_around(...): 预取当前页前后各 radius 页
+    """
+
+    def __init__(self, db_manager, radius=1, capacity=8, parent=None):
+        super().__init__(parent)
+        self.db = db_manager
+        self.radius = radius
+        self.capacity = max(capacity, 2 * radius + 2)  # 至少容纳当前页和前后各 radius 页
+        self.hits = 0
+        self.misses = 0
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._pages = OrderedDict()  # {(查询键, 每页条数, 页码): (版本, 总数, 记录列表)}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.account = memory_budget.register("page_cache", self._drop, "分页预取")
+
+    @staticmethod
+    def make_key(query):
+        """把查询条件字典转换为可哈希的键"""
+        def freeze(value):
+            if isinstance(value, dict):
+                return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+            if isinstance(value, (list, tuple, set)):
+                return tuple(freeze(v) for v in value)
+            return value
+        return freeze(query)
+
+    def set_budget(self, radius, capacity=None):
+        """调整预取范围 (当前页前后各 radius 页) 和最多缓存的页数"""
+        with self._lock:
+            self.radius = max(0, radius)
+            self.capacity = max(capacity or self.capacity, 2 * self.radius + 2)
+            evicted = self._evict()
+        self._forget(evicted)
+
+    def get(self, query, page_size, page):
+        key = (self.make_key(query), page_size, page)
+        with self._lock:
+            entry = self._pages.get(key)
+            hit = entry is not None and entry[0] == self.db.data_version
+            if hit:
+                self.hits += 1
+                self._pages.move_to_end(key)
+            else:
+                if entry is not None:
+                    del self._pages[key]
+                self.misses += 1
+        if not hit:
+            if entry is not None:
+                self.account.forget(key)
+            return None
+        self.account.touch(key)
+        return entry[1], entry[2]
+
+    def put(self, query, page_size, page, total, records, version=None):
+        key = (self.make_key(query), page_size, page)
+        with self._lock:
+            evicted = self._put(key, self.db.data_version if version is None else version, total, records)
+        self._account_put(key, records, evicted)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+        self.account.reset()
+
+    def prefetch_around(self, query, page_size, page, total):
+        """当前页显示后调用；在后台读取相邻页"""
+        if page_size <= 0 or self.radius <= 0:
+            return
+        total_pages = (total + page_size - 1) // page_size
+        qkey = self.make_key(query)
+        version = self.db.data_version
+        # 先下一页再上一页，由近及远
+        targets = []
+        for d in range(1, self.radius + 1):
+            targets.extend((page + d, page - d))
+        for p in targets:
+            if not 1 <= p <= total_pages:
+                continue
+            key = (qkey, page_size, p)
+            with self._lock:
+                entry = self._pages.get(key)
+                if (entry is not None and entry[0] == version) or key in self._pending:
+                    continue
+                self._pending.add(key)
+            self.pool.start(BackgroundTask(self._fetch, key, query, page_size, p, total, version))
+
+    # --- 以下在工作线程中执行 ---
+    def _fetch(self, key, query, page_size, page, total, version):
+        try:
+            if version != self.db.data_version:
+                return  # 发起预取后数据库已被修改，放弃
+            records = self.db.get_item_records(limit=page_size, offset=(page - 1) * page_size, **query)
+            with self._lock:
+                if version != self.db.data_version:
+                    return
+                evicted = self._put(key, version, total, records)
+            self._account_put(key, records, evicted)
+            log.debug(f"📄 已预取第 {page} 页 ({len(records)} 条)")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    # 以下 _put/_evict 在锁内调用，返回被淘汰的键，由调用方在释放锁后通知内存预算
+    def _put(self, key, version, total, records):
+        self._pages[key] = (version, total, records)
+        self._pages.move_to_end(key)
+        return self._evict()
+
+    def _evict(self):
+        evicted = []
+        while len(self._pages) > self.capacity:
+            evicted.append(self._pages.popitem(last=False)[0])
+        return evicted
+
+    def _account_put(self, key, records, evicted):
+        self._forget(evicted)
+        self.account.touch(key, sum(r.nbytes() for r in records) + 64)
+
+    def _forget(self, keys):
+        for key in keys:
+            self.account.forget(key)
+
+    def _drop(self, key):
+        """内存预算的淘汰回调"""
+        with self._lock:
+            self._pages.pop(key, None)
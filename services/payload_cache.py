@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+粘贴内容的按需读取缓存
+列表只持有ID和显示字段，激活 (粘贴) 时才按ID读取完整内容；
+最近用过的几条保存在按字节数限制的小 LRU 中，重复粘贴同一项目时无需再次读库。
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger("PayloadCache")
+
+
+class PayloadCache:
+    """
+    - get(item_id, modified_at=None): 返回 PayloadRecord；传入列表中记录的修改时间时，
+      缓存的内容若已过期 (项目在其他窗口被修改) 会重新读取
+    - invalidate(item_id): 项目被修改或删除后调用
+    """
+
+    def __init__(self, db_manager, budget_mb=16, capacity=32):
+        self.db = db_manager
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.capacity = capacity
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # {item_id: PayloadRecord}
+        self._lock = threading.Lock()
+
+    def get(self, item_id, modified_at=None):
+        with self._lock:
+            payload = self._items.get(item_id)
+            if payload is not None and (modified_at is None or payload.modified_at == modified_at):
+                self.hits += 1
+                self._items.move_to_end(item_id)
+                return payload
+            self.misses += 1
+        payload = self.db.get_item_payload(item_id)
+        if payload is not None:
+            self._put(payload)
+        return payload
+
+    def invalidate(self, item_id):
+        with self._lock:
+            old = self._items.pop(item_id, None)
+            if old is not None:
+                self.used_bytes -= old.nbytes()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.used_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'count': len(self._items),
+                'used_bytes': self.used_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _put(self, payload):
+        size = payload.nbytes()
+        if size > self.budget_bytes:
+            return  # 超大项目不缓存
+        with self._lock:
+            old = self._items.pop(payload.id, None)
+            if old is not None:
+                self.used_bytes -= old.nbytes()
+            self._items[payload.id] = payload
+            self.used_bytes += size
+            while self._items and (self.used_bytes > self.budget_bytes or len(self._items) > self.capacity):
+                _, old = self._items.popitem(last=False)
+                self.used_bytes -= old.nbytes()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+常驻内存的最近项目索引
+供快速面板 (quick.py) 使用：启动时从数据库加载一次紧凑记录，
+之后随剪贴板捕获事件增量更新，输入搜索时完全在内存中过滤。
+"""
+import os
+import logging
+import time
+from datetime import datetime
+
+log = logging.getLogger("RecentIndex")
+
+
+class IndexEntry:
+    """索引中的单条紧凑记录 (不含完整正文和二进制数据)"""
+    __slots__ = ('id', 'haystack', 'display', 'display_lower', 'tooltip',
+                 'item_type', 'url_domain', 'partition_id', 'modified_at', 'is_pinned')
+
+    def __init__(self, record):
+        self.id = record.id
+        self.item_type = record.item_type or 'text'
+        self.url_domain = record.url_domain
+        self.partition_id = record.partition_id
+        self.modified_at = record.modified_at
+        self.is_pinned = bool(record.is_pinned)
+        self.display = self._make_display(record)
+        self.display_lower = self.display.lower()
+        self.tooltip = record.preview
+        # 搜索范围与数据库搜索一致：内容(预览)、备注、标签
+        parts = [record.preview, record.note, self.display]
+        parts.extend(record.tags)
+        self.haystack = "\n".join(p for p in parts if p).lower()
+
+    @staticmethod
+    def _make_display(record):
+        if record.item_type == 'file' and record.file_path:
+            return os.path.basename(record.file_path)
+        elif record.item_type == 'url' and record.url_domain:
+            return f"[{record.url_domain}] {record.url_title or ''}"
+        elif record.item_type == 'image':
+            return "[图片] " + (os.path.basename(record.image_path) if record.image_path else "")
+        return record.preview.replace('\n', ' ').replace('\r', '').strip()[:150]
+
+
+class RecentIndex:
+    """
+    最近项目的内存索引
+    - entries 按与数据库 "manual" 排序一致的顺序保存 (置顶在前)
+    - search() 在上一次查询的结果上继续收窄 (新查询以旧查询为前缀且范围不变时)
+    """
+
+    def __init__(self, db_manager, capacity=5000, top_k=200):
+        self.db = db_manager
+        self.capacity = capacity
+        self.top_k = top_k
+        self.entries = []
+        self._version = 0
+        # 增量过滤缓存: (版本, 范围键, 查询词, 匹配到的条目列表)
+        self._last = None
+
+    def rebuild(self):
+        """从数据库重新加载最近的 capacity 条记录"""
+        start = time.perf_counter()
+        records = self.db.get_item_records(limit=self.capacity)
+        self.entries = [IndexEntry(r) for r in records]
+        self._invalidate()
+        log.info(f"📇 最近项目索引已重建: {len(self.entries)} 条, 耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def upsert(self, item_ids):
+        """捕获事件后增量更新：重新读取指定ID的记录并放到非置顶区的最前面"""
+        records = self.db.get_item_records_by_ids(list(item_ids))
+        ids = set(item_ids)
+        self.entries = [e for e in self.entries if e.id not in ids]
+        new_entries = [IndexEntry(r) for r in records]
+        pinned = [e for e in new_entries if e.is_pinned]
+        normal = [e for e in new_entries if not e.is_pinned]
+        pos = 0
+        while pos < len(self.entries) and self.entries[pos].is_pinned:
+            pos += 1
+        self.entries[pos:pos] = normal
+        self.entries[0:0] = pinned
+        del self.entries[self.capacity:]
+        self._invalidate()
+
+    def remove(self, item_ids):
+        ids = set(item_ids)
+        self.entries = [e for e in self.entries if e.id not in ids]
+        self._invalidate()
+
+    def _invalidate(self):
+        self._version += 1
+        self._last = None
+
+    def search(self, text, partition_ids=None, today_only=False):
+        """
+        返回排名前 top_k 的条目列表
+
+        Args:
+            text: 搜索词 (不区分大小写)
+            partition_ids: 限定的分区ID集合 (None 表示不限制)
+            today_only: 仅今日修改的项目
+        """
+        query = text.strip().lower()
+        scope = (frozenset(partition_ids) if partition_ids is not None else None, today_only)
+
+        last = self._last
+        if last and last[0] == self._version and last[1] == scope and query.startswith(last[2]):
+            # 新查询是旧查询的延伸：只需在上一次的匹配结果里继续过滤
+            candidates = last[3]
+            if query != last[2]:
+                candidates = [e for e in candidates if query in e.haystack]
+        else:
+            candidates = self._scope_entries(scope)
+            if query:
+                candidates = [e for e in candidates if query in e.haystack]
+        self._last = (self._version, scope, query, candidates)
+
+        return self._rank(candidates, query)
+
+    def _scope_entries(self, scope):
+        partition_ids, today_only = scope
+        entries = self.entries
+        if partition_ids is not None:
+            entries = [e for e in entries if e.partition_id in partition_ids]
+        if today_only:
+            today = datetime.now().date()
+            entries = [e for e in entries if e.modified_at and e.modified_at.date() == today]
+        return entries
+
+    def _rank(self, candidates, query):
+        """置顶优先，其次显示文本以查询词开头的，最后保持原有顺序"""
+        if not query:
+            return candidates[:self.top_k]
+        # 按 (是否置顶, 是否前缀匹配) 分桶，桶内保持原顺序，等价于稳定排序但无需比较
+        buckets = ([], [], [], [])
+        for e in candidates:
+            buckets[(0 if e.is_pinned else 2) + (0 if e.display_lower.startswith(query) else 1)].append(e)
+        ranked = []
+        for bucket in buckets:
+            ranked.extend(bucket[:self.top_k - len(ranked)])
+            if len(ranked) >= self.top_k:
+                break
+        return ranked
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+标签联想索引
+- 前缀：字典树 (Trie)，每个节点保存子树内按热度排序的前 top_k 个标签，前缀查询只需沿输入走一遍
+- 子串：1~3 字符的 n-gram 倒排表，取最短的倒排表逐个校验，结果天然按热度有序
+- 热度 (frecency)：引用次数 × 最近使用时间的衰减权重
+标签按热度排名编号 (rank)，所有倒排表都按 rank 升序保存，查询时无需再排序。
+"""
+import time
+import logging
+from datetime import datetime
+
+log = logging.getLogger("TagIndex")
+
+MAX_GRAM = 3
+RECENCY_HALF_LIFE_DAYS = 14.0
+
+
+def frecency(count, last_used, now=None):
+    """引用次数越多、最近越常用的标签得分越高；从未使用过的标签只按次数计分"""
+    score = (count or 0) + 1.0
+    if last_used is None:
+        return score
+    age_days = max(0.0, ((now or datetime.now()) - last_used).total_seconds() / 86400.0)
+    return score * (1.0 + 4.0 * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS))
+
+
+class _TrieNode:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # 子树内的标签 rank，升序，最多 top_k 个
+
+
+class TagSuggestionIndex:
+    """
+    标签联想索引
+    - build(rows): rows 为 [(name, count, last_used), ...]
+    - search(text, limit): 返回 [(name, count), ...]，前缀匹配优先，其余子串匹配随后，各自按热度排序
+    """
+
+    def __init__(self, top_k=60):
+        self.top_k = top_k
+        self.names = []     # rank -> 标签名
+        self.counts = []    # rank -> 引用次数
+        self._lower = []    # rank -> 小写标签名
+        self._by_lower = {}
+        self._trie = _TrieNode()
+        self._grams = {}    # n-gram -> [rank, ...] (升序)
+
+    def __len__(self):
+        return len(self.names)
+
+    def build(self, rows):
+        start = time.perf_counter()
+        now = datetime.now()
+        ranked = sorted(rows, key=lambda r: (-frecency(r[1], r[2], now), r[0]))
+
+        self.names = [r[0] for r in ranked]
+        self.counts = [r[1] or 0 for r in ranked]
+        self._lower = [name.lower() for name in self.names]
+        self._by_lower = {}
+        self._trie = _TrieNode()
+        self._grams = {}
+
+        # 按 rank 升序插入，每个列表追加即有序
+        for rank, lower in enumerate(self._lower):
+            self._by_lower.setdefault(lower, rank)
+            node = self._trie
+            for ch in lower:
+                node = node.children.setdefault(ch, _TrieNode())
+                if len(node.top) < self.top_k:
+                    node.top.append(rank)
+            grams = set()
+            for n in range(1, MAX_GRAM + 1):
+                for i in range(len(lower) - n + 1):
+                    grams.add(lower[i:i + n])
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(rank)
+
+        log.debug(f"标签索引已构建: {len(self.names)} 个标签, {len(self._grams)} 个 n-gram, "
+                  f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def contains(self, text):
+        """是否存在同名标签 (不区分大小写)"""
+        return text.strip().lower() in self._by_lower
+
+    def search(self, text, limit=None):
+        limit = limit or self.top_k
+        query = text.strip().lower()
+        if not query:
+            return [(self.names[r], self.counts[r]) for r in range(min(limit, len(self.names)))]
+
+        prefix = self._prefix_ranks(query)[:limit]
+        result = list(prefix)
+        if len(result) < limit:
+            taken = set(prefix)
+            for rank in self._substring_ranks(query):
+                if rank not in taken:
+                    result.append(rank)
+                    if len(result) >= limit:
+                        break
+        return [(self.names[r], self.counts[r]) for r in result]
+
+    def _prefix_ranks(self, query):
+        node = self._trie
+        for ch in query:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return node.top
+
+    def _substring_ranks(self, query):
+        """按 rank 升序惰性产出包含 query 的标签"""
+        if len(query) <= MAX_GRAM:
+            yield from self._grams.get(query, ())
+            return
+        # 取查询中最稀有的 n-gram 作为候选，再逐个校验完整子串
+        postings = None
+        for i in range(len(query) - MAX_GRAM + 1):
+            p = self._grams.get(query[i:i + MAX_GRAM])
+            if p is None:
+                return
+            if postings is None or len(p) < len(postings):
+                postings = p
+        lower = self._lower
+        for rank in postings:
+            if query in lower[rank]:
+                yield rank
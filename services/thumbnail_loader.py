@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+画廊视图的缩略图异步解码
+只解码界面请求的 (可见区域 + 预读范围) 项目，在线程池中把 thumbnail_blob 解码为 QImage，
+缩放到格子尺寸后放入按内存大小限制的 LRU；解码完成后通过 ready 信号通知界面重绘。
+"""
+import logging
+import threading
+from PyQt5.QtCore import QObject, QThreadPool, pyqtSignal, Qt
+from PyQt5.QtGui import QImage
+
+from core.shared import BackgroundTask
+from services.detail_loader import ImageLRU
+
+log = logging.getLogger("ThumbnailLoader")
+
+
+class ThumbnailLoader(QObject):
+    """
+    - thumbnail(item_id): 已解码的缩略图 (QImage)，未就绪时返回 None
+    - request(item_ids): 设置当前需要的项目，未缓存的分批提交到线程池；
+      不再需要的旧请求在开始解码前被丢弃，快速滚动时不会积压
+    """
+
+    ready = pyqtSignal(list)  # 本批解码完成的项目ID
+
+    BATCH = 24
+
+    def __init__(self, db_manager, side=160, budget_mb=48, parent=None):
+        super().__init__(parent)
+        self.db = db_manager
+        self.side = side
+        self.images = ImageLRU(budget_mb * 1024 * 1024, "gallery_thumbnails", "画廊缩略图")
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self._wanted = set()
+        self._pending = set()
+        self._missing = set()  # 没有可用图片数据的项目，不再重复请求
+        self._lock = threading.Lock()
+
+    def thumbnail(self, item_id):
+        return self.images.get(item_id)
+
+    def request(self, item_ids):
+        with self._lock:
+            self._wanted = set(item_ids)
+            todo = [i for i in item_ids
+                    if i not in self._pending and i not in self._missing and i not in self.images]
+            self._pending.update(todo)
+        for start in range(0, len(todo), self.BATCH):
+            self.pool.start(BackgroundTask(self._decode, todo[start:start + self.BATCH]))
+
+    def invalidate(self, item_id):
+        self.images.discard(item_id)
+        with self._lock:
+            self._missing.discard(item_id)
+
+    # --- 以下在工作线程中执行 ---
+    def _decode(self, item_ids):
+        try:
+            with self._lock:
+                ids = [i for i in item_ids if i in self._wanted]
+            if not ids:
+                return
+            blobs = self.db.get_thumbnail_blobs(ids)
+            done = []
+            for item_id in ids:
+                # 旧数据可能没有缩略图，退回到原图解码
+                blob = blobs.get(item_id) or self.db.get_item_blob(item_id)
+                image = QImage()
+                if blob:
+                    image.loadFromData(blob)
+                if image.isNull():
+                    with self._lock:
+                        self._missing.add(item_id)
+                    continue
+                if image.width() > self.side or image.height() > self.side:
+                    image = image.scaled(self.side, self.side, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                self.images.put(item_id, image)
+                done.append(item_id)
+            if done:
+                self.ready.emit(done)
+        finally:
+            with self._lock:
+                self._pending.difference_update(item_ids)
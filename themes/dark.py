@@ -210,7 +210,7 @@ QMainWindow::separator:hover {
 /* =======================================================
    主列表表格
    ======================================================= */
-QTableWidget {
+QTableView {
     background-color: #1e1e1e;
     gridline-color: transparent;
     border: none;
@@ -218,18 +218,24 @@ QTableWidget {
     selection-color: #ffffff;
     alternate-background-color: #252526;
 }
-QTableWidget::item {
+QTableView::item {
     padding: 4px;
     border: none;
 }
-QTableWidget::item:hover {
+QTableView::item:hover {
     background-color: #2a2d2e;
 }
-QTableWidget::item:selected {
+QTableView::item:selected {
     background-color: #37373d;
     color: #ffffff;
 }
 
+/* 画廊视图 (卡片由 GalleryDelegate 绘制) */
+#GalleryView {
+    background-color: #1e1e1e;
+    border: none;
+}
+
 QHeaderView::section {
     background-color: #252526;
     color: #cccccc;
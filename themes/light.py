@@ -94,17 +94,17 @@ QMainWindow::separator {
 /* =======================================================
    列表/表格/树
    ======================================================= */
-QTableWidget, QTreeWidget {
+QTableView, QTreeWidget {
     background-color: #ffffff;
     border: none;
     alternate-background-color: #fcfcfc;
 }
 
-QTableWidget::item:hover, QTreeWidget::item:hover {
+QTableView::item:hover, QTreeWidget::item:hover {
     background-color: #f0f0f0;
 }
 
-QTableWidget::item:selected, QTreeWidget::item:selected {
+QTableView::item:selected, QTreeWidget::item:selected {
     background-color: #e6f7ff;
     color: #000000;
 }
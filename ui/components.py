@@ -225,6 +225,7 @@ class CustomTitleBar(QWidget):
     color_clicked = pyqtSignal()
     pin_clicked = pyqtSignal(bool)
     mode_clicked = pyqtSignal(bool)
+    gallery_clicked = pyqtSignal(bool)
     display_count_changed = pyqtSignal(int)
     
     def __init__(self, parent=None):
@@ -271,6 +272,7 @@ class CustomTitleBar(QWidget):
         self.btn_refresh = self._btn("🔄", "刷新"); self.btn_refresh.setObjectName("ToolBarButton"); self.btn_refresh.clicked.connect(self.refresh_clicked.emit); layout.addWidget(self.btn_refresh)
         self.btn_color = self._btn("🌈", "设置标签颜色"); self.btn_color.setObjectName("ToolBarButton"); self.btn_color.clicked.connect(self.color_clicked.emit); layout.addWidget(self.btn_color)
         self.btn_mode = self._btn("📝", "编辑模式", True); self.btn_mode.setObjectName("ToolBarButton"); self.btn_mode.clicked.connect(self.mode_clicked.emit); layout.addWidget(self.btn_mode)
+        self.btn_gallery = self._btn("🖼️", "画廊视图", True); self.btn_gallery.setObjectName("ToolBarButton"); self.btn_gallery.clicked.connect(self.gallery_clicked.emit); layout.addWidget(self.btn_gallery)
         self.btn_pin = self._btn("📌", "置顶", True); self.btn_pin.setObjectName("ToolBarButton"); self.btn_pin.clicked.connect(self.pin_clicked.emit); layout.addWidget(self.btn_pin)
 
         self.btn_settings = QToolButton()
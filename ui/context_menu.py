@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 import logging
-from PyQt5.QtWidgets import QMenu, QMessageBox
-from PyQt5.QtCore import QSettings
+from PyQt5.QtWidgets import QMenu, QMessageBox, QFileDialog, QApplication
+from PyQt5.QtCore import Qt, QSettings
 from ui.dialogs import ColorDialog
-from core.shared import get_color_icon
+from core.shared import get_color_icon, icon_cache
+from services import file_archive
 
 log = logging.getLogger("ContextMenu")
 
@@ -14,10 +15,11 @@ class ContextMenuHandler:
         self.table = main_window.table
         log.info("✅ 右键菜单 Handler 就绪")
 
-    def show_menu(self, pos):
-        # 1. 坐标转换与有效性检查
-        global_pos = self.table.mapToGlobal(pos)
-        index = self.table.indexAt(pos)
+    def show_menu(self, pos, view=None):
+        # 1. 坐标转换与有效性检查 (view 为发出请求的视图：表格或画廊，二者共用选择模型)
+        view = view or self.table
+        global_pos = view.mapToGlobal(pos)
+        index = view.indexAt(pos)
         
         log.info(f"🖱️ 表格右键点击 - 局部坐标:{pos} -> 全局坐标:{global_pos}")
         
@@ -25,17 +27,11 @@ class ContextMenuHandler:
             log.warning("❌ 点击了空白区域，不显示菜单")
             return
         
-        rows = self.table.selectionModel().selectedRows()
-        if not rows:
+        ids = self.table.selected_ids()
+        if not ids:
             log.warning("❌ 未选中任何行")
             return
-            
-        try:
-            ids = [int(self.table.item(r.row(), 8).text()) for r in rows]  # ID列从9改为8
-            log.info(f"✅ 选中 {len(ids)} 个条目，ID: {ids}")
-        except Exception as e:
-            log.error(f"❌ 解析ID失败: {e}", exc_info=True)
-            return
+        log.info(f"✅ 选中 {len(ids)} 个条目，ID: {ids}")
 
         # 2. 根据上下文构建菜单
         try:
@@ -68,10 +64,13 @@ class ContextMenuHandler:
                 # 颜色
                 cm = menu.addMenu("🎨 颜色标签")
                 c1 = cm.addMenu("常用颜色")
-                for n, c in [("紧急", "#f38ba8"), ("重要", "#f9e2af"), ("完成", "#a6e3a1")]:
+                presets = [("紧急", "#f38ba8"), ("重要", "#f9e2af"), ("完成", "#a6e3a1")]
+                hists = QSettings("ClipboardPro", "ColorHistory").value("colors", [])
+                # 菜单中的颜色图标一次性绘制到图集中，之后直接命中缓存
+                icon_cache.prerender([c for _, c in presets] + list(hists[:5]))
+                for n, c in presets:
                     c1.addAction(get_color_icon(c), n).triggered.connect(lambda _, cl=c, x=ids: self.batch_set_color(x, cl))
                 
-                hists = QSettings("ClipboardPro", "ColorHistory").value("colors", [])
                 if hists:
                     c2 = cm.addMenu("历史记录")
                     for c in hists[:5]:
@@ -81,6 +80,8 @@ class ContextMenuHandler:
                 menu.addAction("清除颜色").triggered.connect(lambda: self.batch_set_color(ids, None))
                 
                 menu.addSeparator()
+                if len(ids) == 1 and self._is_file_item(ids[0]):
+                    menu.addAction("📦 导出文件...").triggered.connect(lambda: self.export_file_item(ids[0]))
                 menu.addAction("🗑️ 移至回收站").triggered.connect(lambda: self.move_to_trash(ids))
 
             log.info("🚀 菜单构建完成，正在弹出...")
@@ -203,6 +204,31 @@ class ContextMenuHandler:
             s.setValue("colors", h[:10])
             self.batch_set_color(ids, dlg.color)
 
+    def _is_file_item(self, item_id):
+        return any(r.id == item_id and r.item_type == 'file' for r in self.table.records())
+
+    def export_file_item(self, item_id):
+        """导出文件项目：单个文件按原名保存，多文件和文件夹此时才还原为 ZIP"""
+        row = self.db.get_item_files(item_id)
+        if row is None:
+            return
+        name = file_archive.export_name(item_id, row[0], row[1])
+        dest, _ = QFileDialog.getSaveFileName(self.mw, "导出文件", name)
+        if not dest:
+            return
+        log.info(f"执行: 导出项目 {item_id} 到 {dest}")
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            ok, skipped = file_archive.export_item(self.db, item_id, dest)
+        finally:
+            QApplication.restoreOverrideCursor()
+        if not ok:
+            QMessageBox.warning(self.mw, "导出失败", "保存的内容已无法还原 (原文件已变化或被删除)")
+        elif skipped:
+            QMessageBox.warning(self.mw, "部分导出", f"{len(skipped)} 个文件无法还原 (原文件已变化或被删除):\n" + "\n".join(skipped[:10]))
+        else:
+            self.mw.statusBar().showMessage(f"✅ 已导出到 {dest}", 3000)
+
     def move_to_trash(self, ids):
         if QMessageBox.question(self.mw, "确认", f"移动 {len(ids)} 条记录到回收站?") == QMessageBox.Yes:
             log.info(f"执行: 移动 {len(ids)} 项到回收站")
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+内存诊断窗口
+显示全局内存预算中各缓存的条目数和占用，可调整全局上限或立即释放可淘汰的缓存。
+"""
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QSpinBox, QAbstractItemView)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+
+from core.memory_budget import memory_budget
+from core.shared import format_bytes
+
+
+class MemoryDiagnosticsDialog(QDialog):
+    cap_changed = pyqtSignal(int)  # 新的全局上限 (MB)
+
+    COLUMNS = ["缓存", "条目数", "可淘汰占用", "固定占用", "淘汰次数"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("内存诊断")
+        self.resize(560, 320)
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        self.lbl_total = QLabel()
+        top.addWidget(self.lbl_total, 1)
+        top.addWidget(QLabel("全局上限:"))
+        self.spin_cap = QSpinBox()
+        self.spin_cap.setRange(32, 8192)
+        self.spin_cap.setSingleStep(32)
+        self.spin_cap.setSuffix(" MB")
+        self.spin_cap.setValue(memory_budget.cap_bytes // (1024 * 1024))
+        self.spin_cap.editingFinished.connect(self._apply_cap)
+        top.addWidget(self.spin_cap)
+        layout.addLayout(top)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.NoSelection)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        bottom = QHBoxLayout()
+        bottom.addStretch(1)
+        btn_trim = QPushButton("释放可淘汰缓存")
+        btn_trim.clicked.connect(self._trim)
+        bottom.addWidget(btn_trim)
+        layout.addLayout(bottom)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.spin_cap.setValue(memory_budget.cap_bytes // (1024 * 1024))
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        stats = memory_budget.stats()
+        self.lbl_total.setText(f"总占用: {format_bytes(stats['used_bytes'])} / {format_bytes(stats['cap_bytes'])}")
+        caches = stats['caches']
+        self.table.setRowCount(len(caches))
+        for row, c in enumerate(caches):
+            values = [c['label'], str(c['count']), format_bytes(c['used_bytes']),
+                      format_bytes(c['fixed_bytes']), str(c['evictions'])]
+            for col, text in enumerate(values):
+                item = self.table.item(row, col)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if col:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    self.table.setItem(row, col, item)
+                item.setText(text)
+
+    def _apply_cap(self):
+        mb = self.spin_cap.value()
+        if mb * 1024 * 1024 != memory_budget.cap_bytes:
+            memory_budget.set_cap(mb * 1024 * 1024)
+            self.cap_changed.emit(mb)
+            self.refresh()
+
+    def _trim(self):
+        memory_budget.trim(0)
+        self.refresh()
@@ -1,8 +1,33 @@
 # -*- coding: utf-8 -*-
 from PyQt5.QtWidgets import (QDialog, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QFrame, 
                              QSizePolicy, QScrollArea, QPushButton, QGraphicsOpacityEffect, QGraphicsDropShadowEffect)
-from PyQt5.QtCore import Qt, QPoint, QTimer, QSize
-from PyQt5.QtGui import QPixmap, QCursor, QTransform, QColor
+import os
+from PyQt5.QtCore import Qt, QPoint, QTimer, QSize, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QCursor, QColor
+from .widgets.tiled_image_view import TiledImageView
+
+class _DecodeSignals(QObject):
+    done = pyqtSignal(int, QImage)
+
+
+class _DecodeTask(QRunnable):
+    """在工作线程中把原图解码为 QImage (二进制数据优先，旧数据从图片路径读取)"""
+
+    def __init__(self, generation, image_blob, image_path):
+        super().__init__()
+        self.generation = generation
+        self.image_blob = image_blob
+        self.image_path = image_path
+        self.signals = _DecodeSignals()
+
+    def run(self):
+        image = QImage()
+        if self.image_blob:
+            image.loadFromData(self.image_blob)
+        elif self.image_path and os.path.exists(self.image_path):  # 兼容旧数据
+            image.load(self.image_path)
+        self.signals.done.emit(self.generation, image)
+
 
 class PreviewDialog(QDialog):
     def __init__(self, parent=None):
@@ -13,11 +38,14 @@ class PreviewDialog(QDialog):
         self.resize(1000, 750)
         
         self.current_scale = 1.0
-        self.original_pixmap = None
+        self.original_image = None
         self.rotation_angle = 0
         self.is_dragging = False
         self.last_mouse_pos = QPoint()
         self.mode = 'image'
+        self._decode_generation = 0
+        self._decode_task = None
+        self._pending_text = ""  # 图片无法解码时改为显示的文本
 
         # 初始化窗口拖动所需的变量
         self.is_window_dragging = False
@@ -86,17 +114,17 @@ class PreviewDialog(QDialog):
         self.image_container_layout.setContentsMargins(40, 40, 40, 40) # 宽大的阴影呼吸空间
         self.image_container_layout.setAlignment(Qt.AlignCenter)
         
-        self.image_label = QLabel()
-        self.image_label.setAlignment(Qt.AlignCenter)
+        # 分块渲染的图片控件：只绘制可见区域，缩放时使用图片金字塔
+        self.image_label = TiledImageView()
         self.image_label.setObjectName("PreviewImage")
         
-        # 注入强物理阴影
-        shadow = QGraphicsDropShadowEffect(self)
-        shadow.setBlurRadius(30)
-        shadow.setXOffset(0)
-        shadow.setYOffset(10)
-        shadow.setColor(QColor(0, 0, 0, 200))
-        self.image_label.setGraphicsEffect(shadow)
+        # 注入强物理阴影 (图片超出视口时关闭，否则阴影需要离屏渲染整张大图)
+        self.image_shadow = QGraphicsDropShadowEffect(self)
+        self.image_shadow.setBlurRadius(30)
+        self.image_shadow.setXOffset(0)
+        self.image_shadow.setYOffset(10)
+        self.image_shadow.setColor(QColor(0, 0, 0, 200))
+        self.image_label.setGraphicsEffect(self.image_shadow)
         
         self.image_container_layout.addWidget(self.image_label)
         self.scroll_area.setWidget(self.image_container)
@@ -204,30 +232,37 @@ class PreviewDialog(QDialog):
         return super().eventFilter(source, event)
 
     def load_data(self, content, item_type, file_path=None, image_path=None, image_blob=None):
+        """图片在工作线程中解码，完成后交给 TiledImageView 显示；其他类型直接显示文本"""
         self.clear_state()
-        
-        pixmap = QPixmap()
-        can_show_image = False
-
-        if item_type == 'image':
-            if image_blob:
-                can_show_image = pixmap.loadFromData(image_blob)
-            else: # 兼容旧数据
-                import os
-                path_to_try = image_path or file_path
-                if path_to_try and os.path.exists(path_to_try):
-                    can_show_image = pixmap.load(path_to_try)
 
-        if can_show_image:
+        if item_type == 'image' and (image_blob or image_path or file_path):
             self.mode = 'image'
-            self.original_pixmap = pixmap
-            self.scroll_area.show()
-            self.controls.show()
-            self.fit_to_window(fast_mode=True)
-            self.update_info_label()
-            self.scroll_area.setFocus()
+            self._pending_text = content
+            self.lbl_info.setText("正在加载图片...")
+            self._decode_task = _DecodeTask(self._decode_generation, image_blob, image_path or file_path)
+            self._decode_task.signals.done.connect(self._on_image_decoded)
+            QThreadPool.globalInstance().start(self._decode_task)
             return
 
+        self._show_text(content)
+
+    def _on_image_decoded(self, generation, image):
+        """解码完成 (GUI 线程)：忽略已被新的预览或关闭取代的结果"""
+        if generation != self._decode_generation:
+            return
+        self._decode_task = None
+        if image.isNull():
+            self._show_text(self._pending_text)
+            return
+        self.original_image = image
+        self.image_label.set_image(image)
+        self.scroll_area.show()
+        self.controls.show()
+        self.fit_to_window(fast_mode=True)
+        self.update_info_label()
+        self.scroll_area.setFocus()
+
+    def _show_text(self, content):
         self.mode = 'text'
         self.text_preview.setPlainText(content)
         self.text_preview.show()
@@ -238,6 +273,9 @@ class PreviewDialog(QDialog):
         self.lbl_info.setText("Text View")
 
     def clear_state(self):
+        self._decode_generation += 1  # 丢弃尚未完成的解码
+        self._decode_task = None
+        self._pending_text = ""
         self.image_label.clear()
         self.image_container.adjustSize()
         self.text_preview.clear()
@@ -245,30 +283,26 @@ class PreviewDialog(QDialog):
         self.text_preview.hide()
         self.current_scale = 1.0
         self.rotation_angle = 0
-        self.original_pixmap = None
+        self.original_image = None
         self.is_dragging = False
         self.setCursor(Qt.ArrowCursor)
 
     def update_image_display(self, fast_mode=False):
-        if not self.original_pixmap: return
-        
-        transform = QTransform().rotate(self.rotation_angle)
-        processed_pixmap = self.original_pixmap.transformed(transform, Qt.SmoothTransformation)
+        if self.original_image is None: return
         
         if self.current_scale <= 0: self.current_scale = 0.1
+        self.current_scale = min(self.current_scale, 32.0)
         
-        target_w = min(int(processed_pixmap.width() * self.current_scale), 10000)
-        target_h = min(int(processed_pixmap.height() * self.current_scale), 10000)
-        
-        mode = Qt.FastTransformation if fast_mode or (processed_pixmap.width() > 3000 and self.current_scale < 1.0) else Qt.SmoothTransformation
-
-        final = processed_pixmap.scaled(target_w, target_h, Qt.KeepAspectRatio, mode)
-        self.image_label.setPixmap(final)
-        self.image_label.setFixedSize(final.size()) # 锁定标签尺寸，防止抖动
+        # 不再对整张原图做旋转/缩放，只更新视图参数；可见图块按需从金字塔中对应的一级绘制
+        self.image_label.set_view(self.current_scale, self.rotation_angle)
+        self.image_shadow.setEnabled(
+            self.image_label.width() <= self.scroll_area.width() and self.image_label.height() <= self.scroll_area.height()
+        )
         self.image_container.adjustSize() # 驱动容器重新计算阴影边距
         
         self.update_cursor()
-        self.update_info_label(processed_pixmap.width(), processed_pixmap.height())
+        w, h = self.image_label.image_size()
+        self.update_info_label(w, h)
 
     def update_cursor(self):
         if self.mode == 'image' and (self.current_scale > 1.0 or self.image_label.width() > self.scroll_area.width() or self.image_label.height() > self.scroll_area.height()):
@@ -278,8 +312,8 @@ class PreviewDialog(QDialog):
 
     def update_info_label(self, w=0, h=0):
         if self.mode == 'image':
-            if w == 0 and self.original_pixmap:
-                w, h = self.original_pixmap.width(), self.original_pixmap.height()
+            if w == 0 and self.original_image is not None:
+                w, h = self.original_image.width(), self.original_image.height()
             self.lbl_info.setText(f"{w}x{h} | {int(self.current_scale*100)}% | {self.rotation_angle}°")
         else:
             self.lbl_info.setText("Text View")
@@ -298,14 +332,14 @@ class PreviewDialog(QDialog):
         self.update_image_display()
     
     def fit_to_window(self, fast_mode=False):
-        if not self.original_pixmap: return
+        if self.original_image is None: return
         self.rotation_angle = 0
         
         view_w = self.scroll_area.width() - 10
         view_h = self.scroll_area.height() - 10
         
-        scale_w = view_w / self.original_pixmap.width()
-        scale_h = view_h / self.original_pixmap.height()
+        scale_w = view_w / self.original_image.width()
+        scale_h = view_h / self.original_image.height()
         self.current_scale = min(scale_w, scale_h, 1.0)
         
         self.update_image_display(fast_mode=fast_mode)
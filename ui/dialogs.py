@@ -22,7 +22,7 @@ class TagDialog(QDialog):
         
     def refresh_list(self):
         self.list.clear()
-        tags = self.db.get_stats()['tags']
+        tags = self.db.get_tag_usage()
         for name, count in tags: self.list.addItem(f"{name}")
 
     def accept_input(self):
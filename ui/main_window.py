@@ -7,28 +7,38 @@ from ctypes.wintypes import MSG
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QDockWidget, QLabel, QPushButton, QFrame, 
                              QApplication, QShortcut, QSizeGrip, QMessageBox,
-                             QAbstractItemView, QTableWidgetItem, QHeaderView, QMenu)
-from PyQt5.QtCore import Qt, QPoint, QTimer, QSettings, QRect
+                             QAbstractItemView, QHeaderView, QMenu, QStackedWidget)
+from PyQt5.QtCore import Qt, QPoint, QTimer, QSettings, QRect, QThread, QUrl, pyqtSignal
 from PyQt5.QtGui import QColor, QKeySequence, QImage
-from sqlalchemy.orm import joinedload
 
-# 核心逻辑
-from data.database import DBManager, Partition
+# 核心逻辑 (data.database 依赖 SQLAlchemy，导入较慢，改为在后台线程中导入)
+from core.startup import timeline, FIRST_PAINT, INTERACTIVE
+from core.memory_budget import memory_budget, DEFAULT_CAP_MB
+from core.shared import format_bytes
+from data import snapshot
 from services.clipboard import ClipboardManager
-from core.shared import format_size, get_color_icon
+from services.detail_loader import DetailLoader
+from services.page_cache import PageCache
+from services.thumbnail_loader import ThumbnailLoader
+from services.image_recompressor import ImageRecompressor
+from services.clipboard_monitor import ClipboardMonitor, own_mime_data
+from services import file_archive
+from handlers.image_handler import ImageCodecPolicy
+from handlers.file_handler import FileCapturePolicy
+from handlers.text_handler import TextCapturePolicy
+from services.capture_filter import CaptureFilterPolicy
 
 # UI 组件
 from ui.components import CustomTitleBar
 from ui.custom_dock import CustomDockTitleBar
 from ui.panel_filter import FilterPanel
 from ui.panel_table import TablePanel
+from ui.panel_gallery import GalleryView
 from ui.panel_detail import DetailPanel
 from ui.panel_tags import TagPanel
 from ui.panel_partition import PartitionPanel
 from ui.dialogs import TagDialog, ColorDialog
 from ui.context_menu import ContextMenuHandler
-from ui.color_selector import ColorSelectorDialog
-from ui.dialog_preview import PreviewDialog # 新增预览对话框
 
 import themes.dark
 import themes.light
@@ -45,6 +55,21 @@ SWP_NOMOVE = 0x0002
 SWP_NOSIZE = 0x0001
 SWP_NOACTIVATE = 0x0010
 
+
+class _DatabaseOpener(QThread):
+    """在后台线程中导入数据库模块并构造 DBManager (建表 + 迁移 + 标签统计校验)"""
+    opened = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def run(self):
+        try:
+            from data.database import DBManager
+            self.opened.emit(DBManager())
+        except Exception as e:
+            log.critical(f"❌ 数据库打开失败: {e}", exc_info=True)
+            self.failed.emit(str(e))
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -80,7 +105,6 @@ class MainWindow(QMainWindow):
         self.page = 1
         self.page_size = 100 # 默认每页100条
         self.total_items = 0
-        self._processing_clipboard = False  # 防止剪贴板事件重复处理
         self.item_id_to_select_after_load = None # 用于处理列表加载后的高亮
         
         # 定时器
@@ -90,24 +114,113 @@ class MainWindow(QMainWindow):
         self.focus_timer = QTimer(); self.focus_timer.timeout.connect(self.track_active_window)
         self.focus_timer.start(200)
         
-        # 服务
-        self.db = DBManager()
-        self.cm = ClipboardManager(self.db)
-        self.cm.data_captured.connect(self.refresh_after_capture) 
+        # 服务 (分阶段启动：数据库在后台线程打开，就绪后再创建依赖数据库的服务)
+        self.db = None
+        self.cm = None
+        self.detail_loader = None
+        self.page_cache = None
+        self.thumbnail_loader = None
+        self.recompressor = None
+        self.clipboard_monitor = None
+        self.clipboard_coalesce_ms = ClipboardMonitor.WINDOW_MS
+        self.prefetch_pages = 1
+        self.image_policy = ImageCodecPolicy()
+        self.file_policy = FileCapturePolicy()
+        self.text_policy = TextCapturePolicy()
+        self.filter_policy = CaptureFilterPolicy()
+        self.menu_handler = None
+        self._first_painted = False
+        self._startup_done = False
+        self._first_page_snapshot = None  # 默认视图最近一次加载的首屏 (记录, 总数)，退出时写入快照
+        self.detail_timer = QTimer(); self.detail_timer.setSingleShot(True); self.detail_timer.setInterval(30)
+        self.detail_timer.timeout.connect(self._request_detail)
         
         self.clipboard = QApplication.clipboard()
-        self.clipboard.dataChanged.connect(self.on_clipboard_event)
         
-        # 界面
+        # 界面外壳
         self.setup_ui()
-        self.menu_handler = ContextMenuHandler(self)
-        self.setup_shortcuts()
         
         # 恢复状态 (使用新Key强制重置布局)
         self.restore_window_state()
-        self.load_data()
+        # 用上次保存的首屏快照先填充列表，数据库就绪后替换为真实数据
+        self._show_startup_snapshot()
+        timeline.mark("窗口外壳构建完成")
+        
+        self._db_opener = _DatabaseOpener(self)
+        self._db_opener.opened.connect(self._on_database_ready)
+        self._db_opener.failed.connect(self._on_database_failed)
+        self._db_opener.start()
+        
+        log.info("✅ 主窗口外壳就绪，正在后台打开数据库...")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._first_painted:
+            self._first_painted = True
+            timeline.mark(FIRST_PAINT)
+
+    def _show_startup_snapshot(self):
+        """数据库打开前先显示上次退出时的第一页 (只读，不可交互)"""
+        records, total = snapshot.load_first_page()
+        if self.page_size > 0:
+            records = records[:self.page_size]
+        if not records:
+            self.lbl_status.setText("正在加载...")
+            return
+        self.table.load_records(lambda start, count: records[start:start + count], len(records), len(records))
+        self.lbl_status.setText(f"总计: {total} 条 (正在加载...)")
+        log.info(f"⚡ 已从首屏快照显示 {len(records)} 条记录")
+
+    def _on_database_ready(self, db):
+        """阶段二：数据库就绪 -> 创建服务、连接信号、加载真实的第一页"""
+        timeline.mark("数据库就绪")
+        self.db = db
+        self.cm = ClipboardManager(self.db, self.image_policy, self.file_policy, self.text_policy, self.filter_policy)
+        self.cm.data_captured.connect(self.refresh_after_capture) 
+        self.cm.capture_progress.connect(self.on_capture_progress)
         
+        # 图片后台重新压缩 (每次捕获后重新开始空闲计时)
+        self.recompressor = ImageRecompressor(self.db, self.image_policy, parent=self)
+        self.cm.item_captured.connect(lambda _: self.recompressor.schedule())
+        
+        # 详情面板后台加载 (选中变化经防抖后提交给工作线程)
+        self.detail_loader = DetailLoader(self.db, parent=self)
+        self.detail_loader.loaded.connect(self.on_detail_loaded)
+        
+        # 分页预取缓存 (预取范围可在设置中通过 prefetchPages 调整)
+        self.page_cache = PageCache(self.db, radius=self.prefetch_pages, parent=self)
+        self.thumbnail_loader = ThumbnailLoader(self.db, parent=self)
+        self.gallery.set_loader(self.thumbnail_loader)
+        
+        self.partition_panel.attach_db(self.db)
+        self.menu_handler = ContextMenuHandler(self)
+        self.setup_shortcuts()
+        # 剪贴板事件经合并后再捕获，本程序自己写入的内容直接丢弃
+        self.clipboard_monitor = ClipboardMonitor(self.clipboard, self.cm, self.partition_panel.get_current_selection,
+                                                  window_ms=self.clipboard_coalesce_ms, parent=self)
+        
+        self.load_data()
+        self.update_detail_panel()  # 快照阶段可能已经选中了行
+        timeline.mark(INTERACTIVE)
         log.info("✅ 主窗口启动完毕")
+        
+        # 阶段三：分区树、分区计数和标签联想索引让出一次事件循环后再加载
+        QTimer.singleShot(0, self._load_deferred)
+
+    def _load_deferred(self):
+        # 首次填充分区树时会自动选中 "全部数据"，当前列表已是该视图，无需重复加载
+        self.partition_panel.blockSignals(True)
+        self.partition_panel.refresh_partitions()
+        self.partition_panel.blockSignals(False)
+        self.tag_panel.refresh_tags(self.db)
+        self.recompressor.schedule()
+        self._startup_done = True
+        timeline.mark("分区与标签加载完成")
+        timeline.report()
+
+    def _on_database_failed(self, message):
+        self.lbl_status.setText("数据库打开失败")
+        QMessageBox.critical(self, "错误", f"数据库打开失败:\n{message}")
 
     def setup_ui(self):
         # 1. 物理边缘
@@ -138,6 +251,7 @@ class MainWindow(QMainWindow):
         self.title_bar.pin_clicked.connect(self.toggle_pin)
         self.title_bar.clean_clicked.connect(self.auto_clean)
         self.title_bar.mode_clicked.connect(self.toggle_edit_mode)
+        self.title_bar.gallery_clicked.connect(self.set_gallery_mode)
         self.title_bar.color_clicked.connect(self.toolbar_set_color)  # 连接颜色按钮
         self.inner_layout.addWidget(self.title_bar)
         
@@ -182,7 +296,7 @@ class MainWindow(QMainWindow):
         self.dock_partition.setTitleBarWidget(CustomDockTitleBar("分区组", self.dock_partition, self.dock_container))
         self.dock_partition.setFeatures(QDockWidget.AllDockWidgetFeatures)
         self.dock_partition.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
-        self.partition_panel = PartitionPanel(self.db)
+        self.partition_panel = PartitionPanel(None)  # 数据库就绪后再绑定
         self.partition_panel.partitionSelectionChanged.connect(lambda: self.load_data(reset_page=True))
         
         # 核心修复: 当分区数据结构更新时 (例如添加/删除), 才刷新整个分区面板和主列表
@@ -234,12 +348,22 @@ class MainWindow(QMainWindow):
         self.table.horizontalHeader().customContextMenuRequested.connect(self.show_header_menu)
         self.table.horizontalHeader().sectionResized.connect(self.schedule_save_state)
         self.table.itemSelectionChanged.connect(self.update_detail_panel)
-        self.table.itemDoubleClicked.connect(self.on_table_double_click)
-        self.table.itemChanged.connect(self.on_item_changed)
+        self.table.doubleClicked.connect(self.on_table_double_click)
+        self.table.item_edited.connect(self.on_item_changed)
+        self.table.model().batch_loaded.connect(self.on_table_batch_loaded)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
         self.table.reorder_signal.connect(self.reorder_items)
         
-        self.dock_container.setCentralWidget(self.table)
+        # 画廊视图：与表格共用模型和选择模型，二者放在同一个堆叠容器中切换
+        self.gallery = GalleryView(self.table)
+        self.gallery.doubleClicked.connect(self.on_table_double_click)
+        self.gallery.customContextMenuRequested.connect(lambda pos: self.show_context_menu(pos, self.gallery))
+        self.list_stack = QStackedWidget()
+        self.list_stack.addWidget(self.table)
+        self.list_stack.addWidget(self.gallery)
+        self.list_stack.setMinimumWidth(300)
+        
+        self.dock_container.setCentralWidget(self.list_stack)
         
         # 关键：设置Dock面板的大小策略，使其可以灵活调整
         # 使用Preferred策略，允许面板在拖动时自动调整大小
@@ -288,6 +412,8 @@ class MainWindow(QMainWindow):
         self.btn_last = QPushButton("末页 »"); self.btn_last.setFixedSize(80, 28)
 
         self.btn_first.clicked.connect(self.go_to_first_page)
+        self.btn_prev.clicked.connect(self.prev_page)
+        self.btn_next.clicked.connect(self.next_page)
         self.btn_last.clicked.connect(self.go_to_last_page)
 
         bl.addWidget(self.btn_first)
@@ -335,25 +461,24 @@ class MainWindow(QMainWindow):
         
         # 5. 事件过滤器 (用于捕获空格键)
         self.table.installEventFilter(self)
+        self.gallery.installEventFilter(self)
         
         log.info("✅ UI初始化完成")
 
     def toggle_preview(self):
         """切换快速预览"""
+        if self.db is None: return
         # 如果已打开，则关闭
         if self.preview_dlg and self.preview_dlg.isVisible():
             self.preview_dlg.close()
             return
             
         # 获取选中的行
-        rows = self.table.selectionModel().selectedRows()
-        if not rows: return
+        ids = self.table.selected_ids()
+        if not ids: return
         
-        # 获取数据 (ID在第9列，索引8)
         try:
-            item_id_item = self.table.item(rows[0].row(), 8)
-            if not item_id_item: return
-            item_id = int(item_id_item.text())
+            item_id = ids[0]
             
             # 查询数据库
             session = self.db.get_session()
@@ -362,9 +487,12 @@ class MainWindow(QMainWindow):
             if item:
                 # 初始化对话框 (如果不存在)
                 if not self.preview_dlg:
+                    from ui.dialog_preview import PreviewDialog
                     self.preview_dlg = PreviewDialog(self)
                 
-                self.preview_dlg.load_data(item.content, item.item_type, item.file_path, item.image_path, item.data_blob)
+                # 超大文本的 content 只是预览，完整正文从 text_overflow 读取
+                content = self.db.get_full_text(item_id) if item.content_size else item.content
+                self.preview_dlg.load_data(content or item.content, item.item_type, item.file_path, item.image_path, item.data_blob)
                 self.preview_dlg.show()
                 self.preview_dlg.raise_()
                 self.preview_dlg.activateWindow()
@@ -374,7 +502,7 @@ class MainWindow(QMainWindow):
 
     def eventFilter(self, source, event):
         # 监听表格的空格键
-        if source == self.table and event.type() == event.KeyPress:
+        if source in (self.table, self.gallery) and event.type() == event.KeyPress:
             if event.key() == Qt.Key_Space:
                 self.toggle_preview()
                 return True # 消费事件，防止选中切换
@@ -423,9 +551,10 @@ class MainWindow(QMainWindow):
                         
         return super().nativeEvent(eventType, message)
 
-    def show_context_menu(self, pos):
+    def show_context_menu(self, pos, view=None):
+        if self.menu_handler is None: return
         # 代理给 Handler
-        self.menu_handler.show_menu(pos)
+        self.menu_handler.show_menu(pos, view)
     
     # ... (函数 force_horizontal_layout 和 untabify_all_docks 已被移除) ...
 
@@ -448,6 +577,18 @@ class MainWindow(QMainWindow):
         QShortcut(QKeySequence("Del"), self).activated.connect(lambda: self.smart_delete(force_warn=False))
         QShortcut(QKeySequence("Ctrl+Shift+Del"), self).activated.connect(lambda: self.smart_delete(force_warn=True))
 
+        # 内存诊断
+        QShortcut(QKeySequence("Ctrl+Shift+M"), self).activated.connect(self.show_memory_diagnostics)
+
+    def show_memory_diagnostics(self):
+        """Ctrl+Shift+M: 查看各缓存的内存占用并调整全局上限"""
+        if not hasattr(self, 'memory_dlg'):
+            from ui.dialog_memory import MemoryDiagnosticsDialog
+            self.memory_dlg = MemoryDiagnosticsDialog(self)
+            self.memory_dlg.cap_changed.connect(lambda _: self.schedule_save_state())
+        self.memory_dlg.show()
+        self.memory_dlg.raise_()
+
     def group_items_shortcut(self):
         """Ctrl+G: 智能成组（随机色/取消）"""
         self._batch_action("智能成组", lambda ids: self.menu_handler.batch_group_smart(ids))
@@ -468,12 +609,7 @@ class MainWindow(QMainWindow):
 
     def _batch_action(self, name, action_func):
         """通用批量操作辅助函数"""
-        rows = self.table.selectionModel().selectedRows()
-        if not rows: return
-        ids = []
-        for r in rows:
-            item = self.table.item(r.row(), 8)
-            if item and item.text(): ids.append(int(item.text()))
+        ids = self.table.selected_ids()
         if ids:
             log.info(f"⌨️ 快捷键触发: {name} ({len(ids)} 项)")
             action_func(ids)
@@ -484,14 +620,8 @@ class MainWindow(QMainWindow):
         - 在常规视图：将项目移动到回收站
         - 在回收站视图：将项目永久删除
         """
-        rows = self.table.selectionModel().selectedRows()
-        if not rows: return
-        
         # 1. 收集ID
-        ids = []
-        for r in rows:
-            item = self.table.item(r.row(), 8)
-            if item and item.text(): ids.append(int(item.text()))
+        ids = self.table.selected_ids()
         if not ids: return
         
         # 2. 检查视图状态
@@ -546,13 +676,7 @@ class MainWindow(QMainWindow):
         self.partition_panel.refresh_partitions()
 
     def batch_set_star_shortcut(self, lvl):
-        rows = self.table.selectionModel().selectedRows()
-        if not rows: return
-        ids = []
-        for r in rows:
-            item = self.table.item(r.row(), 8)
-            if item and item.text():
-                ids.append(int(item.text()))
+        ids = self.table.selected_ids()
         if ids:
             self.menu_handler.batch_set_star(ids, lvl)
 
@@ -568,12 +692,12 @@ class MainWindow(QMainWindow):
         s.setValue("current_theme", self.current_theme)
         
         # 保存列宽
-        widths = [self.table.columnWidth(i) for i in range(self.table.columnCount())]
+        header = self.table.horizontalHeader()
+        widths = [self.table.columnWidth(i) for i in range(header.count())]
         s.setValue("columnWidths", widths)
         
         # 保存列顺序
-        header = self.table.horizontalHeader()
-        visual_indices = [header.visualIndex(i) for i in range(self.table.columnCount())]
+        visual_indices = [header.visualIndex(i) for i in range(header.count())]
         s.setValue("columnOrder", visual_indices)
         
         # 保存对齐方式
@@ -585,6 +709,19 @@ class MainWindow(QMainWindow):
         
         # 保存每页显示数量
         s.setValue("pageSize", self.page_size)
+        s.setValue("prefetchPages", self.prefetch_pages)
+        s.setValue("memoryBudgetMB", memory_budget.cap_bytes // (1024 * 1024))
+        s.setValue("imageCodec", self.image_policy.target)
+        s.setValue("imageRecompressMinKB", self.image_policy.min_bytes // 1024)
+        s.setValue("fileInlineMaxMB", self.file_policy.inline_max_bytes // (1024 * 1024))
+        s.setValue("textInlineMaxKB", self.text_policy.inline_max_chars // 1024)
+        s.setValue("indexOversizedText", self.text_policy.index_oversized)
+        s.setValue("captureExcludedFormats", self.filter_policy.excluded_formats)
+        s.setValue("captureDenyKeywords", self.filter_policy.deny_keywords)
+        s.setValue("captureDenyPatterns", self.filter_policy.deny_patterns)
+        s.setValue("captureRateLimit", self.filter_policy.rate_limit[0] if self.filter_policy.rate_limit else 0)
+        s.setValue("clipboardCoalesceMs", self.clipboard_coalesce_ms)
+        s.setValue("galleryMode", self.list_stack.currentWidget() is self.gallery)
         
         log.info("✅ 窗口状态已保存")
 
@@ -649,28 +786,48 @@ class MainWindow(QMainWindow):
         if hasattr(self.title_bar, 'btn_mode'): 
             self.title_bar.btn_mode.setChecked(self.edit_mode)
         self.toggle_edit_mode(self.edit_mode)
+        
+        gallery_mode = s.value("galleryMode", False, type=bool)
+        self.title_bar.btn_gallery.setChecked(gallery_mode)
+        self.set_gallery_mode(gallery_mode)
 
         # 恢复每页显示数量
         self.page_size = s.value("pageSize", 100, type=int)
+        self.prefetch_pages = s.value("prefetchPages", 1, type=int)
+        memory_budget.set_cap(s.value("memoryBudgetMB", DEFAULT_CAP_MB, type=int) * 1024 * 1024)
+        self.image_policy.target = s.value("imageCodec", self.image_policy.target, type=str)
+        self.image_policy.min_bytes = s.value("imageRecompressMinKB", self.image_policy.min_bytes // 1024, type=int) * 1024
+        self.file_policy.inline_max_bytes = s.value("fileInlineMaxMB", self.file_policy.inline_max_bytes // (1024 * 1024), type=int) * 1024 * 1024
+        self.text_policy.inline_max_chars = s.value("textInlineMaxKB", self.text_policy.inline_max_chars // 1024, type=int) * 1024
+        self.text_policy.index_oversized = s.value("indexOversizedText", self.text_policy.index_oversized, type=bool)
+        fp = self.filter_policy
+        fp.excluded_formats = s.value("captureExcludedFormats", fp.excluded_formats, type=list)
+        fp.deny_keywords = s.value("captureDenyKeywords", fp.deny_keywords, type=list)
+        fp.deny_patterns = s.value("captureDenyPatterns", fp.deny_patterns, type=list)
+        rate_count = s.value("captureRateLimit", fp.rate_limit[0] if fp.rate_limit else 0, type=int)  # 每 10 秒的次数，0 表示不限制
+        fp.rate_limit = (rate_count, 10.0) if rate_count > 0 else None
+        self.clipboard_coalesce_ms = s.value("clipboardCoalesceMs", self.clipboard_coalesce_ms, type=int)
         if hasattr(self, 'title_bar'):
             self.title_bar.set_display_count(self.page_size)
         
         # 恢复列宽
+        header = self.table.horizontalHeader()
         if cw := s.value("columnWidths"):
             cw = [int(w) for w in cw]
             for i, w in enumerate(cw): 
-                if i < self.table.columnCount(): 
+                if i < header.count(): 
                     self.table.setColumnWidth(i, w)  # 修复：columnWidth -> setColumnWidth
         
-        # 恢复列顺序
+        # 恢复列顺序 (忽略旧版本中已移除的隐藏列)
         if col_order := s.value("columnOrder"):
-            header = self.table.horizontalHeader()
             for logical_idx, visual_idx in enumerate(col_order):
-                header.moveSection(header.visualIndex(logical_idx), int(visual_idx))  # 转换为整数
+                if logical_idx < header.count() and int(visual_idx) < header.count():
+                    header.moveSection(header.visualIndex(logical_idx), int(visual_idx))  # 转换为整数
         
         log.info("✅ 窗口状态已恢复")
-        for i in range(self.table.columnCount()):
+        for i in range(header.count()):
             if align := s.value(f"col_{i}_align"): self.col_alignments[i] = int(align)
+        self.table.set_alignments(self.col_alignments)
         theme = s.value("current_theme", "dark")
         self.apply_theme(theme)
 
@@ -702,20 +859,27 @@ class MainWindow(QMainWindow):
         except Exception as e:
             log.debug(f"智能布局调整略过: {e}")
 
-    def closeEvent(self, e): self.save_window_state(); e.accept()
-
-    def on_clipboard_event(self):
-        """处理剪贴板变化事件，防止重复处理"""
-        if self._processing_clipboard:
-            return
-        
-        self._processing_clipboard = True
-        try:
-            mime = self.clipboard.mimeData()
-            partition_info = self.partition_panel.get_current_selection()
-            self.cm.process_clipboard(mime, partition_info)
-        finally:
-            self._processing_clipboard = False
+    def closeEvent(self, e):
+        self.save_window_state()
+        if self.clipboard_monitor is not None:
+            self.clipboard_monitor.flush()
+            log.info(f"📋 剪贴板事件统计: {self.clipboard_monitor.stats()}")
+        if getattr(self, 'cm', None) is not None:
+            self.cm.wait_for_pending()  # 让已提交的捕获和延迟的访问记录写完数据库
+            log.info(f"🧠 最近内容缓存: {self.cm.recent_stats()}")
+            log.info(f"🚫 捕获过滤命中: {self.cm.filter_stats()}")
+        if self.recompressor is not None:
+            self.recompressor.stop()
+        if self._first_page_snapshot is not None:
+            snapshot.save_first_page(*self._first_page_snapshot)
+        e.accept()
+
+    def on_capture_progress(self, label, done, total):
+        """在状态栏显示大文件的读取进度，完成后恢复统计信息"""
+        if total and done < total:
+            self.lbl_status.setText(f"正在读取 {label}: {done * 100 // total}% ({format_bytes(done)} / {format_bytes(total)})")
+        else:
+            self._refresh_loaded_stats()
 
     def refresh_after_capture(self):
         """捕获到新数据后，刷新主列表和分区面板"""
@@ -740,6 +904,8 @@ class MainWindow(QMainWindow):
         if self.page * self.page_size < self.total_items: self.page += 1; self.load_data()
 
     def load_data(self, reset_page=False):
+        if self.db is None:
+            return  # 数据库尚未就绪，就绪后会按当前筛选条件加载
         try:
             log.info(f"🔄 开始加载数据 (reset_page={reset_page})")
             if reset_page: self.page = 1 # 保留以备将来使用
@@ -763,6 +929,8 @@ class MainWindow(QMainWindow):
             if partition_filter and partition_filter.get('type') == 'today':
                 date_modify_filter = '今日'
                 partition_filter = None  # 确保不按分区筛选
+            elif partition_filter and partition_filter.get('type') == 'all':
+                partition_filter = None  # "全部数据" 与未选择分区等价，统一后分页缓存键一致
 
             # 彻底恢复多选功能：无论是否在回收站，均允许 ExtendedSelection (Shift/Ctrl+点击)
             self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
@@ -776,8 +944,22 @@ class MainWindow(QMainWindow):
             
             filters = {'stars': stars, 'colors': colors, 'types': types}
             
+            query = dict(
+                filters=filters, search=search, selected_tags=tags,
+                sort_mode=self.current_sort_mode,
+                date_filter=date_filter, date_modify_filter=date_modify_filter,
+                partition_filter=partition_filter
+            )
+            
+            # 分页模式下先查预取缓存，命中时总数和整页记录都无需再查询
+            version = self.db.data_version
+            cached = self.page_cache.get(query, self.page_size, self.page) if self.page_size > 0 else None
+            
             # 获取总数
-            self.total_items = self.db.get_count(filters=filters, search=search, selected_tags=tags, date_filter=date_filter, date_modify_filter=date_modify_filter, partition_filter=partition_filter)
+            if cached:
+                self.total_items = cached[0]
+            else:
+                self.total_items = self.db.get_count(filters=filters, search=search, selected_tags=tags, date_filter=date_filter, date_modify_filter=date_modify_filter, partition_filter=partition_filter)
             
             limit = self.page_size
             offset = 0
@@ -808,86 +990,37 @@ class MainWindow(QMainWindow):
                 self.btn_next.setEnabled(False)
                 self.btn_last.setEnabled(False)
 
-            items = self.db.get_items(
-                filters=filters, search=search, selected_tags=tags, 
-                sort_mode=self.current_sort_mode,
-                limit=limit, offset=offset, date_filter=date_filter, date_modify_filter=date_modify_filter,
-                partition_filter=partition_filter
-            )
-            
-            self.table.blockSignals(True)
-            self.table.setRowCount(len(items))
-            for row, item in enumerate(items):
-                # ID列索引从9改为8
-                self.table.setItem(row, 8, QTableWidgetItem(str(item.id)))
-                
-                # 状态列：显示颜色圆点和状态图标，不显示序号
-                st_flags = ""
-                if item.is_pinned: st_flags += "📌"
-                if item.is_favorite: st_flags += "❤️"
-                if item.is_locked: st_flags += "🔒"
-                
-                # 类型图标提取
-                type_icon = ""
-                if item.item_type == 'url':
-                    type_icon = "🔗"
-                elif item.item_type == 'image':
-                    type_icon = "🖼️"
-                elif item.item_type == 'file' and item.file_path:
-                    if os.path.exists(item.file_path):
-                        if os.path.isdir(item.file_path):
-                            type_icon = "📂"
-                        else:
-                            ext = os.path.splitext(item.file_path)[1].lower()
-                            if ext in ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma']:
-                                type_icon = "🎵"
-                            elif ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp']:
-                                type_icon = "🖼️"
-                            elif ext in ['.mp4', '.mkv', '.avi', '.mov', '.wmv']:
-                                type_icon = "🎬"
-                            else:
-                                type_icon = "📄"
-                    else:
-                        type_icon = "📄" # 文件丢失
-                        
-                # 组合显示: 状态标记 + 类型图标
-                # 优先显示类型图标，然后是状态
-                display_text = f"{type_icon} {st_flags}".strip()
-                
-                state_item = QTableWidgetItem(display_text)
-                if item.custom_color: state_item.setIcon(get_color_icon(item.custom_color))
-                self.table.setItem(row, 0, state_item)  # 状态列（索引0）
-                
-                # 其他列（索引调整：移除了"序"列）
-                self.table.setItem(row, 1, QTableWidgetItem(item.content.replace('\n', ' ')[:100]))  # 内容
-                self.table.setItem(row, 2, QTableWidgetItem(item.note))  # 备注
-                star_item = QTableWidgetItem("★" * item.star_level)
-                # star_item.setForeground(QColor("#FFD700"))
-                self.table.setItem(row, 3, star_item)  # 星级
-                self.table.setItem(row, 4, QTableWidgetItem(format_size(item.content)))  # 大小
-                if item.is_file and item.file_path:
-                    _, ext = os.path.splitext(item.file_path)
-                    type_str = ext.upper()[1:] if ext else "FILE"
-                else: type_str = "TXT"
-                self.table.setItem(row, 5, QTableWidgetItem(type_str))  # 类型
-                self.table.setItem(row, 6, QTableWidgetItem(item.created_at.strftime("%m-%d %H:%M")))  # 创建时间
-                
-                # 设置对齐方式
-                for col in range(7):  # 从8改为7（因为只有9列，隠藏了7,8）
-                    align = self.col_alignments.get(col, Qt.AlignLeft | Qt.AlignVCenter if col in [1,2] else Qt.AlignCenter)
-                    it = self.table.item(row, col)
-                    if it: it.setTextAlignment(align)
-            self.table.blockSignals(False)
-            
-            # --- 新的统计逻辑 ---
-            # 1. 基于当前显示的 items 计算统计信息
-            stats = self._calculate_stats_from_items(items)
-            # 2. 更新筛选器面板
-            self.filter_panel.update_stats(stats)
+            if limit is None:
+                # 显示全部：由模型按滚动位置分批加载，避免一次性创建所有行
+                row_total = self.total_items
+                batch_size = 500
+            else:
+                # 分页模式：整页一次加载 (单页最多 1000 条)，保证统计覆盖整页
+                row_total = max(0, min(limit, self.total_items - offset))
+                batch_size = max(1, row_total)
+
+            if cached:
+                records = cached[1]
+                def fetch(start, count, records=records):
+                    return records[start:start + count]
+            else:
+                def fetch(start, count, base=offset, query=query):
+                    return self.db.get_item_records(limit=count, offset=base + start, **query)
+
+            self.table.load_records(fetch, row_total, batch_size)
+            self._refresh_loaded_stats()
+            if limit is not None:
+                # 当前页放入缓存 (返回时直接命中)，并在后台预取相邻页
+                if not cached:
+                    self.page_cache.put(query, self.page_size, self.page, self.total_items, self.table.records(), version)
+                self.page_cache.prefetch_around(query, self.page_size, self.page, self.total_items)
+            if self.page == 1 and self._is_default_view(query):
+                # 只保留引用，序列化和写文件推迟到退出时，避免每次刷新都在 GUI 线程中执行
+                self._first_page_snapshot = (self.table.records()[:snapshot.SNAPSHOT_ROWS], self.total_items)
             
-            # 标签面板和状态栏仍然使用全局信息
-            self.tag_panel.refresh_tags(self.db)
-            self.lbl_status.setText(f"总计: {self.total_items} 条 (当前显示: {len(items)} 条)")
+            # 标签面板仍然使用全局信息 (启动阶段由 _load_deferred 负责)
+            if self._startup_done:
+                self.tag_panel.refresh_tags(self.db)
             
             # 修复：检查是否有待高亮的项目
             if self.item_id_to_select_after_load is not None:
@@ -896,51 +1029,74 @@ class MainWindow(QMainWindow):
 
         except Exception as e: log.error(f"Load Error: {e}", exc_info=True)
 
+    @staticmethod
+    def _is_default_view(query):
+        """是否为启动时的默认视图 (全部数据、无筛选、无搜索、手动排序)"""
+        partition = query['partition_filter']
+        return (not query['search'] and not query['selected_tags']
+                and not any(query['filters'].values())
+                and not query['date_filter'] and not query['date_modify_filter']
+                and query['sort_mode'] == 'manual'
+                and (partition is None or partition.get('type') == 'all'))
+
+    def on_table_batch_loaded(self, count):
+        """显示全部模式下滚动加载了新的一批数据，合并刷新统计"""
+        if not hasattr(self, '_stats_timer'):
+            self._stats_timer = QTimer(self)
+            self._stats_timer.setSingleShot(True)
+            self._stats_timer.setInterval(150)
+            self._stats_timer.timeout.connect(self._refresh_loaded_stats)
+        self._stats_timer.start()
+
+    def _refresh_loaded_stats(self):
+        """基于表格中已加载的记录刷新筛选器统计和状态栏"""
+        if self.db is None: return
+        records = self.table.records()
+        # 1. 基于当前显示的记录计算统计信息
+        stats = self._calculate_stats_from_items(records)
+        # 2. 更新筛选器面板
+        self.filter_panel.update_stats(stats)
+        self.lbl_status.setText(f"总计: {self.total_items} 条 (当前显示: {len(records)} 条)")
+
     def _calculate_stats_from_items(self, items):
         """根据给定的项目列表计算统计数据"""
-        from data.database import Tag # 局部导入以避免循环依赖
         stats = {'tags': {}, 'stars': {}, 'colors': {}, 'types': {}}
         
-        session = self.db.get_session()
-        try:
-            # 预加载所有标签以提高效率
-            all_tags_in_db = {tag.name for tag in session.query(Tag).all()}
-
-            for item in items:
-                # 统计星级
-                stats['stars'][item.star_level] = stats['stars'].get(item.star_level, 0) + 1
-                
-                # 统计颜色
-                if item.custom_color:
-                    stats['colors'][item.custom_color] = stats['colors'].get(item.custom_color, 0) + 1
-                
-                # 统计标签
-                for tag in item.tags:
-                    stats['tags'][tag.name] = stats['tags'].get(tag.name, 0) + 1
-
-                # 统计类型 (与数据库中的逻辑保持一致)
-                key = item.item_type
-                if item.item_type == 'file' and item.file_path and os.path.exists(item.file_path):
-                    if os.path.isdir(item.file_path):
-                        key = 'folder'
-                    else:
-                        _, ext = os.path.splitext(item.file_path)
-                        key = ext.lstrip('.').upper() if ext else 'FILE'
-                elif item.item_type == 'image':
-                    path = item.image_path or item.file_path
-                    if path:
-                        _, ext = os.path.splitext(path)
-                        key = ext.lstrip('.').upper() if ext else 'IMAGE'
-                    else:
-                        key = 'IMAGE'
-                
-                if key not in ['text', 'url', 'folder']:
-                    key = key.upper()
-                
-                stats['types'][key] = stats['types'].get(key, 0) + 1
+        # 所有标签名直接取自标签统计的内存镜像，无需查询数据库
+        all_tags_in_db = [name for name, _ in self.db.get_tag_usage()]
 
-        finally:
-            session.close()
+        for item in items:
+            # 统计星级
+            stats['stars'][item.star_level] = stats['stars'].get(item.star_level, 0) + 1
+            
+            # 统计颜色
+            if item.custom_color:
+                stats['colors'][item.custom_color] = stats['colors'].get(item.custom_color, 0) + 1
+            
+            # 统计标签
+            for tag_name in item.tags:
+                stats['tags'][tag_name] = stats['tags'].get(tag_name, 0) + 1
+
+            # 统计类型 (与数据库中的逻辑保持一致)
+            key = item.item_type
+            if item.item_type == 'file' and item.file_path and os.path.exists(item.file_path):
+                if os.path.isdir(item.file_path):
+                    key = 'folder'
+                else:
+                    _, ext = os.path.splitext(item.file_path)
+                    key = ext.lstrip('.').upper() if ext else 'FILE'
+            elif item.item_type == 'image':
+                path = item.image_path or item.file_path
+                if path:
+                    _, ext = os.path.splitext(path)
+                    key = ext.lstrip('.').upper() if ext else 'IMAGE'
+                else:
+                    key = 'IMAGE'
+            
+            if key not in ['text', 'url', 'folder']:
+                key = key.upper()
+            
+            stats['types'][key] = stats['types'].get(key, 0) + 1
         
         # 转换标签格式以匹配 FilterPanel 的期望输入
         # 并确保数据库中存在但当前未显示的标签也以 0 的计数包含在内
@@ -988,8 +1144,7 @@ class MainWindow(QMainWindow):
         
     def set_col_align(self, col, align):
         self.col_alignments[col] = int(align)
-        for row in range(self.table.rowCount()):
-            if it := self.table.item(row, col): it.setTextAlignment(align)
+        self.table.set_alignments(self.col_alignments)
         self.schedule_save_state()
 
     def on_display_count_changed(self, count):
@@ -1021,40 +1176,56 @@ class MainWindow(QMainWindow):
         except Exception as e:
             log.error(f"❌ 置顶设置失败: {e}", exc_info=True)
     def auto_clean(self):
+        if self.db is None: return
         if QMessageBox.question(self, "确认", "删除21天前未锁定的旧数据?") == QMessageBox.Yes:
              count = self.db.auto_delete_old_data(days=21)
              QMessageBox.information(self, "完成", f"清理了 {count} 条旧数据")
              self.load_data()
     def toggle_edit_mode(self, checked):
         self.edit_mode = checked
-        if checked: self.table.setEditTriggers(QAbstractItemView.DoubleClicked)
-        else: self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.set_editable(checked, self._full_text_for_edit)
+        self.schedule_save_state()
+    def set_gallery_mode(self, enabled):
+        """在表格与画廊视图之间切换 (选中状态共享，切换后保持)"""
+        view = self.gallery if enabled else self.table
+        self.list_stack.setCurrentWidget(view)
+        ids = self.table.selected_ids()
+        if ids:
+            row = self.table.model().row_of(ids[0])
+            view.scrollTo(self.table.model().index(row, 0), QAbstractItemView.PositionAtCenter)
+        view.setFocus()
         self.schedule_save_state()
-    def on_table_double_click(self, item):
+
+    def on_table_double_click(self, index):
+        if self.db is None: return
         if self.edit_mode: return
         self.copy_and_paste_item()
-    def on_item_changed(self, item):
-        if not self.edit_mode: return
-        row = item.row()
-        item_id = int(self.table.item(row, 9).text())
-        if item.column() == 2: self.db.update_item(item_id, content=item.text().strip())
-        elif item.column() == 3: self.db.update_item(item_id, note=item.text().strip())
+    def _full_text_for_edit(self, item_id):
+        """表格编辑内容列时载入完整文本 (预览只有前 500 字符)"""
+        return self.db.get_full_text(item_id) if self.db is not None else None
+    def on_item_changed(self, item_id, column, text):
+        if not self.edit_mode or self.db is None: return
+        if column == 1: self.db.update_item(item_id, content=text)
+        elif column == 2: self.db.update_item(item_id, note=text)
     def copy_and_paste_item(self):
-        if hasattr(self, 'current_item_id'):
+        if self.current_item_id is not None:
             session = self.db.get_session()
             from data.database import ClipboardItem
             obj = session.query(ClipboardItem).get(self.current_item_id)
             if obj:
-                self._processing_clipboard = True
-                try:
-                    if obj.item_type == 'image' and obj.data_blob:
-                        image = QImage()
-                        image.loadFromData(obj.data_blob)
-                        self.clipboard.setImage(image)
-                    else:
-                        self.clipboard.setText(obj.content)
-                finally:
-                    self._processing_clipboard = False
+                # 写入的数据带有来源标记，ClipboardMonitor 不会再次捕获
+                if obj.item_type == 'image' and obj.data_blob:
+                    image = QImage()
+                    image.loadFromData(obj.data_blob)
+                    self.clipboard.setMimeData(own_mime_data(image=image))
+                elif obj.item_type == 'file' and obj.file_path:
+                    # 原文件已不存在时还原保存的内容 (多文件为 ZIP)
+                    urls = [QUrl.fromLocalFile(p) for p in file_archive.paste_paths(self.db, obj.id, obj.file_path)]
+                    self.clipboard.setMimeData(own_mime_data(urls=urls))
+                elif obj.content_size:
+                    self.clipboard.setMimeData(own_mime_data(text=self.db.get_full_text(obj.id) or obj.content))  # 超大文本的正文在溢出存储中
+                else:
+                    self.clipboard.setMimeData(own_mime_data(text=obj.content))
                 
                 if self.last_external_hwnd:
                     self.showMinimized()
@@ -1072,67 +1243,60 @@ class MainWindow(QMainWindow):
         ctypes.windll.user32.keybd_event(0x56, 2, 0)
         ctypes.windll.user32.keybd_event(0x11, 2, 0)
     def update_detail_panel(self):
-        rows = self.table.selectionModel().selectedRows()
+        if self.db is None: return
+        ids = self.table.selected_ids()
 
         # 核心逻辑：根据是否有选中行，更新左侧标签面板的可用状态
-        has_selection = bool(rows)
+        has_selection = bool(ids)
         self.tag_panel.setEnabled(has_selection)
         # DetailPanel 的交互组件状态由其内部的 load_item/clear 自动切换
 
-        if not rows:
+        if not ids:
+            self.current_item_id = None
             self.detail_panel.clear()
             return
-        
-        # 添加空值检查，修复ID列索引
-        item = self.table.item(rows[0].row(), 8)
-        if not item or not item.text():
-            log.warning("⚠️ 选中行的ID列为空")
+
+        # 操作目标立即跟随选择；后台加载只负责刷新详情面板的显示
+        self.current_item_id = ids[0]
+        self.detail_timer.start()
+
+    def _request_detail(self):
+        ids = self.table.selected_ids()
+        if not ids:
             return
-        
-        item_id = int(item.text())
+        item_id = ids[0]
         log.debug(f"📋 更新详情面板，项目ID: {item_id}")
-        session = self.db.get_session()
-        from data.database import ClipboardItem
-        # 修复: 移除对旧的 Partition.group 的 joinedload
-        item_obj = session.query(ClipboardItem).options(
-            joinedload(ClipboardItem.tags),
-            joinedload(ClipboardItem.partition) # 只加载直接关联的 partition
-        ).get(item_id)
-        
-        if item_obj:
-            tags = [t.name for t in item_obj.tags]
-            
-            # 新逻辑: 递归获取分区路径
-            path_parts = []
-            current_partition = item_obj.partition
-            while current_partition:
-                path_parts.append(current_partition.name)
-                # 在循环内继续查询父级
-                current_partition = session.query(Partition).get(current_partition.parent_id)
-
-            path_parts.reverse() # 反转得到 "父 -> 子" 的顺序
-            
-            group_name = path_parts[0] if path_parts else None
-            partition_name = " -> ".join(path_parts) if path_parts else None
-
-            self.detail_panel.load_item(
-                item_obj.content, item_obj.note, tags,
-                group_name=group_name,
-                partition_name=partition_name,
-                item_type=item_obj.item_type,
-                image_path=item_obj.image_path,
-                file_path=item_obj.file_path,
-                image_blob=item_obj.data_blob
-            )
-            self.current_item_id = item_id
-        session.close()
+        self.detail_loader.request(item_id)
+
+        # 预取相邻行的图片，保证上下键浏览时立即显示
+        row = self.table.model().row_of(item_id)
+        records = self.table.records()
+        neighbours = [records[r].id for r in (row - 1, row + 1, row + 2)
+                      if 0 <= r < len(records) and records[r].item_type == 'image']
+        if neighbours:
+            self.detail_loader.prefetch(neighbours)
+
+    def on_detail_loaded(self, data):
+        """后台加载完成：只接受当前仍然选中的项目"""
+        ids = self.table.selected_ids()
+        if not ids or ids[0] != data.item_id:
+            return
+        self.detail_panel.load_item(
+            data.content, data.note, data.tags,
+            group_name=data.group_name,
+            partition_name=data.partition_name,
+            item_type=data.item_type,
+            image_path=data.image_path,
+            file_path=data.file_path,
+            image=data.image
+        )
     def reorder_items(self, new_ids): self.db.update_sort_order(new_ids)
     def save_note(self, text):
-        if hasattr(self, 'current_item_id'): self.db.update_item(self.current_item_id, note=text); self.load_data()
+        if self.current_item_id is not None: self.db.update_item(self.current_item_id, note=text); self.load_data()
     
     def on_tags_added(self, tags):
         """处理详细信息面板提交的标签列表"""
-        if hasattr(self, 'current_item_id') and self.current_item_id:
+        if self.current_item_id is not None:
             # 批量添加标签到当前选中的项目
             self.db.add_tags_to_items([self.current_item_id], tags)
             self.update_detail_panel() # 刷新详细信息面板
@@ -1141,16 +1305,10 @@ class MainWindow(QMainWindow):
 
     def on_tag_panel_commit_tags(self, tags):
         """处理左侧标签面板提交的标签，为所有选中项批量添加"""
-        rows = self.table.selectionModel().selectedRows()
-        if not rows or not tags:
+        if not tags:
             return
         
-        item_ids = []
-        for r in rows:
-            item = self.table.item(r.row(), 8)
-            if item and item.text():
-                item_ids.append(int(item.text()))
-        
+        item_ids = self.table.selected_ids()
         if item_ids:
             self.db.add_tags_to_items(item_ids, tags)
             self.load_data()
@@ -1159,7 +1317,7 @@ class MainWindow(QMainWindow):
             log.info(f"✅ 已为 {len(item_ids)} 个项目批量添加标签: {tags}")
 
     def remove_tag(self, tag):
-        if hasattr(self, 'current_item_id'): 
+        if self.current_item_id is not None:
             self.db.remove_tag_from_item(self.current_item_id, tag)
             self.update_detail_panel()
             self.load_data()
@@ -1180,17 +1338,13 @@ class MainWindow(QMainWindow):
     def toolbar_set_color(self):
         """从标题栏颜色按钮设置选中项的颜色"""
         log.info("🌈 颜色设置按钮被点击")
-        rows = self.table.selectionModel().selectedRows()
-        if not rows:
+        if self.db is None: return
+        item_ids = self.table.selected_ids()
+        if not item_ids:
             log.warning("⚠️ 未选中任何项目，忽略颜色设置请求")
             # 用户要求"弄没了"，移除弹窗
             return
         
-        item_ids = []
-        for r in rows:
-            item = self.table.item(r.row(), 8)
-            if item and item.text():
-                item_ids.append(int(item.text()))
         log.info(f"✅ 选中 {len(item_ids)} 个项目，ID: {item_ids}")
         if item_ids:
             self.set_custom_color(item_ids)
@@ -1200,7 +1354,7 @@ class MainWindow(QMainWindow):
     def set_custom_color(self, item_ids):
         """打开颜色选择对话框"""
         log.info(f"🎨 打开颜色选择器，项目ID: {item_ids}")
-        # from color_selector import ColorSelectorDialog
+        from ui.color_selector import ColorSelectorDialog
         dlg = ColorSelectorDialog(self)
         if dlg.exec_():
             if dlg.selected_color:
@@ -1237,18 +1391,14 @@ class MainWindow(QMainWindow):
     def select_item_in_table(self, item_id_to_select):
         """在右侧主表格中查找并高亮指定的项目ID"""
         log.debug(f"滚动到项目: {item_id_to_select}")
-        # ID 在第 9 列，索引 8
-        id_column_index = 8
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, id_column_index)
-            if item and item.text() == str(item_id_to_select):
-                # 找到了匹配的行
-                self.table.blockSignals(True)
-                self.table.selectRow(row)
-                self.table.scrollToItem(item, QAbstractItemView.ScrollHint.PositionAtCenter)
-                self.table.blockSignals(False)
-                log.info(f"✅ 已在表格中高亮显示项目 {item_id_to_select}")
-                return
+        self.table.blockSignals(True)
+        found = self.table.select_item(item_id_to_select)
+        self.table.blockSignals(False)
+        if found and self.list_stack.currentWidget() is self.gallery:
+            self.gallery.scrollTo(self.table.model().index(self.table.model().row_of(item_id_to_select), 0), QAbstractItemView.PositionAtCenter)
+        if found:
+            log.info(f"✅ 已在表格中高亮显示项目 {item_id_to_select}")
+            return
         log.warning(f"⚠️ 未能在当前显示的表格中找到项目ID: {item_id_to_select}")
     
     def on_tag_panel_add_tag(self, tag_input=None):
@@ -1265,27 +1415,10 @@ class MainWindow(QMainWindow):
         # 统一转为列表处理
         tags_to_add = tag_input if isinstance(tag_input, list) else [tag_input]
         
-        session = self.db.get_session()
-        from data.database import Tag
-        try:
-            has_new = False
-            for tag_name in tags_to_add:
-                tag_name = tag_name.strip()
-                if not tag_name: continue
-                
-                # 检查是否存在
-                if not session.query(Tag).filter_by(name=tag_name).first():
-                    session.add(Tag(name=tag_name))
-                    has_new = True
-            
-            if has_new:
-                session.commit()
-                self.tag_panel.refresh_tags(self.db)
-                log.info(f"✅ 批量添加标签: {tags_to_add}")
-        except Exception as e:
-            log.error(f"添加标签失败: {e}")
-        finally:
-            session.close()
+        tag_names = [t.strip() for t in tags_to_add if t.strip()]
+        if tag_names and self.db.create_tags(tag_names):
+            self.tag_panel.refresh_tags(self.db)
+            log.info(f"✅ 批量添加标签: {tags_to_add}")
     
     def on_tag_selected(self, tag_name):
         """标签面板选中标签"""
@@ -6,6 +6,7 @@ from PyQt5.QtGui import QPixmap, QIcon, QMouseEvent, QColor
 import os
 from .flow_layout import FlowLayout  # 导入新的布局管理器
 from .widgets.tag_widget import TagWidget
+from core.memory_budget import memory_budget
 
 
 class DetailPanel(QWidget):
@@ -16,6 +17,8 @@ class DetailPanel(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAttribute(Qt.WA_StyledBackground, True)
+        # 当前显示的图片计入全局内存预算 (不可淘汰)
+        self.memory_account = memory_budget.register("detail_pixmap", None, "详情面板图片")
             
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(10, 10, 10, 12) # 缩减内边距，把空间还给文字
@@ -118,7 +121,7 @@ class DetailPanel(QWidget):
         self.layout.addStretch(1)
         self.layout.addWidget(self.tag_input)
 
-    def load_item(self, content, note, tags, group_name=None, partition_name=None, item_type='text', image_path=None, file_path=None, image_blob=None):
+    def load_item(self, content, note, tags, group_name=None, partition_name=None, item_type='text', image_path=None, file_path=None, image_blob=None, image=None):
         # 设置分区信息
         self.lbl_group.setText(f"分组: {group_name or '--'}")
         self.lbl_partition.setText(f"分区: {partition_name or '未分类'}")
@@ -131,7 +134,12 @@ class DetailPanel(QWidget):
         can_show_image = False
 
         if item_type == 'image':
-            if image_blob:
+            if image is not None and not image.isNull():
+                # 已在后台线程解码好的 QImage，这里只做缩放和转换
+                max_w = self.width() - 40
+                pixmap = QPixmap.fromImage(image.scaled(max_w, max_w, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+                can_show_image = True
+            elif image_blob:
                 can_show_image = pixmap.loadFromData(image_blob)
             else: # 兼容旧数据
                 path_to_try = image_path or file_path
@@ -146,9 +154,12 @@ class DetailPanel(QWidget):
             scaled_pixmap = pixmap.scaled(max_w, max_w, Qt.KeepAspectRatio, Qt.SmoothTransformation)
             self.image_label.setPixmap(scaled_pixmap)
             self.image_label.setFixedSize(scaled_pixmap.size())
+            self.memory_account.set_fixed(scaled_pixmap.width() * scaled_pixmap.height() * scaled_pixmap.depth() // 8)
         else:
             self.image_container.hide()
             self.image_label.hide()
+            self.image_label.setPixmap(QPixmap())  # 隐藏时不再持有上一张图片
+            self.memory_account.set_fixed(0)
             self.preview.show()
             self.preview.setText(content)
 
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+画廊视图
+与主表格共用同一个数据模型和选择模型，以网格卡片的形式浏览项目：
+- QListView 图标模式 + 统一尺寸，只有可见的卡片会被布局和绘制，数万项也能流畅滚动
+- 图片项显示缩略图，缩略图只为 可见区域 + 预读范围 请求，由 ThumbnailLoader 在后台解码
+"""
+from PyQt5.QtWidgets import QListView, QAbstractItemView, QStyledItemDelegate, QStyle
+from PyQt5.QtCore import Qt, QSize, QRect, QTimer
+from PyQt5.QtGui import QColor, QPen, QFont
+
+
+class GalleryDelegate(QStyledItemDelegate):
+    """绘制单张卡片：上方缩略图 (或类型图标)，下方一行说明文字"""
+
+    CAPTION_H = 22
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        self.icon_font = QFont()
+        self.icon_font.setPointSize(28)
+
+    def sizeHint(self, option, index):
+        return self.view.card_size
+
+    def paint(self, painter, option, index):
+        record = index.model().records()[index.row()]
+        rect = option.rect.adjusted(4, 4, -4, -4)
+        selected = bool(option.state & QStyle.State_Selected)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+
+        painter.save()
+        painter.setRenderHint(painter.Antialiasing, True)
+        painter.setPen(QPen(QColor("#094771") if selected else QColor("#333333"), 2 if selected else 1))
+        painter.setBrush(QColor("#37373d") if selected else QColor("#2a2d2e") if hovered else QColor("#252526"))
+        painter.drawRoundedRect(rect, 6, 6)
+
+        thumb_rect = QRect(rect.left() + 6, rect.top() + 6, rect.width() - 12, rect.height() - self.CAPTION_H - 10)
+        image = self.view.thumbnail_for(record) if record.item_type == 'image' else None
+        if image is not None:
+            size = image.size().scaled(thumb_rect.size(), Qt.KeepAspectRatio)
+            target = QRect(0, 0, size.width(), size.height())
+            target.moveCenter(thumb_rect.center())
+            painter.drawImage(target, image)
+        else:
+            # 缩略图尚未解码或非图片项：显示类型图标
+            painter.setFont(self.icon_font)
+            painter.setPen(QColor("#888888"))
+            painter.drawText(thumb_rect, Qt.AlignCenter, index.model().type_icon(record) or "📝")
+
+        caption_rect = QRect(rect.left() + 8, rect.bottom() - self.CAPTION_H - 2, rect.width() - 16, self.CAPTION_H)
+        painter.setFont(option.font)
+        painter.setPen(QColor("#ffffff") if selected else QColor("#cccccc"))
+        flags = ("⭐" * record.star_level) + ("📌" if record.is_pinned else "")
+        caption = (flags + " " if flags else "") + (record.note or record.preview.replace('\n', ' ').strip())
+        painter.drawText(caption_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         option.fontMetrics.elidedText(caption, Qt.ElideRight, caption_rect.width()))
+        painter.restore()
+
+
+class GalleryView(QListView):
+    """
+    主列表的画廊模式
+    Args:
+        table: TablePanel，共用其模型与选择模型，因此 selected_ids() 等接口在两种模式下一致
+    """
+
+    def __init__(self, table, parent=None):
+        super().__init__(parent)
+        self.setObjectName("GalleryView")
+        self.table = table
+        self.loader = None
+        self.card_size = QSize(180, 170)
+
+        self.setModel(table.model())
+        self.setSelectionModel(table.selectionModel())
+        self.setModelColumn(0)
+
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(500)
+        self.setGridSize(self.card_size)
+        self.setSpacing(0)
+        self.setWrapping(True)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.verticalScrollBar().setSingleStep(40)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)  # 与表格一致，selectedRows() 才能取到选中行
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.setMouseTracking(True)
+        self.setItemDelegate(GalleryDelegate(self))
+
+        # 滚动/缩放/数据变化后合并为一次缩略图请求
+        self._request_timer = QTimer(self)
+        self._request_timer.setSingleShot(True)
+        self._request_timer.setInterval(30)
+        self._request_timer.timeout.connect(self._request_visible)
+        self.verticalScrollBar().valueChanged.connect(self._schedule_request)
+        self.model().modelReset.connect(self._schedule_request)
+        self.model().rowsInserted.connect(self._schedule_request)
+
+    def set_loader(self, loader):
+        self.loader = loader
+        loader.ready.connect(self._on_thumbnails_ready)
+        self._schedule_request()
+
+    def thumbnail_for(self, record):
+        return self.loader.thumbnail(record.id) if self.loader else None
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._schedule_request()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._schedule_request()
+
+    def _schedule_request(self, *_):
+        if self.isVisible():
+            self._request_timer.start()
+
+    def visible_rows(self, lookahead_screens=1.0):
+        """当前可见的行范围 (含上下各 lookahead_screens 屏的预读)，返回 range"""
+        count = self.model().rowCount()
+        if not count:
+            return range(0)
+        gw, gh = self.card_size.width(), self.card_size.height()
+        per_line = max(1, self.viewport().width() // gw)
+        top = self.visualRect(self.model().index(0, 0)).top()  # 滚动后为负值
+        vh = self.viewport().height()
+        margin = int(vh * lookahead_screens)
+        first_line = max(0, (-top - margin) // gh)
+        last_line = max(0, (vh - top + margin) // gh)
+        return range(min(count, first_line * per_line), min(count, (last_line + 1) * per_line))
+
+    def _request_visible(self):
+        if self.loader is None:
+            return
+        records = self.model().records()
+        ids = [records[r].id for r in self.visible_rows() if records[r].item_type == 'image']
+        self.loader.request(ids)
+
+    def _on_thumbnails_ready(self, item_ids):
+        if not self.isVisible():
+            return
+        model = self.model()
+        visible = self.visible_rows(0)
+        for item_id in item_ids:
+            row = model.row_of(item_id)
+            if row in visible:
+                self.update(model.index(row, 0))
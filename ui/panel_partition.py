@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import logging
 import random
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTreeWidget, QTreeWidgetItem, 
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTreeWidget, 
                              QMenu, QInputDialog, QMessageBox, QLineEdit, QColorDialog,
-                             QAbstractItemView, QStyle, QTreeWidgetItemIterator)
+                             QAbstractItemView, QStyle)
 from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QFont, QIcon, QPixmap, QColor, QPainter
+from PyQt5.QtGui import QFont, QColor
+from core.shared import get_color_icon
+from ui.partition_tree_sync import PartitionTreeSync
 
 log = logging.getLogger(__name__)
 
@@ -162,7 +164,13 @@ class PartitionPanel(QWidget):
         super().__init__(parent)
         self.db = db_manager
         self._init_ui()
-        self.refresh_partitions()
+        if self.db is not None:
+            self.refresh_partitions()
+
+    def attach_db(self, db_manager):
+        """延迟绑定数据库 (启动时先构建空面板，数据库就绪后再绑定并刷新)"""
+        self.db = db_manager
+        self.tree.db = db_manager
 
     def _init_ui(self):
         self.layout = QVBoxLayout(self) # Changed 'layout' to 'self.layout'
@@ -177,6 +185,7 @@ class PartitionPanel(QWidget):
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.itemSelectionChanged.connect(self._on_selection_changed)
         self.tree.partitionsUpdated.connect(self.partitionsUpdated.emit)
+        self.tree_sync = PartitionTreeSync(self.tree, self._create_color_icon, self._decorate_static_item)
         
         self.layout.addWidget(self.tree)
         # self.setLayout(self.layout) # QVBoxLayout(self) 已经自动设置了 layout
@@ -186,36 +195,18 @@ class PartitionPanel(QWidget):
             item.setExpanded(not item.isExpanded())
 
     def _create_color_icon(self, color_str):
-        pixmap = QPixmap(16, 16)
-        pixmap.fill(Qt.transparent)
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setBrush(QColor(color_str or "#808080"))
-        painter.setPen(Qt.NoPen)
-        painter.drawRoundedRect(2, 2, 12, 12, 4, 4)
-        painter.end()
-        return QIcon(pixmap)
+        return get_color_icon(color_str or "#808080", shape='rounded')
         
-    def _add_partition_recursive(self, partitions, parent_item, partition_counts):
-        """递归函数，用于构建分区树UI"""
-        for partition in partitions:
-            count = partition_counts.get(partition.id, 0)
-            item = QTreeWidgetItem(parent_item, [f"{partition.name} ({count})"])
-            item.setData(0, Qt.UserRole, {'type': 'partition', 'id': partition.id, 'color': partition.color})
-            item.setIcon(0, self._create_color_icon(partition.color))
-            
-            if partition.children:
-                self._add_partition_recursive(partition.children, item, partition_counts)
+    def _decorate_static_item(self, item):
+        item.setFont(0, QFont("Arial", 10, QFont.Bold))
+        item.setFlags(item.flags() & ~Qt.ItemIsDragEnabled & ~Qt.ItemIsDropEnabled)
 
     def refresh_partitions(self):
-        """从数据库加载并递归显示分区"""
-        current_selection = self.get_current_selection()
-        self.tree.clear()
-        
+        """从数据库加载分区，并与当前树比对后增量更新"""
         counts = self.db.get_partition_item_counts()
         partition_counts = counts.get('partitions', {})
 
-        # -- 添加静态项 --
+        # -- 静态项 --
         static_items = [
             ("全部数据", {'type': 'all', 'id': -1}, QStyle.SP_DirHomeIcon, counts.get('total', 0)),
             ("今日数据", {'type': 'today', 'id': -5}, QStyle.SP_FileDialogDetailedView, counts.get('today_modified', 0)),
@@ -223,31 +214,15 @@ class PartitionPanel(QWidget):
             ("未标签", {'type': 'untagged', 'id': -3}, QStyle.SP_DialogHelpButton, counts.get('untagged', 0)),
             ("回收站", {'type': 'trash', 'id': -4}, QStyle.SP_TrashIcon, counts.get('trash', 0)),
         ]
-        
-        for name, data, icon, count in static_items:
-            item = QTreeWidgetItem(self.tree, [f"{name} ({count})"])
-            item.setData(0, Qt.UserRole, data)
-            item.setFont(0, QFont("Arial", 10, QFont.Bold))
-            item.setIcon(0, self.style().standardIcon(icon))
-            item.setFlags(item.flags() & ~Qt.ItemIsDragEnabled & ~Qt.ItemIsDropEnabled)
+        static_items = [(name, data, self.style().standardIcon(icon), count) for name, data, icon, count in static_items]
 
-        # -- 递归添加用户分区 --
+        # -- 用户分区 --
         top_level_partitions = self.db.get_partitions_tree()
-        self._add_partition_recursive(top_level_partitions, self.tree, partition_counts)
-
-        self.tree.expandAll()
-        self.select_item_by_data(current_selection or {'type': 'all', 'id': -1})
+        self.tree_sync.sync(static_items, top_level_partitions, partition_counts, default_selection={'type': 'all', 'id': -1})
 
     def select_item_by_data(self, data_to_find):
-        if not data_to_find: return
-        it = QTreeWidgetItemIterator(self.tree)
-        while it.value():
-            item = it.value()
-            item_data = item.data(0, Qt.UserRole)
-            if item_data and item_data.get('id') == data_to_find.get('id') and item_data.get('type') == data_to_find.get('type'):
-                self.tree.setCurrentItem(item)
-                return
-            it += 1
+        if item := self.tree_sync.node(data_to_find):
+            self.tree.setCurrentItem(item)
 
     def _on_selection_changed(self):
         if data := self.get_current_selection():
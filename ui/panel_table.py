@@ -1,48 +1,301 @@
 # -*- coding: utf-8 -*-
 import os
-from PyQt5.QtWidgets import QTableWidget, QAbstractItemView, QHeaderView, QTableWidgetItem
-from PyQt5.QtCore import Qt, pyqtSignal, QSize
-from core.shared import get_color_icon, format_size
+from PyQt5.QtWidgets import QTableView, QAbstractItemView, QHeaderView
+from PyQt5.QtCore import Qt, pyqtSignal, QSize, QAbstractTableModel, QModelIndex, QMimeData
+from core.shared import get_color_icon, format_bytes
 
-class TablePanel(QTableWidget):
-    reorder_signal = pyqtSignal(list)
+AUDIO_EXTS = {'.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma'}
+IMAGE_EXTS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp'}
+VIDEO_EXTS = {'.mp4', '.mkv', '.avi', '.mov', '.wmv'}
+
+
+class ClipboardTableModel(QAbstractTableModel):
+    """
+    主列表的虚拟化数据模型
+    - 数据为 ItemRecord 轻量行记录，项目ID保存在记录中而不是隐藏列
+    - 每列的显示内容在 data() 中按需计算，只有可见行才会被计算
+    - 通过 canFetchMore/fetchMore 分批从数据库加载，“显示全部”时不会一次性拉取所有行
+    """
+    COLUMNS = ["状态", "内容", "备注", "星级", "大小", "类型", "创建时间"]
+    COL_CONTENT = 1
+    COL_NOTE = 2
+
+    batch_loaded = pyqtSignal(int)           # 新加载的行数
+    item_edited = pyqtSignal(int, int, str)  # (item_id, column, text)
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._records = []
+        self._row_of_id = {}
+        self._fetch = None
+        self._total = 0
+        self._batch_size = 200
+        self.alignments = {}
+        self.editable = False
         self.is_trash_view = False
-        
-        # 基础设置
-        self.setColumnCount(9)
-        self.setHorizontalHeaderLabels(["状态", "内容", "备注", "星级", "大小", "类型", "创建时间", "PATH", "ID"])
-        self.hideColumn(7) # 隐藏 PATH
-        self.hideColumn(8) # 隐藏 ID
-        
+        # 编辑内容列时读取完整文本 (item_id -> str 或 None)；未设置时内容列不可编辑
+        self.full_text_loader = None
+        self._edit_texts = {}  # {item_id: 编辑器打开时载入的完整文本}
+
+    # --- 数据源 ---
+    def load(self, fetch_fn, total, batch_size=200):
+        """
+        重置数据源
+        fetch_fn(offset, limit) -> list[ItemRecord]
+        total: 该数据源最多可提供的行数
+        """
+        self.beginResetModel()
+        self._records = []
+        self._row_of_id = {}
+        self._fetch = fetch_fn
+        self._total = max(0, total)
+        self._batch_size = max(1, batch_size)
+        self.endResetModel()
+        # 先取第一批，保证首屏立即有数据
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def canFetchMore(self, parent):
+        if parent.isValid() or self._fetch is None:
+            return False
+        return len(self._records) < self._total
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self._fetch is None:
+            return
+        start = len(self._records)
+        limit = min(self._batch_size, self._total - start)
+        if limit <= 0:
+            return
+        records = self._fetch(start, limit)
+        if not records:
+            # 数据库中的实际数据比预期少（例如刚被删除），停止继续加载
+            self._total = start
+            return
+        self.beginInsertRows(QModelIndex(), start, start + len(records) - 1)
+        for offset, record in enumerate(records):
+            self._row_of_id[record.id] = start + offset
+        self._records.extend(records)
+        self.endInsertRows()
+        self.batch_loaded.emit(len(records))
+
+    def records(self):
+        return self._records
+
+    def total(self):
+        return self._total
+
+    def item_id(self, row):
+        if 0 <= row < len(self._records):
+            return self._records[row].id
+        return None
+
+    def row_of(self, item_id):
+        return self._row_of_id.get(item_id, -1)
+
+    def move_ids(self, ids, target_row):
+        """将指定ID的行移动到 target_row 之前 (拖拽排序)"""
+        moving = [r for r in self._records if r.id in ids]
+        if not moving:
+            return
+        if target_row < 0 or target_row > len(self._records):
+            target_row = len(self._records)
+        # 计算移除前方被拖走的行后，目标位置的偏移
+        shift = sum(1 for r in self._records[:target_row] if r.id in ids)
+        remaining = [r for r in self._records if r.id not in ids]
+        insert_at = target_row - shift
+
+        self.beginResetModel()
+        self._records = remaining[:insert_at] + moving + remaining[insert_at:]
+        self._row_of_id = {r.id: i for i, r in enumerate(self._records)}
+        self.endResetModel()
+
+    # --- Qt 模型接口 ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            if orientation == Qt.Horizontal:
+                return self.COLUMNS[section] if 0 <= section < len(self.COLUMNS) else None
+            return str(section + 1)
+        if role == Qt.TextAlignmentRole and orientation == Qt.Vertical:
+            return Qt.AlignCenter
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        f = Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+        if self.editable and (index.column() == self.COL_NOTE or
+                              (index.column() == self.COL_CONTENT and self.full_text_loader is not None)):
+            f |= Qt.ItemIsEditable
+        return f
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self._records[index.row()]
+        col = index.column()
+
+        if role == Qt.DisplayRole:
+            return self._display_text(record, col)
+        if role == Qt.EditRole:
+            if col == self.COL_CONTENT: return self._load_edit_text(record)
+            if col == self.COL_NOTE: return record.note
+            return self._display_text(record, col)
+        if role == Qt.DecorationRole:
+            if col == 0 and record.custom_color:
+                return get_color_icon(record.custom_color)
+            return None
+        if role == Qt.TextAlignmentRole:
+            default_align = Qt.AlignLeft | Qt.AlignVCenter if col in (1, 2) else Qt.AlignCenter
+            return int(self.alignments.get(col, default_align))
+        if role == Qt.ToolTipRole and col == self.COL_CONTENT:
+            return record.preview  # 预览本身已限制在 500 字符内，防止 Tooltip 卡顿
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        record = self._records[index.row()]
+        text = str(value).strip()
+        if index.column() == self.COL_CONTENT:
+            # 只接受基于完整文本的编辑：预览被截断，绝不能写回正文
+            original = self._edit_texts.pop(record.id, None)
+            if original is None or text == original:
+                return False
+            record.preview = text[:record.PREVIEW_CHARS]
+        elif index.column() == self.COL_NOTE:
+            record.note = text
+        else:
+            return False
+        self.dataChanged.emit(index, index)
+        self.item_edited.emit(record.id, index.column(), text)
+        return True
+
+    def _load_edit_text(self, record):
+        """编辑器打开时读取完整文本；读取失败时返回空串且不记录，之后的提交会被拒绝"""
+        text = self.full_text_loader(record.id) if self.full_text_loader else None
+        if text is None:
+            self._edit_texts.pop(record.id, None)
+            return ""
+        self._edit_texts[record.id] = text.strip()
+        return text
+
+    def supportedDragActions(self):
+        return Qt.MoveAction | Qt.CopyAction
+
+    def mimeTypes(self):
+        return ["application/x-clipboard-item-ids"]
+
+    def mimeData(self, indexes):
+        mime_data = QMimeData()
+        rows = sorted({index.row() for index in indexes})
+        item_ids = [str(self._records[row].id) for row in rows]
+        if item_ids:
+            mime_data.setData("application/x-clipboard-item-ids", ",".join(item_ids).encode())
+            if self.is_trash_view:
+                mime_data.setData("application/x-clipboard-source", b"trash")
+        return mime_data
+
+    # --- 列内容计算 ---
+    def _display_text(self, record, col):
+        if col == 0:
+            st_flags = ""
+            if record.is_pinned: st_flags += "📌"
+            if record.is_favorite: st_flags += "❤️"
+            if record.is_locked: st_flags += "🔒"
+            return f"{self.type_icon(record)} {st_flags}".strip()
+        if col == 1:
+            return record.preview.replace('\n', ' ').replace('\r', '')[:100]
+        if col == 2:
+            return record.note
+        if col == 3:
+            return "★" * record.star_level
+        if col == 4:
+            return format_bytes(record.size_bytes)
+        if col == 5:
+            if record.is_file and record.file_path:
+                _, ext = os.path.splitext(record.file_path)
+                return ext.upper()[1:] if ext else "FILE"
+            return "TXT"
+        if col == 6:
+            return record.created_at.strftime("%m-%d %H:%M") if record.created_at else ""
+        return None
+
+    def type_icon(self, record):
+        """类型图标 (涉及文件系统检查，结果缓存在记录上)"""
+        if record.type_icon is not None:
+            return record.type_icon
+        type_icon = ""
+        if record.item_type == 'url':
+            type_icon = "🔗"
+        elif record.item_type == 'image':
+            type_icon = "🖼️"
+        elif record.item_type == 'file' and record.file_path:
+            if os.path.exists(record.file_path):
+                if os.path.isdir(record.file_path):
+                    type_icon = "📂"
+                else:
+                    ext = os.path.splitext(record.file_path)[1].lower()
+                    if ext in AUDIO_EXTS:
+                        type_icon = "🎵"
+                    elif ext in IMAGE_EXTS:
+                        type_icon = "🖼️"
+                    elif ext in VIDEO_EXTS:
+                        type_icon = "🎬"
+                    else:
+                        type_icon = "📄"
+            else:
+                type_icon = "📄" # 文件丢失
+        record.type_icon = type_icon
+        return type_icon
+
+
+class TablePanel(QTableView):
+    reorder_signal = pyqtSignal(list)
+    itemSelectionChanged = pyqtSignal()
+    item_edited = pyqtSignal(int, int, str)  # (item_id, column, text)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._model = ClipboardTableModel(self)
+        self.setModel(self._model)
+        self._model.item_edited.connect(self.item_edited.emit)
+        self.selectionModel().selectionChanged.connect(lambda *_: self.itemSelectionChanged.emit())
+
         # === 核心修复：行高与图标 ===
         # 1. 强制设定行高，不再依赖自动计算，解决挤压问题
-        self.verticalHeader().setDefaultSectionSize(38) 
+        self.verticalHeader().setDefaultSectionSize(38)
         # 2. 限制图标尺寸，防止图片过大撑满行
-        self.setIconSize(QSize(22, 22)) 
+        self.setIconSize(QSize(22, 22))
         # 3. 设置状态列宽
-        self.setColumnWidth(0, 50) 
-        
+        self.setColumnWidth(0, 50)
+
         # 样式与交互
         self.setDragEnabled(True)
         self.setAcceptDrops(True)
         self.setDragDropMode(QAbstractItemView.DragDrop)
+        self.setDefaultDropAction(Qt.MoveAction)
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setShowGrid(False) # 不显示网格线
         self.setAlternatingRowColors(True) # 斑马纹
         self.setFocusPolicy(Qt.StrongFocus)
         self.setContextMenuPolicy(Qt.CustomContextMenu)
-        
+        self.setWordWrap(False)
+
         # 表头交互
         header = self.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Interactive)
         header.setStretchLastSection(True)
         header.setContextMenuPolicy(Qt.CustomContextMenu)
         header.setSectionsMovable(True)
-        
+
         # 垂直表头（行号）
         self.verticalHeader().setVisible(True)
         self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed) # 固定行高，防止自动塌缩
@@ -50,10 +303,62 @@ class TablePanel(QTableWidget):
 
         # 监听 Viewport (滚轮事件)
         self.viewport().installEventFilter(self)
-        
+
         # 加载字体设置
         self.load_font_settings()
 
+    @property
+    def is_trash_view(self):
+        return self._model.is_trash_view
+
+    @is_trash_view.setter
+    def is_trash_view(self, value):
+        self._model.is_trash_view = value
+
+    # --- 数据接口 (供 MainWindow 调用) ---
+    def load_records(self, fetch_fn, total, batch_size=200):
+        """用新的数据源重置表格，只会立即加载第一批"""
+        self._model.load(fetch_fn, total, batch_size)
+
+    def records(self):
+        return self._model.records()
+
+    def item_id_at(self, row):
+        return self._model.item_id(row)
+
+    def selected_ids(self):
+        """返回当前选中行的项目ID列表"""
+        ids = []
+        for index in self.selectionModel().selectedRows():
+            item_id = self._model.item_id(index.row())
+            if item_id is not None:
+                ids.append(item_id)
+        return ids
+
+    def select_item(self, item_id):
+        """选中并滚动到指定ID的行，成功返回 True"""
+        row = self._model.row_of(item_id)
+        # 目标尚未加载时继续按批拉取，直到找到或数据耗尽
+        while row < 0 and self._model.canFetchMore(QModelIndex()):
+            self._model.fetchMore(QModelIndex())
+            row = self._model.row_of(item_id)
+        if row < 0:
+            return False
+        self.selectRow(row)
+        self.scrollTo(self._model.index(row, 0), QAbstractItemView.PositionAtCenter)
+        return True
+
+    def set_alignments(self, alignments):
+        self._model.alignments = alignments
+        self.viewport().update()
+
+    def set_editable(self, editable, full_text_loader=None):
+        """full_text_loader(item_id) 返回项目的完整文本，用于编辑内容列 (不提供时只能编辑备注)"""
+        self._model.editable = editable
+        self._model.full_text_loader = full_text_loader
+        self._model._edit_texts.clear()
+        self.setEditTriggers(QAbstractItemView.DoubleClicked if editable else QAbstractItemView.NoEditTriggers)
+
     def load_font_settings(self):
         from PyQt5.QtCore import QSettings
         settings = QSettings("ClipboardPro", "Settings")
@@ -84,103 +389,31 @@ class TablePanel(QTableWidget):
         self.setFont(font)
         # 缩放时同步调整行高
         self.verticalHeader().setDefaultSectionSize(size + 20)
-        
+
         from PyQt5.QtCore import QSettings
         QSettings("ClipboardPro", "Settings").setValue("table_font_size", size)
 
-    def dropEvent(self, event):
-        if event.source() != self: 
-            super().dropEvent(event)
-            return
-        super().dropEvent(event)
-        new_ids = []
-        for r in range(self.rowCount()):
-            item = self.item(r, 8)
-            if item: new_ids.append(int(item.text()))
-        self.reorder_signal.emit(new_ids)
-
-    def mimeData(self, indexes):
-        from PyQt5.QtCore import QMimeData
-        mime_data = QMimeData()
-        item_ids = []
-        unique_rows = {index.row() for index in indexes}
-        for row in unique_rows:
-            id_item = self.item(row, 8)
-            if id_item: item_ids.append(id_item.text())
-        if item_ids:
-            encoded_data = ",".join(item_ids).encode()
-            mime_data.setData("application/x-clipboard-item-ids", encoded_data)
-            if self.is_trash_view:
-                mime_data.setData("application/x-clipboard-source", b"trash")
-        return mime_data
+    def dragEnterEvent(self, event):
+        if event.source() is self and event.mimeData().hasFormat("application/x-clipboard-item-ids"):
+            event.acceptProposedAction()
+        else:
+            event.ignore()
 
-    def populate_table(self, items, col_alignments):
-        """填充表格数据，这是 MainWindow 调用的核心方法"""
-        self.blockSignals(True)
-        self.setRowCount(len(items))
-        
-        for row, item in enumerate(items):
-            # ID (Hidden)
-            self.setItem(row, 8, QTableWidgetItem(str(item.id)))
-            
-            # 状态与图标
-            st_flags = ""
-            if item.is_pinned: st_flags += "📌"
-            if item.is_favorite: st_flags += "❤️"
-            if item.is_locked: st_flags += "🔒"
-            
-            type_icon = self._get_type_symbol(item)
-            display_text = f"{type_icon} {st_flags}".strip()
-            
-            state_item = QTableWidgetItem(display_text)
-            if item.custom_color:
-                state_item.setIcon(get_color_icon(item.custom_color))
-            # 文本居中
-            state_item.setTextAlignment(Qt.AlignCenter)
-            self.setItem(row, 0, state_item)
-            
-            # 内容
-            content_display = self._get_content_display(item)
-            content_item = QTableWidgetItem(content_display)
-            content_item.setToolTip(item.content[:500]) # 限制Tooltip长度防止卡顿
-            self.setItem(row, 1, content_item)
-
-            # 其他
-            self.setItem(row, 2, QTableWidgetItem(item.note))
-            self.setItem(row, 3, QTableWidgetItem("★" * item.star_level))
-            self.setItem(row, 4, QTableWidgetItem(format_size(item.content)))
-            self.setItem(row, 5, QTableWidgetItem(self._get_type_string(item)))
-            self.setItem(row, 6, QTableWidgetItem(item.created_at.strftime("%m-%d %H:%M")))
-            
-            # 应用对齐方式
-            for col in range(7):
-                # 默认: 内容(1)和备注(2)左对齐，其他居中
-                default_align = Qt.AlignLeft | Qt.AlignVCenter if col in [1, 2] else Qt.AlignCenter
-                align = col_alignments.get(col, default_align)
-                
-                it = self.item(row, col)
-                if it: it.setTextAlignment(align)
-
-        self.blockSignals(False)
-
-    def _get_content_display(self, item):
-        if item.item_type == 'file' and item.file_path:
-            return os.path.basename(item.file_path)
-        elif item.item_type == 'url' and item.url_domain:
-            return f"[{item.url_domain}] {item.url_title or ''}"
-        elif item.item_type == 'image':
-            return "[图片] " + (os.path.basename(item.image_path) if item.image_path else "")
+    def dragMoveEvent(self, event):
+        if event.source() is self and event.mimeData().hasFormat("application/x-clipboard-item-ids"):
+            event.acceptProposedAction()
         else:
-            return item.content.replace('\n', ' ').replace('\r', '').strip()[:150]
-
-    def _get_type_symbol(self, item):
-        if item.item_type == 'url': return "🔗"
-        if item.item_type == 'image': return "🖼️"
-        if item.item_type == 'file': return "📂" if os.path.isdir(item.file_path or "") else "📄"
-        return "📝"
-
-    def _get_type_string(self, item):
-        if item.item_type == 'file' and item.file_path:
-            _, ext = os.path.splitext(item.file_path)
-            return ext.upper()[1:] if ext else "FILE"
-        return "TXT"
\ No newline at end of file
+            event.ignore()
+
+    def dropEvent(self, event):
+        if event.source() is not self:
+            event.ignore()
+            return
+        encoded = event.mimeData().data("application/x-clipboard-item-ids").data().decode()
+        ids = {int(i) for i in encoded.split(',') if i}
+        target_row = self.indexAt(event.pos()).row()
+        self._model.move_ids(ids, target_row)
+        # 不让视图再执行“移动后删除源行”
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
+        self.reorder_signal.emit([r.id for r in self._model.records()])
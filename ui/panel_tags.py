@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
-from PyQt5.QtCore import Qt, pyqtSignal, QEvent, QPoint, QTimer
+from PyQt5.QtCore import Qt, pyqtSignal, QEvent, QPoint, QTimer, QThreadPool
+from core.shared import BackgroundTask
 from ui.popup_tag import TagPopup
 from ui.widget_tag_input import TagInputWidget
+from services.tag_index import TagSuggestionIndex
 
 class TagPanel(QWidget):
     """标签面板（集成输入组件和弹窗）"""
@@ -10,6 +12,7 @@ class TagPanel(QWidget):
     tag_selected = pyqtSignal(str)
     tags_committed = pyqtSignal(list)    # 回车提交
     add_tag_requested = pyqtSignal(str)  # 兼容旧代码
+    _index_built = pyqtSignal(int, object)  # (generation, TagSuggestionIndex)，工作线程构建完成
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -45,7 +48,13 @@ class TagPanel(QWidget):
         self.popup.tag_selected.connect(self._on_popup_tag_toggle)         # 历史标签勾选
         self.popup.create_tag_requested.connect(self._on_create_new_tag)   # 新词点击
         
-        self.cached_tags = []
+        self.tag_index = TagSuggestionIndex()
+        self._index_rows = None  # 上次提交构建时的统计快照，未变化时跳过重建
+        # 索引在工作线程中构建，完成后在 GUI 线程替换；构建期间联想继续使用旧索引
+        self._index_pool = QThreadPool(self)
+        self._index_pool.setMaxThreadCount(1)
+        self._index_generation = 0
+        self._index_built.connect(self._on_index_built)
 
     def eventFilter(self, obj, event):
         """核心交互逻辑"""
@@ -62,7 +71,7 @@ class TagPanel(QWidget):
         """显示历史标签面板"""
         # 如果此时输入框有文字，显示过滤结果；没文字，显示纯历史
         current_text = self.input_widget.current_text().strip()
-        self.popup.load_history(self.cached_tags, self.input_widget.get_tags())
+        self.popup.load_history(self.tag_index, self.input_widget.get_tags())
         
         if current_text:
             self.popup.filter_ui(current_text)  # 有字显示筛选/新词
@@ -123,7 +132,7 @@ class TagPanel(QWidget):
     def _on_chips_updated(self, tags):
         """暂存区变动 -> 刷新弹窗内容并动态重定位"""
         if self.popup.isVisible():
-            self.popup.load_history(self.cached_tags, tags)
+            self.popup.load_history(self.tag_index, tags)
             # 关键：当标签增减导致输入框高度变化时，必须重新计算弹窗位置，防止遮挡
             QTimer.singleShot(10, self._position_popup) 
 
@@ -136,13 +145,33 @@ class TagPanel(QWidget):
         self.popup.hide()
 
     def load_tags(self, tags):
-        """加载历史标签列表"""
-        self.cached_tags = tags
+        """加载历史标签列表 [(name, count), ...] 或 [(name, count, last_used), ...]"""
+        rows = [tuple(t) if len(t) == 3 else (t[0], t[1], None) for t in tags]
+        if rows != self._index_rows:
+            self._index_rows = rows
+            self._index_generation += 1
+            self._index_pool.start(BackgroundTask(self._build_index, rows, self._index_generation))
+
+    def _build_index(self, rows, generation):
+        """工作线程：构建新索引 (已有更新的统计时放弃)"""
+        if generation != self._index_generation:
+            return
+        index = TagSuggestionIndex()
+        index.build(rows)
+        self._index_built.emit(generation, index)
+
+    def _on_index_built(self, generation, index):
+        """GUI 线程：只接受最新一次提交的索引"""
+        if generation != self._index_generation:
+            return
+        self.tag_index = index
+        if self.popup.isVisible():
+            self.popup.load_history(index, self.input_widget.get_tags())
+            self.popup.filter_ui(self.input_widget.current_text().strip())
 
     def refresh_tags(self, db_manager):
-        """从数据库刷新标签"""
+        """从标签使用统计 (内存镜像) 刷新标签联想索引"""
         try:
-            stats = db_manager.get_stats()
-            self.load_tags(stats.get('tags', []))
+            self.load_tags(db_manager.get_tag_usage_stats())
         except:
-            pass
\ No newline at end of file
+            pass
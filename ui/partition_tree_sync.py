@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+分区树的增量同步
+以 (类型, ID) 为键维护 QTreeWidgetItem，刷新时把新的分区快照和计数与当前树比对，
+只修改变化了的文字、图标和节点位置，不再 clear() 后整体重建。
+节点对象保持不变，因此展开状态、选中项和滚动位置都无需遍历恢复。
+"""
+from PyQt5.QtWidgets import QTreeWidgetItem
+from PyQt5.QtCore import Qt
+
+
+class PartitionTreeSync:
+    def __init__(self, tree, icon_for_color, on_static_created=None):
+        """
+        Args:
+            tree: 目标 QTreeWidget
+            icon_for_color: 根据分区颜色返回图标的函数
+            on_static_created: 静态项 (全部数据/回收站等) 首次创建时的装饰回调
+        """
+        self.tree = tree
+        self.icon_for_color = icon_for_color
+        self.on_static_created = on_static_created
+        self.nodes = {}  # {(type, id): QTreeWidgetItem}
+
+    def node(self, data):
+        """按数据字典查找节点 (O(1))"""
+        if not data:
+            return None
+        return self.nodes.get((data.get('type'), data.get('id')))
+
+    def sync(self, static_items, partitions, partition_counts, default_selection=None):
+        """
+        Args:
+            static_items: [(名称, 数据, 图标, 计数), ...]，固定排在最前
+            partitions: 顶层分区 (children 已加载)
+            partition_counts: {partition_id: count}
+            default_selection: 当前选中项被删除时改为选中的数据
+        """
+        current = self.tree.currentItem()
+        current_key = self._key(current) if current else None
+        scroll = self.tree.verticalScrollBar().value()
+
+        seen = set()
+        self.tree.blockSignals(True)
+        self.tree.setUpdatesEnabled(False)
+        try:
+            index = 0
+            for name, data, icon, count in static_items:
+                key = (data['type'], data['id'])
+                item = self.nodes.get(key)
+                if item is None:
+                    item = QTreeWidgetItem()
+                    item.setData(0, Qt.UserRole, data)
+                    item.setIcon(0, icon)
+                    if self.on_static_created:
+                        self.on_static_created(item)
+                    self.nodes[key] = item
+                self._place(item, None, index)
+                self._set_text(item, f"{name} ({count})")
+                seen.add(key)
+                index += 1
+
+            self._sync_level(partitions, None, index, partition_counts, seen)
+
+            for key in [k for k in self.nodes if k not in seen]:
+                self._detach(self.nodes.pop(key))
+
+            # 节点被移动位置时视图可能丢失选中状态，静默恢复
+            if current_key in seen and self.tree.currentItem() is not self.nodes[current_key]:
+                self.tree.setCurrentItem(self.nodes[current_key])
+        finally:
+            self.tree.setUpdatesEnabled(True)
+            self.tree.blockSignals(False)
+        self.tree.verticalScrollBar().setValue(scroll)
+
+        # 选中项已不存在 (或首次加载)：切换到默认项，此时才发出选择变化信号
+        if current_key not in seen:
+            fallback = self.node(default_selection)
+            if fallback is not None:
+                self.tree.setCurrentItem(fallback)
+
+    def _sync_level(self, partitions, parent_item, start_index, partition_counts, seen):
+        for offset, partition in enumerate(partitions):
+            key = ('partition', partition.id)
+            item = self.nodes.get(key)
+            is_new = item is None
+            if is_new:
+                item = QTreeWidgetItem()
+                self.nodes[key] = item
+            data = item.data(0, Qt.UserRole)
+            if is_new or data.get('color') != partition.color:
+                item.setIcon(0, self.icon_for_color(partition.color))
+            if is_new or data != {'type': 'partition', 'id': partition.id, 'color': partition.color}:
+                item.setData(0, Qt.UserRole, {'type': 'partition', 'id': partition.id, 'color': partition.color})
+            self._place(item, parent_item, start_index + offset, expand=is_new)
+            self._set_text(item, f"{partition.name} ({partition_counts.get(partition.id, 0)})")
+            seen.add(key)
+            self._sync_level(partition.children or [], item, 0, partition_counts, seen)
+
+    def _place(self, item, parent_item, index, expand=False):
+        """确保节点位于 parent_item 下的第 index 个位置，必要时才移动"""
+        in_tree = item.treeWidget() is self.tree
+        if in_tree and item.parent() is parent_item and self._index_of(item) == index:
+            return
+        expanded = item.isExpanded() if in_tree else True
+        self._detach(item)
+        if parent_item is None:
+            self.tree.insertTopLevelItem(index, item)
+        else:
+            parent_item.insertChild(index, item)
+        item.setExpanded(expanded or expand)
+
+    def _detach(self, item):
+        parent = item.parent()
+        if parent is not None:
+            parent.removeChild(item)
+        elif item.treeWidget() is self.tree:
+            self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(item))
+
+    def _index_of(self, item):
+        parent = item.parent()
+        return parent.indexOfChild(item) if parent is not None else self.tree.indexOfTopLevelItem(item)
+
+    @staticmethod
+    def _set_text(item, text):
+        if item.text(0) != text:
+            item.setText(0, text)
+
+    @staticmethod
+    def _key(item):
+        data = item.data(0, Qt.UserRole)
+        return (data.get('type'), data.get('id')) if data else None
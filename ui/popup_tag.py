@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QFrame, QScrollArea, QGridLayout, QPushButton, QGraphicsDropShadowEffect)
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QColor
+from services.tag_index import TagSuggestionIndex
 
 class TagPopup(QWidget):
     """
@@ -84,43 +85,36 @@ class TagPopup(QWidget):
         self.layout_container.addWidget(self.lbl_tip)
         
         # 数据缓存
-        self.current_tags = [] # list of (name, count)
+        self.index = TagSuggestionIndex()
         self.selected_tags = set()
         self.typing_text = ""
+        self._buttons = []  # 复用的标签按钮池，只增不减
+        self._shown = 0     # 当前正在使用的按钮数
 
-    def load_history(self, tags, active_tags=None):
-        """加载初始数据"""
-        self.current_tags = tags
+    def load_history(self, index, active_tags=None):
+        """加载初始数据 (index 为 TagSuggestionIndex)"""
+        self.index = index
         if active_tags:
             self.selected_tags = set(active_tags)
         
-        self._populate_grid(self.current_tags)
-        self.lbl_history.setText(f"最近使用 ({len(tags)})")
+        self._populate_grid(self.index.search(""))
+        self.lbl_history.setText(f"最近使用 ({len(self.index)})")
         
         self.creation_view.hide()
         self.history_view.show()
 
     def filter_ui(self, text):
-        """核心逻辑：根据输入文本过滤UI"""
+        """核心逻辑：根据输入文本过滤UI (索引查询，只显示排名靠前的 top_k 个)"""
         text = text.strip()
         self.typing_text = text
         
-        filtered_tags = []
-        is_exact_match = False
-        
-        if not text:
-            filtered_tags = self.current_tags
-        else:
-            for name, count in self.current_tags:
-                if text.lower() in name.lower():
-                    filtered_tags.append((name, count))
-                if text.lower() == name.lower():
-                    is_exact_match = True
+        filtered_tags = self.index.search(text)
+        is_exact_match = bool(text) and self.index.contains(text)
         
         self._populate_grid(filtered_tags)
         
         if not text:
-            self.lbl_history.setText(f"最近使用 ({len(filtered_tags)})")
+            self.lbl_history.setText(f"最近使用 ({len(self.index)})")
         else:
             self.lbl_history.setText("搜索结果")
 
@@ -136,50 +130,37 @@ class TagPopup(QWidget):
             self.history_view.hide()
 
     def _populate_grid(self, tags):
-        """填充网格"""
-        while self.grid_layout.count():
-            item = self.grid_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-        
-        row, col = 0, 0
-        for name, count in tags:
-            btn = self._create_tag_btn(name, count)
-            self.grid_layout.addWidget(btn, row, col)
-            
-            col += 1
-            if col > 1:
-                col = 0
-                row += 1
-                
-        self._refresh_check_state()
+        """填充网格：复用已有按钮，只更新文字和状态，多余的按钮隐藏"""
+        self.grid_widget.setUpdatesEnabled(False)
+        for i, (name, count) in enumerate(tags):
+            if i < len(self._buttons):
+                btn = self._buttons[i]
+            else:
+                btn = self._create_tag_btn()
+                self._buttons.append(btn)
+                self.grid_layout.addWidget(btn, i // 2, i % 2)
+            if btn.property("tag_name") != name:
+                btn.setProperty("tag_name", name)
+                btn.setText(f"🕒 {name}") # 恢复时钟符号
+            btn.setToolTip(f"引用次数: {count}")
+            btn.setChecked(name in self.selected_tags)
+            btn.show()
+        for btn in self._buttons[len(tags):self._shown]:
+            btn.hide()
+        self._shown = len(tags)
+        self.grid_widget.setUpdatesEnabled(True)
 
-    def _create_tag_btn(self, name, count):
+    def _create_tag_btn(self):
         btn = QPushButton()
         btn.setCheckable(True)
         btn.setCursor(Qt.PointingHandCursor)
-        btn.setProperty("tag_name", name)
         btn.setObjectName("TagPopupButton") # 设置ObjectName
-        
-        btn.setText(f"🕒 {name}") # 恢复时钟符号
-        btn.setToolTip(f"引用次数: {count}")
-        
-        btn.clicked.connect(lambda checked, n=name: self._on_tag_clicked(n, checked))
+        btn.clicked.connect(lambda checked, b=btn: self._on_tag_clicked(b.property("tag_name"), checked))
         return btn
 
     def _refresh_check_state(self):
-        for i in range(self.grid_layout.count()):
-            item = self.grid_layout.itemAt(i)
-            if item and item.widget():
-                btn = item.widget()
-                name = btn.property("tag_name")
-                is_sel = name in self.selected_tags
-                btn.setChecked(is_sel)
-                
-                if is_sel:
-                    btn.setText(f"🕒 {name}") # 恢复时钟，但保持移除 ✅
-                else:
-                    btn.setText(f"🕒 {name}") # 恢复时钟
+        for btn in self._buttons[:self._shown]:
+            btn.setChecked(btn.property("tag_name") in self.selected_tags)
 
     def _on_tag_clicked(self, name, checked):
         if checked:
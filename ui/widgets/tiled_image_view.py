@@ -0,0 +1,167 @@
+# coding:utf-8
+"""
+分块渲染的大图显示控件
+- 图片金字塔：原图逐级减半得到多级分辨率，缩放时选择最接近的一级来绘制
+- 分块绘制：只渲染当前可见区域涉及的 256px 图块，并缓存已渲染的图块
+- 快速首帧：金字塔在后台线程生成，生成前使用快速采样，完成后自动精细重绘
+"""
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QPointF, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QPixmap, QTransform
+from PyQt5.QtWidgets import QWidget
+
+from core.memory_budget import memory_budget
+from services.detail_loader import image_nbytes
+
+
+class _PyramidSignals(QObject):
+    done = pyqtSignal(int, list)
+
+
+class _PyramidTask(QRunnable):
+    """在工作线程中生成图片金字塔 (QImage 可以安全地跨线程使用)"""
+
+    def __init__(self, image, generation, min_side):
+        super().__init__()
+        self.image = image
+        self.generation = generation
+        self.min_side = min_side
+        self.signals = _PyramidSignals()
+
+    def run(self):
+        levels = []
+        img = self.image
+        while max(img.width(), img.height()) > self.min_side and min(img.width(), img.height()) > 1:
+            img = img.scaled(max(1, img.width() // 2), max(1, img.height() // 2), Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            levels.append(img)
+        self.signals.done.emit(self.generation, levels)
+
+
+class TiledImageView(QWidget):
+    TILE = 256
+    MAX_TILES = 192       # 最多缓存的图块数 (约 48MB)
+    MIN_LEVEL_SIDE = 512  # 金字塔最小一级的边长
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.levels = []
+        self.scale = 1.0
+        self.angle = 0
+        self._pyramid_ready = False
+        self._generation = 0
+        self._tiles = OrderedDict()
+        self._task = None
+        self._view_w = self._view_h = 0
+        # 原图、金字塔和图块缓存计入全局内存预算 (显示期间不可淘汰，图块数量由 MAX_TILES 限制)
+        self.memory_account = memory_budget.register("preview_image", None, "预览大图")
+
+    # --- 公共接口 ---
+    def set_image(self, image):
+        """设置原图 (QImage)，并在后台开始生成金字塔"""
+        self._generation += 1
+        self.levels = [image]
+        self._pyramid_ready = max(image.width(), image.height()) <= self.MIN_LEVEL_SIDE
+        self._tiles.clear()
+        if not self._pyramid_ready:
+            self._task = _PyramidTask(image, self._generation, self.MIN_LEVEL_SIDE)
+            self._task.signals.done.connect(self._on_pyramid_done)
+            QThreadPool.globalInstance().start(self._task)
+        self._apply_size()
+        self._report_memory()
+
+    def clear(self):
+        self._generation += 1
+        self.levels = []
+        self._tiles.clear()
+        self._task = None
+        self.setFixedSize(0, 0)
+        self.update()
+        self._report_memory()
+
+    def has_image(self):
+        return bool(self.levels)
+
+    def image_size(self):
+        """原图在当前旋转角度下的尺寸 (w, h)"""
+        if not self.levels:
+            return 0, 0
+        w, h = self.levels[0].width(), self.levels[0].height()
+        return (h, w) if self.angle % 180 else (w, h)
+
+    def set_view(self, scale, angle):
+        if scale == self.scale and angle == self.angle:
+            return
+        self.scale = scale
+        self.angle = angle
+        self._tiles.clear()
+        self._apply_size()
+
+    # --- 内部实现 ---
+    def _apply_size(self):
+        w, h = self.image_size()
+        self._view_w, self._view_h = max(1, int(w * self.scale)), max(1, int(h * self.scale))
+        self.setFixedSize(self._view_w, self._view_h)
+        self.update()
+
+    def _on_pyramid_done(self, generation, levels):
+        self._task = None
+        if generation != self._generation or not self.levels:
+            return
+        self.levels = self.levels[:1] + levels
+        self._pyramid_ready = True
+        self._tiles.clear()  # 丢弃快速首帧的粗糙图块，精细重绘
+        self.update()
+        self._report_memory()
+
+    def _pick_level(self):
+        """选择 缩放比 × 2^级数 不超过 1 的最高一级，使绘制时只需轻微缩小"""
+        level = 0
+        while level + 1 < len(self.levels) and self.scale * (2 ** (level + 1)) <= 1.0:
+            level += 1
+        return level
+
+    def _render_tile(self, tx, ty):
+        level_idx = self._pick_level() if self._pyramid_ready else 0
+        level = self.levels[level_idx]
+        base = self.levels[0]
+        fx = base.width() / level.width()
+        fy = base.height() / level.height()
+
+        tile = QImage(self.TILE, self.TILE, QImage.Format_ARGB32_Premultiplied)
+        tile.fill(Qt.transparent)
+        p = QPainter(tile)
+        # 金字塔就绪前使用最近邻采样，保证首帧足够快
+        p.setRenderHint(QPainter.SmoothPixmapTransform, self._pyramid_ready)
+        t = QTransform()
+        t.translate(-tx + self._view_w / 2.0, -ty + self._view_h / 2.0)
+        t.rotate(self.angle)
+        t.scale(self.scale * fx, self.scale * fy)
+        p.setTransform(t)
+        p.drawImage(QPointF(-level.width() / 2.0, -level.height() / 2.0), level)
+        p.end()
+        return QPixmap.fromImage(tile)
+
+    def paintEvent(self, event):
+        if not self.levels:
+            return
+        rect = event.rect()
+        T = self.TILE
+        p = QPainter(self)
+        for ty in range((rect.top() // T) * T, rect.bottom() + 1, T):
+            for tx in range((rect.left() // T) * T, rect.right() + 1, T):
+                key = (tx, ty)
+                tile = self._tiles.get(key)
+                if tile is None:
+                    tile = self._render_tile(tx, ty)
+                    self._tiles[key] = tile
+                    while len(self._tiles) > self.MAX_TILES:
+                        self._tiles.popitem(last=False)
+                else:
+                    self._tiles.move_to_end(key)
+                p.drawPixmap(tx, ty, tile)
+        p.end()
+        self._report_memory()
+
+    def _report_memory(self):
+        levels = sum(image_nbytes(level) for level in self.levels)
+        self.memory_account.set_fixed(levels + len(self._tiles) * self.TILE * self.TILE * 4)